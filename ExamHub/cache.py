@@ -0,0 +1,102 @@
+import functools
+import threading
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache, caches
+from django.core.cache.backends import filebased, locmem, redis
+from django.http import HttpResponse
+
+# Cache backends for CACHES: the stock Django ones, counting hits and misses so the hit rate of
+# each cache can be reported (at /metrics, see ExamHub/metrics.py). Counts are kept per process.
+#
+# Also here: caching whole pages for anonymous visitors (`cache_anonymous_page`).
+
+DEFAULT_ANONYMOUS_PAGE_SECONDS = 10 * 60
+_MISSING = object()
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hits=0, misses=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+
+_stats = {} # backend identity -> CacheStats, shared by the per-thread instances of a cache
+_stats_lock = threading.Lock()
+
+
+class CacheStatsMixin:
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        identity = (type(self).__name__, str(location), self.key_prefix, self.version)
+        with _stats_lock:
+            self.stats = _stats.setdefault(identity, CacheStats())
+
+    def get(self, key, default=None, version=None):
+        # get_many, get_or_set and incr of the base class go through here too
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            self.stats.record(misses=1)
+            return default
+        self.stats.record(hits=1)
+        return value
+
+
+class LocMemCache(CacheStatsMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(CacheStatsMixin, filebased.FileBasedCache):
+    pass
+
+
+class RedisCache(CacheStatsMixin, redis.RedisCache):
+    def get_many(self, keys, version=None):
+        # One round trip for all keys, not a get() per key
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        self.stats.record(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+
+def cache_stats():
+    """{alias: CacheStats} for the caches in CACHES that count them."""
+    return {alias: caches[alias].stats for alias in settings.CACHES if isinstance(caches[alias], CacheStatsMixin)}
+
+
+def cache_anonymous_page(view_func):
+    """Serve a page from the cache to anonymous visitors, for ANONYMOUS_PAGE_CACHE_SECONDS.
+
+    Logged-in users, requests with pending messages and responses that set cookies are never
+    cached or served from the cache, so nothing personal can leak into the shared copy.
+    """
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated or get_messages(request):
+            return view_func(request, *args, **kwargs)
+        key = f'anonymous-page:{request.get_full_path()}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view_func(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render() # TemplateResponse: render now to store the content
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            timeout = getattr(settings, 'ANONYMOUS_PAGE_CACHE_SECONDS', DEFAULT_ANONYMOUS_PAGE_SECONDS)
+            cache.set(key, (response.content, response['Content-Type']), timeout)
+        return response
+    return wrapper
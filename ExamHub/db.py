@@ -0,0 +1,53 @@
+import functools
+import random
+import re
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connections
+
+# Database helpers for running ExamHub on SQLite under exam-day load (see DATABASES in settings,
+# which turns on WAL journaling, immediate write transactions and a busy timeout).
+
+LOCK_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def is_lock_error(exc):
+    return isinstance(exc, OperationalError) and any(message in str(exc) for message in LOCK_MESSAGES)
+
+
+def retry_on_lock(func=None, *, attempts=None, delay=None, using='default'):
+    """Run `func` again (a few times, with jittered exponential backoff) if the database stays locked.
+
+    Meant for short write transactions on the exam hot path: `func` must open its own
+    transaction.atomic() block and have no side effects outside it. Inside an outer transaction
+    nothing is retried, since the outer block can't be resumed after an error.
+    """
+    if func is None:
+        return functools.partial(retry_on_lock, attempts=attempts, delay=delay, using=using)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        max_attempts = attempts or getattr(settings, 'DATABASE_LOCK_RETRIES', 3)
+        wait = delay if delay is not None else getattr(settings, 'DATABASE_LOCK_RETRY_DELAY', 0.05)
+        for attempt in range(1, max_attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if attempt == max_attempts or not is_lock_error(exc) or connections[using].in_atomic_block:
+                    raise
+            time.sleep(wait * random.uniform(0.5, 1.5))
+            wait *= 2
+    return wrapper
+
+
+def query_plan(sql, params=None, using='default'):
+    """The lines of SQLite's EXPLAIN QUERY PLAN for a query."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_table_scans(sql, params=None, using='default'):
+    """Tables a query reads in full, without using any index (`SCAN table`, as opposed to `SEARCH table USING ...`)."""
+    return [match.group(1) for detail in query_plan(sql, params, using) if (match := re.fullmatch(r'SCAN (\w+)', detail))]
@@ -0,0 +1,248 @@
+import bisect
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates, Template
+
+from .cache import cache_stats
+
+# Per-view request metrics, always on: latency, SQL query count and time, and template render
+# time, recorded by RequestMetricsMiddleware for each URL name and served at /metrics in the
+# Prometheus text format, along with the hit rate of each cache (ExamHub/cache.py). Requests
+# slower than SLOW_REQUEST_THRESHOLD are also logged (logger "examhub.slow_requests") with the
+# SQL statements that took the most time.
+#
+# Metrics live in the memory of each process (like the leaderboards in results/leaderboard.py);
+# with several workers, Prometheus scrapes each of them.
+
+logger = logging.getLogger('examhub.slow_requests')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+DEFAULT_SLOW_REQUEST_THRESHOLD = 1.0 # seconds
+SLOW_REQUEST_LOGGED_QUERIES = 10
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'} # Anything else is counted as "other"
+
+_current_request = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """What one request spent in the database and in templates."""
+
+    __slots__ = ('queries', 'query_time', 'template_time', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.statements = [] # (sql, seconds); the SQL keeps its placeholders, so no parameter values are logged
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper() around every query of the request
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.query_time += elapsed
+            self.statements.append((sql, elapsed))
+
+    def slowest_statements(self, count=SLOW_REQUEST_LOGGED_QUERIES):
+        """The statements that took the most time in total, as (sql, executions, seconds); repeats are summed, so N+1 queries stand out."""
+        totals = defaultdict(lambda: [0, 0.0])
+        for sql, elapsed in self.statements:
+            totals[sql][0] += 1
+            totals[sql][1] += elapsed
+        return sorted(((sql, executions, seconds) for sql, (executions, seconds) in totals.items()),
+                      key=lambda statement: -statement[2])[:count]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # The last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def cumulative_counts(self):
+        total = 0
+        for bound, count in zip([*self.buckets, '+Inf'], self.counts):
+            total += count
+            yield bound, total
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.responses = defaultdict(int) # status code -> requests
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.slow = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._views = defaultdict(ViewMetrics) # (view name, method) -> ViewMetrics
+        self._lock = threading.Lock()
+
+    def observe(self, view, method, status, duration, stats, slow=False):
+        with self._lock:
+            metrics = self._views[view, method]
+            metrics.responses[status] += 1
+            metrics.latency.observe(duration)
+            metrics.queries.observe(stats.queries)
+            metrics.query_time += stats.query_time
+            metrics.template_time += stats.template_time
+            metrics.slow += slow
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = []
+
+            def family(name, kind, help_text, samples):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.extend(samples)
+
+            def labels(view, method, **extra):
+                pairs = {'view': view, 'method': method, **extra}
+                return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in pairs.items()) + '}'
+
+            def histogram_samples(name, attribute):
+                for (view, method), metrics in views:
+                    histogram = getattr(metrics, attribute)
+                    for bound, count in histogram.cumulative_counts():
+                        yield f'{name}_bucket{labels(view, method, le=bound)} {count}'
+                    yield f'{name}_sum{labels(view, method)} {histogram.sum:.6f}'
+                    yield f'{name}_count{labels(view, method)} {sum(histogram.counts)}'
+
+            family('examhub_requests_total', 'counter', 'Requests handled, by view, method and response status.', [
+                f'examhub_requests_total{labels(view, method, status=status)} {count}'
+                for (view, method), metrics in views for status, count in sorted(metrics.responses.items())
+            ])
+            family('examhub_request_duration_seconds', 'histogram', 'Time to produce the response (not to stream it).',
+                   histogram_samples('examhub_request_duration_seconds', 'latency'))
+            family('examhub_request_db_queries', 'histogram', 'SQL queries run per request.',
+                   histogram_samples('examhub_request_db_queries', 'queries'))
+            family('examhub_request_db_seconds_total', 'counter', 'Time spent running SQL queries.', [
+                f'examhub_request_db_seconds_total{labels(view, method)} {metrics.query_time:.6f}' for (view, method), metrics in views
+            ])
+            family('examhub_request_template_seconds_total', 'counter',
+                   'Time spent rendering templates (including queries the templates trigger).', [
+                f'examhub_request_template_seconds_total{labels(view, method)} {metrics.template_time:.6f}'
+                for (view, method), metrics in views
+            ])
+            family('examhub_slow_requests_total', 'counter', 'Requests slower than SLOW_REQUEST_THRESHOLD.', [
+                f'examhub_slow_requests_total{labels(view, method)} {metrics.slow}' for (view, method), metrics in views
+            ])
+
+        caches = sorted(cache_stats().items())
+        family('examhub_cache_lookups_total', 'counter', 'Cache lookups, by cache (CACHES alias) and result.', [
+            f'examhub_cache_lookups_total{{cache="{escape_label(alias)}",result="{result}"}} {count}'
+            for alias, stats in caches for result, count in (('hit', stats.hits), ('miss', stats.misses))
+        ])
+        family('examhub_cache_hit_ratio', 'gauge', 'Share of cache lookups that were hits, since the process started.', [
+            f'examhub_cache_hit_ratio{{cache="{escape_label(alias)}"}} {stats.hit_rate:.4f}'
+            for alias, stats in caches if stats.hit_rate is not None
+        ])
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+metrics = MetricsRegistry()
+
+
+class RequestMetricsMiddleware:
+    """Records every request in `metrics`; placed first in MIDDLEWARE so the others are timed too."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD', DEFAULT_SLOW_REQUEST_THRESHOLD)
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        duration = time.perf_counter() - started
+
+        # Labelled by URL name, so all of /employee/exam/<id>/ is "take_exam"; unknown URLs share one label
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+        slow = duration >= self.slow_threshold
+        metrics.observe(view, method, response.status_code, duration, stats, slow)
+        if slow:
+            log_slow_request(request, view, response, duration, stats)
+        return response
+
+
+def log_slow_request(request, view, response, duration, stats):
+    statements = '\n'.join(f'  {seconds * 1000:8.1f} ms  {executions:>4}x  {sql}'
+                           for sql, executions, seconds in stats.slowest_statements())
+    logger.warning(
+        "Slow request %s %s (%s, %s) took %.3f s: %d queries in %.3f s, templates %.3f s. Slowest SQL:\n%s",
+        request.method, request.path, view, response.status_code, duration,
+        stats.queries, stats.query_time, stats.template_time, statements or '  (none)',
+    )
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = _current_request.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing every render into the current request's metrics.
+
+    Only top-level renders (render(), render_to_string()) are timed; {% include %} and
+    {% extends %} happen inside them.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+def metrics_view(request):
+    # For the Prometheus scraper (by address) and for staff users
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if request.META.get('REMOTE_ADDR') not in allowed_ips and not request.user.is_staff:
+        return HttpResponseForbidden("Metrics are only available to the monitoring host and staff users.")
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
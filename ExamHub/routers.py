@@ -0,0 +1,68 @@
+import contextlib
+import contextvars
+import functools
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Admin reporting can read from a replica of the primary database, so that heavy listings and
+# exports don't compete with candidates' writes. Reads only go to the replica inside
+# `use_replica()` (or a view decorated with `reads_from_replica`); everything else, in particular
+# the exam flow, reads its own writes from the primary. Without a REPORTING_DATABASE alias in
+# DATABASES every query stays on the primary.
+
+_read_target = contextvars.ContextVar('read_target', default=None) # 'replica', 'primary' or None
+
+
+def get_reporting_database():
+    """Alias reporting reads use: the configured replica, or the primary if there is none."""
+    alias = getattr(settings, 'REPORTING_DATABASE', None)
+    return alias if alias and alias in connections.settings else DEFAULT_DB_ALIAS
+
+
+@contextlib.contextmanager
+def _reading_from(target):
+    token = _read_target.set(target)
+    try:
+        yield
+    finally:
+        _read_target.reset(token)
+
+
+def use_replica():
+    return _reading_from('replica')
+
+
+def use_primary():
+    # For reads whose results are compared with, or written back to, the primary
+    return _reading_from('primary')
+
+
+def reads_from_replica(view_func):
+    @functools.wraps(view_func)
+    def wrapper(*args, **kwargs):
+        with use_replica():
+            return view_func(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        target = _read_target.get()
+        if target == 'replica':
+            return get_reporting_database()
+        if target == 'primary':
+            return DEFAULT_DB_ALIAS
+        return None # Django's default: the primary, or the database the related instance came from
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True # The replica holds the same rows
+
+    def allow_migrate(self, db, app_label, **hints):
+        # The replica is a copy of the primary (see the sync_replica command), never migrated itself
+        if db != DEFAULT_DB_ALIAS and db == get_reporting_database():
+            return False
+        return None
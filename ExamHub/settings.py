@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ExamHub.metrics.RequestMetricsMiddleware', # First, so it times everything below it
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,7 +58,9 @@ ROOT_URLCONF = 'ExamHub.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # The Django backend, with render times recorded for /metrics (ExamHub/metrics.py)
+        'BACKEND': 'ExamHub.metrics.InstrumentedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [BASE_DIR / 'templates'],  # Global templates directory
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,13 +79,77 @@ WSGI_APPLICATION = 'ExamHub.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for many concurrent candidates:
+# - WAL journaling lets readers run while a write is in progress (only writers wait for each other),
+#   and synchronous=NORMAL is durable across application crashes in WAL mode, with far fewer fsyncs;
+# - write transactions take the write lock when they begin (BEGIN IMMEDIATE), so two transactions
+#   can't both read and then fail upgrading to a write, and a waiting writer retries for `timeout`
+#   seconds before "database is locked" is raised;
+# - a 64 MB page cache, memory-mapped reads and in-memory temp tables cut I/O per request.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000, # KiB
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': '; '.join(f'PRAGMA {name} = {value}' for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Admin reporting (dashboard, results listings, exports) reads from this alias when it is in
+# DATABASES, and from 'default' otherwise; see ExamHub/routers.py. To try it locally, add a copy
+# of the SQLite file and refresh it with `python manage.py sync_replica`:
+#   DATABASES['replica'] = {**DATABASES['default'], 'NAME': BASE_DIR / 'db-replica.sqlite3', 'TEST': {'MIRROR': 'default'}}
+REPORTING_DATABASE = 'replica'
+DATABASE_ROUTERS = ['ExamHub.routers.ReplicaRouter']
+
+# Exam hot-path writes (submission, autosave, exam start) are retried this many times,
+# after a randomized backoff starting at this many seconds, if the database is still locked
+DATABASE_LOCK_RETRIES = 3
+DATABASE_LOCK_RETRY_DELAY = 0.05
+
+
+# Caches: Django's backends, counting hits and misses for /metrics (ExamHub/cache.py). Local
+# memory is private to each process, so it is only right for a single worker: dashboard summaries,
+# reference data and fragments are invalidated in the cache of the process that made the change,
+# and the others keep serving stale copies. With several workers, share one cache instead, e.g.
+#   {'BACKEND': 'ExamHub.cache.FileBasedCache', 'LOCATION': BASE_DIR / 'cache'}
+#   {'BACKEND': 'ExamHub.cache.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'} (needs the redis package)
+CACHES = {
+    'default': {
+        'BACKEND': 'ExamHub.cache.LocMemCache',
+        'LOCATION': 'examhub',
+        'OPTIONS': {'MAX_ENTRIES': 10000}, # Summaries and fragments are per user
+    },
+}
+
+
+# Request metrics, served at /metrics (ExamHub/metrics.py) to these addresses and to staff users
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+# Requests slower than this many seconds are logged with their slowest SQL
+SLOW_REQUEST_THRESHOLD = 1.0
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'examhub.slow_requests': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -135,4 +202,35 @@ LOGIN_REDIRECT_URL = '/employee/dashboard/' # URL after successful login
 LOGOUT_REDIRECT_URL = '/employee/login/' # URL after successful logout
 
 # Messages storage (optional, useful for Bootstrap integration)
-# MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
\ No newline at end of file
+# MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
+
+# Questions per page of the exam paper; later pages are loaded lazily through the paper API
+EXAM_PAPER_PAGE_SIZE = 10
+
+# Question bank cache: number of technologies whose questions are kept in memory (LRU)
+QUESTION_BANK_CACHE_MAX_TECHNOLOGIES = 32
+
+# Rows per page of the admin listings (keyset pagination)
+ADMIN_LIST_PAGE_SIZE = 50
+
+# Question search: backend class, or None to pick one for the database in use (the SQLite FTS5
+# index, or the substring fallback 'questionbank.search.DatabaseSearchBackend' for other databases),
+# and the most matches returned
+QUESTION_SEARCH_BACKEND = None
+QUESTION_SEARCH_MAX_RESULTS = 500
+
+# Near-duplicate questions: estimated Jaccard similarity of the questions' 5-character shingles
+# (text and options) from which a question is flagged as a reworded copy of another
+NEAR_DUPLICATE_THRESHOLD = 0.7
+
+# Employee dashboard summary: number of recent results shown, and the longest it stays cached
+EMPLOYEE_SUMMARY_RECENT_RESULTS = 10
+EMPLOYEE_SUMMARY_MAX_AGE = 15 * 60
+
+# Seconds an item analysis stays cached (it is also recomputed whenever another attempt completes)
+ITEM_ANALYSIS_CACHE_SECONDS = 24 * 60 * 60
+
+# Seconds pages for anonymous visitors (home) and reference data (technology lists) stay cached;
+# reference data is also dropped whenever it changes
+ANONYMOUS_PAGE_CACHE_SECONDS = 10 * 60
+REFERENCE_DATA_CACHE_SECONDS = 24 * 60 * 60
@@ -18,11 +18,15 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView # To serve a basic homepage directly
 
+from .cache import cache_anonymous_page
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls), # Django Admin panel
     path('administrator/', include('administrator.urls')), # URLs for administrator app
     path('employee/', include('employee.urls')), # URLs for employee app
     path('questionbank/', include('questionbank.urls')), # URLs for questionbank app (might be minimal)
     path('results/', include('results.urls')), # URLs for results app
-    path('', TemplateView.as_view(template_name='home.html'), name='home'),
+    path('metrics', metrics_view, name='metrics'), # Prometheus scrape endpoint
+    path('', cache_anonymous_page(TemplateView.as_view(template_name='home.html')), name='home'),
 ]
\ No newline at end of file
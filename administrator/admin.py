@@ -1,7 +1,10 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
 from .models import Technology, TestSchedule
 from employee.models import EmployeeProfile
 from questionbank.models import Question, Answer
+from questionbank.papers import papers_need_preparing, pregenerate_papers
+from questionbank.search import DEFAULT_MAX_RESULTS, search_question_ids
 from results.models import EmployeeResult  # Assuming you create this model later
 
 # Register your models here so they appear in the Django admin interface.
@@ -13,11 +16,16 @@ class TechnologyAdmin(admin.ModelAdmin):
 
 @admin.register(TestSchedule)
 class TestScheduleAdmin(admin.ModelAdmin):
-    list_display = ('technology', 'start_time', 'end_time', 'duration_minutes', 'total_questions', 'is_active')
+    list_display = ('technology', 'start_time', 'end_time', 'duration_minutes', 'total_questions', 'pass_mark', 'is_active')
     list_filter = ('technology', 'is_active')
     search_fields = ('technology__name',)
     date_hierarchy = 'start_time'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if papers_need_preparing(obj, form.changed_data):
+            pregenerate_papers(obj) # Prepare candidate papers as soon as the test is activated (or its papers change)
+
 @admin.register(EmployeeProfile)
 class EmployeeProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'employee_id', 'department')
@@ -31,3 +39,14 @@ class QuestionAdmin(admin.ModelAdmin):
     search_fields = ('question_text',)
     raw_id_fields = ('technology',)
 
+    # Search through the full-text index instead of LIKE '%...%' scans (results keep the list ordering)
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        limit = getattr(settings, 'QUESTION_SEARCH_MAX_RESULTS', DEFAULT_MAX_RESULTS)
+        question_ids = search_question_ids(search_term, limit=limit + 1) # One more, to tell when there are more
+        if len(question_ids) > limit:
+            question_ids = question_ids[:limit]
+            messages.warning(request, f"Only the {limit} best matches for \"{search_term}\" are listed; "
+                                      "add words to narrow the search.")
+        return queryset.filter(id__in=question_ids), False
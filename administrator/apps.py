@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AdministratorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'administrator'
+
+    def ready(self):
+        from . import signals # noqa: F401 -- connects the dashboard counter receivers
@@ -14,17 +14,19 @@ class TechnologyForm(forms.ModelForm):
 class TestScheduleForm(forms.ModelForm):
     class Meta:
         model = TestSchedule
-        fields = ['technology', 'start_time', 'end_time', 'duration_minutes', 'total_questions', 'is_active']
+        fields = ['technology', 'start_time', 'end_time', 'duration_minutes', 'total_questions', 'pass_mark', 'is_active']
         widgets = {
             'technology': forms.Select(attrs={'class': 'form-control'}),
             'start_time': forms.DateTimeInput(attrs={'type': 'datetime-local', 'class': 'form-control'}),
             'end_time': forms.DateTimeInput(attrs={'type': 'datetime-local', 'class': 'form-control'}),
             'duration_minutes': forms.NumberInput(attrs={'class': 'form-control'}),
             'total_questions': forms.NumberInput(attrs={'class': 'form-control'}),
+            'pass_mark': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
         labels = {
-            'is_active': 'Activate Test'
+            'is_active': 'Activate Test',
+            'pass_mark': 'Pass Mark (%)',
         }
 
 class QuestionForm(forms.ModelForm):
@@ -40,4 +42,25 @@ class QuestionForm(forms.ModelForm):
             'option_d': forms.TextInput(attrs={'class': 'form-control'}),
             'correct_option': forms.Select(attrs={'class': 'form-control'}),
             'marks': forms.NumberInput(attrs={'class': 'form-control'}),
-        }
\ No newline at end of file
+        }
+class QuestionImportForm(QuestionForm):
+    # Validates one row of a bulk import; the technology is chosen once for the whole file
+    class Meta(QuestionForm.Meta):
+        fields = ['question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_option', 'marks']
+
+class QuestionUploadForm(forms.Form):
+    technology = forms.ModelChoiceField(queryset=Technology.objects.order_by('name'),
+                                        widget=forms.Select(attrs={'class': 'form-control'}))
+    file = forms.FileField(help_text="CSV with a header row, a JSON array of objects, or JSON Lines (.jsonl). "
+                                     "Columns: question_text, option_a, option_b, option_c, option_d, correct_option, marks (optional).",
+                           widget=forms.ClearableFileInput(attrs={'class': 'form-control'}))
+
+class QuestionSearchForm(forms.Form):
+    q = forms.CharField(required=False, label="Search",
+                        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Search question text and options'}))
+    technology = forms.ModelChoiceField(queryset=Technology.objects.order_by('name'), required=False, empty_label="All technologies",
+                                        widget=forms.Select(attrs={'class': 'form-control'}))
+
+class NearDuplicateReportForm(forms.Form):
+    technology = forms.ModelChoiceField(queryset=Technology.objects.order_by('name'),
+                                        widget=forms.Select(attrs={'class': 'form-control'}))
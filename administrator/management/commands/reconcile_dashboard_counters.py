@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from administrator.stats import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the admin dashboard counters from the real table counts and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Keep running and reconcile every INTERVAL seconds (default: reconcile once and exit).")
+
+    def handle(self, *args, **options):
+        while True:
+            drift = reconcile_counters()
+            for name, (stored, actual) in drift.items():
+                self.stdout.write(f"{name}: {stored} -> {actual}")
+            self.stdout.write(f"Reconciled dashboard counters ({len(drift)} corrected).")
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
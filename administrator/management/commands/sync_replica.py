@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from ExamHub.routers import get_reporting_database
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database to the reporting replica (REPORTING_DATABASE)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Write the copy to this file instead of the replica's NAME.")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Keep running and copy every INTERVAL seconds (default: copy once and exit).")
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError("sync_replica copies SQLite files; replicate other databases with their own tools.")
+        path = options['output']
+        if not path:
+            alias = get_reporting_database()
+            if alias == DEFAULT_DB_ALIAS:
+                raise CommandError("No replica is configured: add the REPORTING_DATABASE alias to DATABASES, or pass --output.")
+            path = connections.settings[alias]['NAME']
+
+        while True:
+            started = time.monotonic()
+            primary.ensure_connection()
+            replica = sqlite3.connect(path)
+            try:
+                # A consistent snapshot of the primary, written to the replica in one transaction:
+                # writers on the primary aren't blocked (WAL) and reporting reads see either copy
+                primary.connection.backup(replica)
+            finally:
+                replica.close()
+            self.stdout.write(f"Copied the primary database to {path} in {time.monotonic() - started:.2f}s.")
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
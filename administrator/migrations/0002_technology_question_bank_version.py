@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='technology',
+            name='question_bank_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Bumped whenever this technology's questions change."),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:36
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0002_technology_question_bank_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testschedule',
+            name='pass_mark',
+            field=models.DecimalField(decimal_places=2, default=50, help_text='Minimum score (%) needed to pass this test.', max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+    ]
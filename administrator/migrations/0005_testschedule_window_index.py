@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0004_dashboardcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='testschedule',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['start_time', 'end_time'], name='schedule_active_window_idx'),
+        ),
+    ]
@@ -1,10 +1,14 @@
 from django.db import models
+from django.db.models import Q
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User # Django's built-in User model
 
 # Model for Technologies (e.g., Python, Java, Django)
 class Technology(models.Model):
     name = models.CharField(max_length=100, unique=True, help_text="e.g., Python, Django, SQL")
     description = models.TextField(blank=True, null=True)
+    question_bank_version = models.PositiveIntegerField(default=0, editable=False,
+                                                        help_text="Bumped whenever this technology's questions change.")
 
     class Meta:
         verbose_name_plural = "Technologies" # Correct plural in admin
@@ -21,10 +25,34 @@ class TestSchedule(models.Model):
     duration_minutes = models.IntegerField(default=60, help_text="Duration of the test in minutes.")
     total_questions = models.IntegerField(default=50, help_text="Number of questions to randomly select for this test.")
     is_active = models.BooleanField(default=False, help_text="Check to make this test schedule active and visible to employees.")
+    pass_mark = models.DecimalField(max_digits=5, decimal_places=2, default=50,
+                                    validators=[MinValueValidator(0), MaxValueValidator(100)],
+                                    help_text="Minimum score (%) needed to pass this test.")
 
     class Meta:
         ordering = ['-start_time'] # Order by latest test first
+        indexes = [
+            # Schedules open now / opening next. Partial, since boolean filters compile to a bare
+            # `WHERE is_active` that a composite index can't use as an equality
+            models.Index(fields=['start_time', 'end_time'], condition=Q(is_active=True), name='schedule_active_window_idx'),
+        ]
 
     def __str__(self):
         return f"{self.technology.name} Test ({self.start_time.strftime('%Y-%m-%d %H:%M')})"
 
+    def is_pass(self, score):
+        return score is not None and score >= self.pass_mark
+
+
+# Model for the admin dashboard's totals, kept up to date incrementally (see administrator/stats.py)
+class DashboardCounter(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True,
+                                         help_text="Last time the value was recomputed from the real row count.")
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
@@ -0,0 +1,77 @@
+import base64
+import binascii
+import json
+from functools import reduce
+
+from django.conf import settings
+from django.db.models import Q
+
+# Keyset ("cursor") pagination for the admin listings. Instead of OFFSET, each page continues
+# after the sort key of the previous page's last row, so every page costs the same index range
+# scan no matter how deep into the table it is. The ordering must end with a unique field (id).
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_query, first_query, is_first):
+        self.object_list = object_list
+        self.next_query = next_query # Query string for the next page, or None on the last page
+        self.first_query = first_query # Query string for the first page (other filters kept)
+        self.is_first = is_first
+
+    @property
+    def has_next(self):
+        return self.next_query is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor, length):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return values if isinstance(values, list) and len(values) == length else None
+
+
+def keyset_filter(ordering, values):
+    """Rows strictly after `values` in `ordering`: (a > x) OR (a = x AND b > y) OR ..."""
+    condition = Q()
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': values[index]})
+        for previous_field, previous_value in zip(ordering[:index], values[:index]):
+            step &= Q(**{previous_field.lstrip('-'): previous_value})
+        condition |= step
+    return condition
+
+
+def paginate_keyset(request, queryset, ordering, page_size=None, cursor_param='cursor'):
+    page_size = page_size or getattr(settings, 'ADMIN_LIST_PAGE_SIZE', 50)
+    queryset = queryset.order_by(*ordering)
+
+    values = decode_cursor(request.GET.get(cursor_param, ''), len(ordering))
+    if values is not None:
+        queryset = queryset.filter(keyset_filter(ordering, values))
+
+    rows = list(queryset[:page_size + 1]) # One extra row tells whether there is a next page
+    query = request.GET.copy()
+    query.pop(cursor_param, None)
+    first_query = query.urlencode()
+    next_query = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        query[cursor_param] = encode_cursor([
+            reduce(getattr, field.lstrip('-').split('__'), last) for field in ordering
+        ])
+        next_query = query.urlencode()
+    return KeysetPage(rows, next_query, first_query, is_first=values is None)
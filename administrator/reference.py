@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ExamHub.routers import use_primary
+from .models import Technology
+
+# Reference data that many pages show and that rarely changes (the list of technologies, for
+# filter dropdowns and the technology management page), kept in the Django cache until a row
+# changes (invalidated by administrator/signals.py). Entries are plain dicts, ordered by name.
+
+TECHNOLOGIES_KEY = 'reference:technologies'
+DEFAULT_REFERENCE_DATA_SECONDS = 24 * 60 * 60
+
+
+def get_technologies():
+    technologies = cache.get(TECHNOLOGIES_KEY)
+    if technologies is None:
+        # From the primary even in reporting views: a lagging replica would put a list from
+        # before the last change back into the cache, after the change invalidated it
+        with use_primary():
+            technologies = list(Technology.objects.order_by('name').values('id', 'name', 'description'))
+        timeout = getattr(settings, 'REFERENCE_DATA_CACHE_SECONDS', DEFAULT_REFERENCE_DATA_SECONDS)
+        cache.set(TECHNOLOGIES_KEY, technologies, timeout)
+    return technologies
+
+
+def invalidate_technologies():
+    # After commit, so a concurrent request can't cache the list from before the change
+    transaction.on_commit(lambda: cache.delete(TECHNOLOGIES_KEY))
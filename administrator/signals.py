@@ -0,0 +1,69 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Technology, TestSchedule
+from .reference import invalidate_technologies
+from .stats import increment_counters
+from questionbank.models import Question
+from employee.models import EmployeeProfile, EmployeeTestAttempt
+
+# Keeps the dashboard counters (administrator/stats.py) in step with row-by-row model writes.
+# Queryset-level bulk writes don't send these signals; code doing them adjusts the counters itself.
+
+# Models whose rows are counted: model -> (total counter, (flag field, counter of rows with the flag set))
+COUNTED_MODELS = {
+    Technology: ('total_technologies', None),
+    TestSchedule: ('total_test_schedules', ('is_active', 'active_test_schedules')),
+    Question: ('total_questions', None),
+    EmployeeProfile: ('total_employees', None),
+    EmployeeTestAttempt: ('total_exam_attempts', ('is_completed', 'completed_exam_attempts')),
+}
+
+
+def flag_value(instance, field):
+    # Deferred fields aren't in __dict__; reading them would cost a query, so treat them as unknown
+    return instance.__dict__.get(field)
+
+
+@receiver(post_init, sender=TestSchedule)
+@receiver(post_init, sender=EmployeeTestAttempt)
+def remember_counted_flag(sender, instance, **kwargs):
+    field, _ = COUNTED_MODELS[sender][1]
+    instance._counted_flag = flag_value(instance, field)
+
+
+def counted_model_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return # Fixture loading; reconcile picks these rows up
+    total_counter, flagged = COUNTED_MODELS[sender]
+    deltas = {total_counter: 1} if created else {}
+    if flagged:
+        field, flag_counter = flagged
+        previous = False if created else getattr(instance, '_counted_flag', None)
+        current = flag_value(instance, field)
+        if (update_fields is None or field in update_fields) and previous is not None and current is not None:
+            deltas[flag_counter] = int(bool(current)) - int(bool(previous))
+        instance._counted_flag = current
+    increment_counters(**deltas)
+
+
+def counted_model_deleted(sender, instance, **kwargs):
+    total_counter, flagged = COUNTED_MODELS[sender]
+    deltas = {total_counter: -1}
+    if flagged:
+        field, flag_counter = flagged
+        if flag_value(instance, field):
+            deltas[flag_counter] = -1
+    increment_counters(**deltas)
+
+
+for counted_model in COUNTED_MODELS:
+    post_save.connect(counted_model_saved, sender=counted_model, dispatch_uid=f'dashboard_counter_save_{counted_model.__name__}')
+    post_delete.connect(counted_model_deleted, sender=counted_model, dispatch_uid=f'dashboard_counter_delete_{counted_model.__name__}')
+
+
+@receiver(post_save, sender=Technology, dispatch_uid='reference_technologies_save')
+@receiver(post_delete, sender=Technology, dispatch_uid='reference_technologies_delete')
+def technology_changed(sender, **kwargs):
+    # Drops the cached technology list (administrator/reference.py), fixture loads included
+    invalidate_technologies()
@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ExamHub.routers import use_primary
+from .models import Technology, TestSchedule, DashboardCounter
+from questionbank.models import Question
+from employee.models import EmployeeProfile, EmployeeTestAttempt
+
+# The admin dashboard shows row counts of several large tables. Instead of counting them on
+# every page load, each total lives in a DashboardCounter row that is adjusted as rows are
+# created, changed and deleted (administrator/signals.py, plus bulk writes that bypass signals),
+# and periodically recomputed from the real tables (`reconcile_dashboard_counters`).
+
+COUNTERS = {
+    'total_technologies': lambda: Technology.objects.count(),
+    'total_test_schedules': lambda: TestSchedule.objects.count(),
+    'active_test_schedules': lambda: TestSchedule.objects.filter(is_active=True).count(),
+    'total_questions': lambda: Question.objects.count(),
+    'total_employees': lambda: EmployeeProfile.objects.count(),
+    'total_exam_attempts': lambda: EmployeeTestAttempt.objects.count(),
+    'completed_exam_attempts': lambda: EmployeeTestAttempt.objects.filter(is_completed=True).count(),
+}
+
+
+def increment_counters(**deltas):
+    """Add the given deltas to the named counters once the current transaction commits.
+
+    Applying them after commit keeps rolled-back writes out of the totals and avoids holding
+    a lock on the (hot) counter rows for the rest of the transaction.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(lambda: apply_counter_deltas(deltas))
+
+
+def apply_counter_deltas(deltas):
+    missing = []
+    for name, delta in deltas.items():
+        if not DashboardCounter.objects.filter(name=name).update(value=F('value') + delta):
+            missing.append(name)
+    if missing:
+        # Never counted yet: start it from the real count, which already includes this change
+        reconcile_counters(missing)
+
+
+def reconcile_counters(names=None):
+    """Recompute counters from the real tables; returns {name: (stored value, actual value)} for any that drifted."""
+    names = list(names or COUNTERS)
+    now = timezone.now()
+    # Counted on the primary even when called from a reporting view, as the result is written there
+    with use_primary():
+        stored = dict(DashboardCounter.objects.filter(name__in=names).values_list('name', 'value'))
+        actual = {name: COUNTERS[name]() for name in names}
+    DashboardCounter.objects.bulk_create(
+        [DashboardCounter(name=name, value=value, reconciled_at=now) for name, value in actual.items()],
+        update_conflicts=True,
+        unique_fields=['name'],
+        update_fields=['value', 'reconciled_at'],
+    )
+    return {
+        name: (stored[name], value)
+        for name, value in actual.items()
+        if name in stored and stored[name] != value
+    }
+
+
+def get_dashboard_counters():
+    """All dashboard totals from a single query (counters that don't exist yet are computed first)."""
+    counters = dict(DashboardCounter.objects.filter(name__in=COUNTERS).values_list('name', 'value'))
+    missing = [name for name in COUNTERS if name not in counters]
+    if missing:
+        reconcile_counters(missing)
+        with use_primary(): # Not on the replica until it is next synced
+            counters.update(DashboardCounter.objects.filter(name__in=missing).values_list('name', 'value'))
+    return counters
@@ -1,12 +1,329 @@
-from django.test import TestCase
-
-# Create your tests here.
-# Example:
-# from .models import Technology
-#
-# class TechnologyModelTest(TestCase):
-#     def test_technology_creation(self):
-#         technology = Technology.objects.create(name="Python", description="Programming language")
-#         self.assertEqual(technology.name, "Python")
-#         self.assertEqual(technology.description, "Programming language")
-#         self.assertTrue(Technology.objects.filter(name="Python").exists())
\ No newline at end of file
+import datetime
+import io
+import os
+import sqlite3
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ExamHub.routers import ReplicaRouter, get_reporting_database, use_primary, use_replica
+from .models import Technology, TestSchedule, DashboardCounter
+from .reference import get_technologies
+from .stats import COUNTERS, get_dashboard_counters, reconcile_counters
+from employee.expiry import finalize_attempts
+from employee.models import EmployeeProfile, EmployeeTestAttempt
+from questionbank.models import Question
+from results.declaration import declare_schedule_results
+from results.models import EmployeeResult
+
+
+def walk_pages(client, url):
+    """Follow the "next page" links of a keyset-paginated listing; returns each page's rows."""
+    pages = []
+    query = ''
+    while query is not None:
+        response = client.get(f'{url}?{query}')
+        page = response.context['page']
+        pages.append(list(page))
+        query = page.next_query
+    return pages
+
+
+@override_settings(ADMIN_LIST_PAGE_SIZE=5)
+class AdminListingPaginationTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(self.admin)
+        self.python = Technology.objects.create(name='Python')
+        self.django = Technology.objects.create(name='Django')
+        self.now = timezone.now()
+
+    def add_questions(self, count):
+        Question.objects.bulk_create([
+            Question(technology=self.python if i % 2 else self.django, question_text=f'Question {i}',
+                     option_a='a', option_b='b', option_c='c', option_d='d', correct_option='A')
+            for i in range(count)
+        ])
+
+    def add_schedules(self, count):
+        # Several schedules share a start time so the id tie-breaker is exercised
+        TestSchedule.objects.bulk_create([
+            TestSchedule(technology=self.python, start_time=self.now + datetime.timedelta(days=i // 3),
+                         end_time=self.now + datetime.timedelta(days=30))
+            for i in range(count)
+        ])
+
+    def add_completed_attempts(self, count):
+        schedule = TestSchedule.objects.create(technology=self.python, start_time=self.now,
+                                               end_time=self.now + datetime.timedelta(days=1))
+        offset = EmployeeProfile.objects.count()
+        for i in range(offset, offset + count):
+            user = User.objects.create_user(f'employee{i}', first_name='Emp', last_name=str(i))
+            employee = EmployeeProfile.objects.create(user=user, employee_id=f'E{i}')
+            EmployeeTestAttempt.objects.create(employee=employee, test_schedule=schedule, is_completed=True,
+                                               score=50, end_time=self.now - datetime.timedelta(minutes=i // 4))
+
+    def test_question_pages_cover_every_row_once(self):
+        self.add_questions(23)
+        pages = walk_pages(self.client, reverse('admin_manage_questions'))
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        ids = [question.id for page in pages for question in page]
+        expected = list(Question.objects.order_by('technology__name', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_schedule_pages_cover_every_row_once(self):
+        self.add_schedules(17)
+        pages = walk_pages(self.client, reverse('admin_manage_tests'))
+        ids = [schedule.id for page in pages for schedule in page]
+        expected = list(TestSchedule.objects.order_by('-start_time', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_exam_result_pages_cover_every_row_once(self):
+        self.add_completed_attempts(13)
+        pages = walk_pages(self.client, reverse('admin_view_all_exam_results'))
+        ids = [attempt.id for page in pages for attempt in page]
+        expected = list(EmployeeTestAttempt.objects.filter(is_completed=True).order_by(
+            '-end_time', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_query_budget_does_not_grow_with_rows(self):
+        # Session + user lookups, then a single query for the page with related rows joined in;
+        # the question list also loads its technology filter, and the exam results page checks the
+        # leaderboards of the schedules on the page
+        budgets = {'admin_manage_questions': 4, 'admin_manage_tests': 3, 'admin_view_all_exam_results': 4}
+        self.add_questions(6)
+        self.add_schedules(6)
+        self.add_completed_attempts(6)
+        for url, budget in budgets.items():
+            self.client.get(reverse(url)) # Loads the leaderboards of this process
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                self.client.get(reverse(url))
+
+        self.add_questions(60)
+        self.add_schedules(60)
+        self.add_completed_attempts(20)
+        for url, budget in budgets.items():
+            self.client.get(reverse(url))
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                response = self.client.get(reverse(url))
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                self.client.get(f"{reverse(url)}?{response.context['page'].next_query}")
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        self.add_questions(8)
+        response = self.client.get(reverse('admin_manage_questions'), {'cursor': 'not-a-cursor'})
+        self.assertTrue(response.context['page'].is_first)
+        self.assertEqual(len(response.context['page']), 5)
+
+
+class BulkResultDeclarationTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(self.admin)
+        now = timezone.now()
+        technology = Technology.objects.create(name='Python')
+        self.schedule = TestSchedule.objects.create(technology=technology, start_time=now, pass_mark=60,
+                                                    end_time=now + datetime.timedelta(days=1))
+        self.attempts = []
+        for i, score in enumerate([80, 60, 59.99, 10]):
+            user = User.objects.create_user(f'employee{i}')
+            employee = EmployeeProfile.objects.create(user=user, employee_id=f'E{i}')
+            self.attempts.append(EmployeeTestAttempt.objects.create(
+                employee=employee, test_schedule=self.schedule, is_completed=True, score=score, end_time=now))
+
+    def declare(self):
+        return self.client.post(reverse('admin_declare_test_results', args=[self.schedule.id]), follow=True)
+
+    def test_declares_every_attempt_against_the_schedule_pass_mark(self):
+        EmployeeResult.objects.create(employee=self.attempts[0].employee, test_schedule=self.schedule,
+                                      score=0, passed=False, remarks='Keep me')
+        response = self.declare()
+        self.assertContains(response, '3 created, 1 updated')
+
+        results = {result.employee_id: result for result in EmployeeResult.objects.filter(test_schedule=self.schedule)}
+        self.assertEqual(len(results), 4)
+        self.assertEqual([results[attempt.employee_id].passed for attempt in self.attempts], [True, True, False, False])
+        for attempt in self.attempts:
+            self.assertEqual(results[attempt.employee_id].test_attempt_id, attempt.id)
+            self.assertEqual(results[attempt.employee_id].declared_by, self.admin)
+        self.assertEqual(results[self.attempts[0].employee_id].remarks, 'Keep me')
+        self.assertEqual(results[self.attempts[0].employee_id].score, 80)
+
+    def test_redeclaring_updates_and_query_count_is_fixed(self):
+        self.declare()
+        self.schedule.pass_mark = 50
+        self.schedule.save()
+        with self.assertNumQueries(5): # Attempts, then existing results and one upsert inside a savepoint
+            declare_schedule_results(self.schedule, self.admin)
+        self.assertEqual(EmployeeResult.objects.filter(test_schedule=self.schedule, passed=True).count(), 3)
+        self.assertContains(self.declare(), '0 created, 4 updated')
+
+    def test_single_declaration_links_attempt_and_uses_pass_mark(self):
+        self.client.get(reverse('admin_declare_result', args=[self.attempts[1].id]))
+        result = EmployeeResult.objects.get(employee=self.attempts[1].employee)
+        self.assertTrue(result.passed)
+        self.assertEqual(result.test_attempt, self.attempts[1])
+
+
+class DashboardCounterTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(self.admin)
+        self.technology = Technology.objects.create(name='Python')
+
+    def assertCountersMatchTables(self):
+        self.assertEqual(get_dashboard_counters(), {name: count() for name, count in COUNTERS.items()})
+
+    def test_dashboard_reads_counters_in_one_query(self):
+        get_dashboard_counters() # Creates the counter rows
+        with self.assertNumQueries(3): # Session, user, counters
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.context['total_technologies'], 1)
+
+    def test_counters_follow_saves_and_deletes(self):
+        get_dashboard_counters()
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule = TestSchedule.objects.create(technology=self.technology, start_time=now,
+                                                   end_time=now + datetime.timedelta(hours=1))
+            Question.objects.create(technology=self.technology, question_text='Q', option_a='a', option_b='b',
+                                    option_c='c', option_d='d', correct_option='A')
+            employee = EmployeeProfile.objects.create(user=User.objects.create_user('employee'), employee_id='E1')
+            attempt = EmployeeTestAttempt.objects.create(employee=employee, test_schedule=schedule)
+        self.assertCountersMatchTables()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule = TestSchedule.objects.get(id=schedule.id)
+            schedule.is_active = True
+            schedule.save()
+            attempt.is_completed = True
+            attempt.save(update_fields=['is_completed'])
+        self.assertEqual(get_dashboard_counters()['active_test_schedules'], 1)
+        self.assertCountersMatchTables()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.technology.delete() # Cascades to the schedule, question and attempt
+        self.assertCountersMatchTables()
+
+    def test_expired_attempts_finalized_in_bulk_are_counted(self):
+        now = timezone.now()
+        schedule = TestSchedule.objects.create(technology=self.technology, start_time=now,
+                                               end_time=now + datetime.timedelta(hours=1))
+        for i in range(3):
+            employee = EmployeeProfile.objects.create(user=User.objects.create_user(f'employee{i}'), employee_id=f'E{i}')
+            EmployeeTestAttempt.objects.create(employee=employee, test_schedule=schedule)
+        get_dashboard_counters()
+        with self.captureOnCommitCallbacks(execute=True):
+            finalize_attempts(list(EmployeeTestAttempt.objects.values_list('id', flat=True)))
+        self.assertEqual(get_dashboard_counters()['completed_exam_attempts'], 3)
+
+    def test_reconcile_corrects_drift(self):
+        get_dashboard_counters()
+        DashboardCounter.objects.filter(name='total_technologies').update(value=42)
+        self.assertEqual(reconcile_counters(), {'total_technologies': (42, 1)})
+        self.assertCountersMatchTables()
+
+
+class TechnologyListCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.python = Technology.objects.create(name='Python', description='Language')
+            Technology.objects.create(name='Django')
+
+    def test_list_is_read_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual([technology['name'] for technology in get_technologies()], ['Django', 'Python'])
+        with self.assertNumQueries(0):
+            get_technologies()
+        with self.assertNumQueries(2): # Session and user only
+            response = self.client.get(reverse('admin_manage_technologies'))
+        self.assertContains(response, 'Language')
+
+    def test_saves_and_deletes_invalidate_the_list(self):
+        get_technologies()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.python.name = 'Python 3'
+            self.python.save()
+        self.assertEqual([technology['name'] for technology in get_technologies()], ['Django', 'Python 3'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin_add_technology'), {'name': 'Go', 'description': ''})
+        self.assertContains(self.client.get(reverse('admin_manage_technologies')), 'Go')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.python.delete()
+        self.assertEqual([technology['name'] for technology in get_technologies()], ['Django', 'Go'])
+
+    def test_list_is_kept_until_the_change_commits(self):
+        get_technologies()
+        with self.captureOnCommitCallbacks(execute=False):
+            Technology.objects.create(name='Rust')
+        with self.assertNumQueries(0):
+            get_technologies()
+
+
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(self.admin)
+        Technology.objects.create(name='Python')
+
+    def configure_replica(self):
+        # Only the alias's settings: nothing here connects to it
+        connections.settings['replica'] = {**connections['default'].settings_dict, 'NAME': 'replica.sqlite3'}
+        self.addCleanup(connections.settings.pop, 'replica')
+
+    def test_reporting_reads_go_to_the_replica(self):
+        self.configure_replica()
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Technology))
+        with use_replica():
+            self.assertEqual(router.db_for_read(Technology), 'replica')
+            self.assertEqual(EmployeeTestAttempt.objects.all().db, 'replica')
+            self.assertEqual(router.db_for_write(Technology), 'default')
+            with use_primary():
+                self.assertEqual(EmployeeTestAttempt.objects.all().db, 'default')
+        self.assertEqual(EmployeeTestAttempt.objects.all().db, 'default')
+        self.assertIs(router.allow_migrate('replica', 'administrator'), False)
+        self.assertIsNone(router.allow_migrate('default', 'administrator'))
+
+    def test_without_a_replica_everything_reads_the_primary(self):
+        self.assertEqual(get_reporting_database(), 'default')
+        with use_replica():
+            self.assertEqual(EmployeeTestAttempt.objects.all().db, 'default')
+        for name in ['admin_dashboard', 'admin_view_all_exam_results', 'view_all_results']:
+            self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+        self.assertEqual(self.client.get(reverse('export_results'), {'format': 'csv'}).status_code, 200)
+
+
+
+class SyncReplicaTest(TransactionTestCase):
+    # Not in a test transaction: the backup waits for the primary's open write transactions
+
+    def test_sync_replica_copies_the_primary(self):
+        Technology.objects.create(name='Python')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replica.sqlite3')
+            for expected in [1, 2]:
+                call_command('sync_replica', output=path, stdout=io.StringIO())
+                replica = sqlite3.connect(path)
+                try:
+                    count = replica.execute(f"SELECT COUNT(*) FROM {Technology._meta.db_table}").fetchone()[0]
+                finally:
+                    replica.close()
+                self.assertEqual(count, expected)
+                Technology.objects.create(name=f'Technology {expected}') # Picked up by the next sync
+
+    def test_sync_replica_needs_a_replica(self):
+        with self.assertRaisesMessage(CommandError, "No replica is configured"):
+            call_command('sync_replica', stdout=io.StringIO())
@@ -14,9 +14,12 @@ urlpatterns = [
     path('tests/add/', views.add_test_schedule, name='admin_add_test_schedule'),
     path('tests/update/<int:test_id>/', views.update_test_schedule, name='admin_update_test_schedule'),
     path('tests/delete/<int:test_id>/', views.delete_test_schedule, name='admin_delete_test_schedule'),
+    path('tests/<int:test_id>/declare-results/', views.declare_test_results, name='admin_declare_test_results'),
 
     path('questions/', views.manage_questions, name='admin_manage_questions'),
     path('questions/add/', views.add_question, name='admin_add_question'),
+    path('questions/import/', views.import_questions_view, name='admin_import_questions'),
+    path('questions/near-duplicates/', views.near_duplicate_report, name='admin_near_duplicate_report'),
     path('questions/update/<int:question_id>/', views.update_question, name='admin_update_question'),
     path('questions/delete/<int:question_id>/', views.delete_question, name='admin_delete_question'),
 
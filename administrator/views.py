@@ -1,14 +1,24 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.db.models import Sum, Count
 
+from ExamHub.routers import reads_from_replica
 from .models import Technology, TestSchedule
+from .pagination import paginate_keyset
+from .reference import get_technologies
+from .stats import get_dashboard_counters
 from questionbank.models import Question # Import Question model from questionbank
+from questionbank.papers import papers_need_preparing, pregenerate_papers
+from questionbank.importer import import_questions, open_records
+from questionbank.search import search_questions
+from questionbank.similarity import find_near_duplicates, near_duplicate_groups
 from employee.models import EmployeeProfile, EmployeeTestAttempt # Import from employee app
 from results.models import EmployeeResult # Import from results app
+from results.declaration import declare_schedule_results
+from results.leaderboard import attach_rankings
 
-from .forms import TechnologyForm, TestScheduleForm, QuestionForm
+from .forms import TechnologyForm, TestScheduleForm, QuestionForm, QuestionUploadForm, QuestionSearchForm, NearDuplicateReportForm
 from results.forms import EmployeeResultForm # Assuming you have a form for declaring results
 
 # Helper function to check if the user is an administrator (staff status)
@@ -18,24 +28,10 @@ def is_admin(user):
 # --- Admin Dashboard ---
 @login_required
 @user_passes_test(is_admin, login_url='/employee/login/') # Redirect to employee login if not admin
+@reads_from_replica
 def admin_dashboard(request):
-    total_technologies = Technology.objects.count()
-    total_test_schedules = TestSchedule.objects.count()
-    active_test_schedules = TestSchedule.objects.filter(is_active=True).count()
-    total_questions = Question.objects.count()
-    total_employees = EmployeeProfile.objects.count()
-    total_exam_attempts = EmployeeTestAttempt.objects.count()
-    completed_exam_attempts = EmployeeTestAttempt.objects.filter(is_completed=True).count()
-
-    context = {
-        'total_technologies': total_technologies,
-        'total_test_schedules': total_test_schedules,
-        'active_test_schedules': active_test_schedules,
-        'total_questions': total_questions,
-        'total_employees': total_employees,
-        'total_exam_attempts': total_exam_attempts,
-        'completed_exam_attempts': completed_exam_attempts,
-    }
+    # Totals are maintained incrementally in DashboardCounter rows and read in one query
+    context = get_dashboard_counters()
     return render(request, 'admin/dashboard.html', context)
 
 
@@ -43,8 +39,7 @@ def admin_dashboard(request):
 @login_required
 @user_passes_test(is_admin, login_url='/employee/login/')
 def manage_technologies(request):
-    technologies = Technology.objects.all().order_by('name')
-    context = {'technologies': technologies}
+    context = {'technologies': get_technologies()}
     return render(request, 'admin/technology_management.html', context)
 
 @login_required
@@ -87,11 +82,19 @@ def delete_technology(request, tech_id):
     return redirect('admin_manage_technologies')
 
 # --- Test Schedule Management ---
+def prepare_papers_if_activated(request, test_schedule, form):
+    # Build candidate papers when a schedule is switched on, so the start-of-exam rush only claims them;
+    # and again when an active schedule's papers change shape, replacing the ones prepared before
+    if papers_need_preparing(test_schedule, form.changed_data):
+        prepared = pregenerate_papers(test_schedule)
+        if prepared:
+            messages.info(request, f"{prepared} question papers prepared for this test.")
+
 @login_required
 @user_passes_test(is_admin, login_url='/employee/login/')
 def manage_tests(request):
-    test_schedules = TestSchedule.objects.all().order_by('-start_time')
-    context = {'test_schedules': test_schedules}
+    test_schedules = paginate_keyset(request, TestSchedule.objects.select_related('technology'), ['-start_time', '-id'])
+    context = {'test_schedules': test_schedules, 'page': test_schedules}
     return render(request, 'admin/test_scheduling.html', context)
 
 @login_required
@@ -100,8 +103,9 @@ def add_test_schedule(request):
     if request.method == 'POST':
         form = TestScheduleForm(request.POST)
         if form.is_valid():
-            form.save()
+            test_schedule = form.save()
             messages.success(request, "Test schedule added successfully!")
+            prepare_papers_if_activated(request, test_schedule, form)
             return redirect('admin_manage_tests')
     else:
         form = TestScheduleForm()
@@ -114,8 +118,9 @@ def update_test_schedule(request, test_id):
     if request.method == 'POST':
         form = TestScheduleForm(request.POST, instance=test_schedule)
         if form.is_valid():
-            form.save()
+            test_schedule = form.save()
             messages.success(request, "Test schedule updated successfully!")
+            prepare_papers_if_activated(request, test_schedule, form)
             return redirect('admin_manage_tests')
     else:
         form = TestScheduleForm(instance=test_schedule)
@@ -133,41 +138,84 @@ def delete_test_schedule(request, test_id):
             messages.error(request, f"Error deleting test schedule: {e}")
     return redirect('admin_manage_tests')
 
+@login_required
+@user_passes_test(is_admin, login_url='/employee/login/')
+def declare_test_results(request, test_id):
+    # Declares results for every completed attempt of the schedule in one go
+    test_schedule = get_object_or_404(TestSchedule, id=test_id)
+    if request.method == 'POST':
+        created, updated = declare_schedule_results(test_schedule, request.user)
+        if created or updated:
+            messages.success(request, f"Results declared for {test_schedule}: {created} created, {updated} updated "
+                                      f"(pass mark {test_schedule.pass_mark}%).")
+        else:
+            messages.info(request, f"No completed attempts to declare for {test_schedule}.")
+    return redirect('admin_manage_tests')
+
 
 # --- Question Management (Integrated with questionbank app's models) ---
 @login_required
 @user_passes_test(is_admin, login_url='/employee/login/')
 def manage_questions(request):
-    questions = Question.objects.all().order_by('technology__name', 'id')
-    context = {'questions': questions}
+    search_form = QuestionSearchForm(request.GET)
+    query, technology = '', None
+    if search_form.is_valid():
+        query, technology = search_form.cleaned_data['q'].strip(), search_form.cleaned_data['technology']
+
+    if query:
+        # Ranked full-text matches, best first (capped at QUESTION_SEARCH_MAX_RESULTS, so not paginated)
+        questions = search_questions(query, technology_id=technology.id if technology else None)
+        page = None
+    else:
+        all_questions = Question.objects.select_related('technology')
+        if technology:
+            all_questions = all_questions.filter(technology=technology)
+        questions = page = paginate_keyset(request, all_questions, ['technology__name', 'id'])
+    context = {'questions': questions, 'page': page, 'search_form': search_form, 'query': query}
     return render(request, 'admin/question_management.html', context)
 
+def near_duplicates_to_confirm(request, form):
+    # Near-duplicates of the question being saved, shown for confirmation unless the admin chose "save anyway"
+    if request.POST.get('allow_near_duplicate'):
+        return []
+    if not set(form.changed_data) & {'technology', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d'}:
+        return []
+    return find_near_duplicates(form.instance)
+
 @login_required
 @user_passes_test(is_admin, login_url='/employee/login/')
 def add_question(request):
+    near_duplicates = []
     if request.method == 'POST':
         form = QuestionForm(request.POST)
         if form.is_valid():
-            form.save()
-            messages.success(request, "Question added successfully!")
-            return redirect('admin_manage_questions')
+            near_duplicates = near_duplicates_to_confirm(request, form)
+            if not near_duplicates:
+                form.save()
+                messages.success(request, "Question added successfully!")
+                return redirect('admin_manage_questions')
     else:
         form = QuestionForm()
-    return render(request, 'admin/question_form.html', {'form': form, 'title': 'Add New Question'})
+    context = {'form': form, 'title': 'Add New Question', 'near_duplicates': near_duplicates}
+    return render(request, 'admin/question_form.html', context)
 
 @login_required
 @user_passes_test(is_admin, login_url='/employee/login/')
 def update_question(request, question_id):
     question = get_object_or_404(Question, id=question_id)
+    near_duplicates = []
     if request.method == 'POST':
         form = QuestionForm(request.POST, instance=question)
         if form.is_valid():
-            form.save()
-            messages.success(request, "Question updated successfully!")
-            return redirect('admin_manage_questions')
+            near_duplicates = near_duplicates_to_confirm(request, form)
+            if not near_duplicates:
+                form.save()
+                messages.success(request, "Question updated successfully!")
+                return redirect('admin_manage_questions')
     else:
         form = QuestionForm(instance=question)
-    return render(request, 'admin/question_form.html', {'form': form, 'title': 'Update Question'})
+    context = {'form': form, 'title': 'Update Question', 'near_duplicates': near_duplicates}
+    return render(request, 'admin/question_form.html', context)
 
 @login_required
 @user_passes_test(is_admin, login_url='/employee/login/')
@@ -181,17 +229,60 @@ def delete_question(request, question_id):
             messages.error(request, f"Error deleting question: {e}")
     return redirect('admin_manage_questions')
 
+@login_required
+@user_passes_test(is_admin, login_url='/employee/login/')
+def near_duplicate_report(request):
+    form = NearDuplicateReportForm(request.GET or None)
+    groups = None
+    if form.is_valid():
+        groups = near_duplicate_groups(form.cleaned_data['technology'])
+    return render(request, 'admin/near_duplicate_report.html', {'form': form, 'groups': groups})
+
+@login_required
+@user_passes_test(is_admin, login_url='/employee/login/')
+def import_questions_view(request):
+    report = None
+    if request.method == 'POST':
+        form = QuestionUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            technology = form.cleaned_data['technology']
+            report = import_questions(open_records(upload, upload.name), technology)
+            if report.read_error:
+                row_number, error = report.read_error
+                messages.error(request, f"Could not read the file past row {row_number - 1}: {error}. "
+                                        f"The {report.created} question(s) imported from the rows before it were kept.")
+            else:
+                messages.success(request, f"Imported {report.created} question(s) into {technology.name}; "
+                                          f"{report.duplicates} duplicate(s) skipped, {len(report.errors)} row(s) with errors, "
+                                          f"{len(report.near_duplicates)} near-duplicate(s) flagged.")
+    else:
+        form = QuestionUploadForm()
+    context = {
+        'form': form,
+        'report': report,
+        'errors': report.errors[:200] if report else [], # Enough to fix a file without flooding the page
+        'near_duplicates': report.near_duplicates[:200] if report else [],
+    }
+    return render(request, 'admin/question_import.html', context)
+
 
 # --- Results Management (Admin's view of all results) ---
 @login_required
 @user_passes_test(is_admin, login_url='/employee/login/')
+@reads_from_replica
 def view_all_exam_results(request):
-    # Fetch all completed attempts and their associated results
-    attempts_with_results = EmployeeTestAttempt.objects.filter(is_completed=True).order_by('-end_time')
-    # You might want to filter or paginate these for larger datasets
+    # Fetch completed attempts a page at a time, with everything the table shows joined in
+    attempts_with_results = paginate_keyset(
+        request,
+        EmployeeTestAttempt.objects.filter(is_completed=True).select_related('employee__user', 'test_schedule__technology'),
+        ['-end_time', '-id'],
+    )
+    attach_rankings(list(attempts_with_results))
 
     context = {
         'attempts_with_results': attempts_with_results,
+        'page': attempts_with_results,
     }
     return render(request, 'results/view_results.html', context) # Re-using results app template
 
@@ -199,27 +290,20 @@ def view_all_exam_results(request):
 @login_required
 @user_passes_test(is_admin, login_url='/employee/login/')
 def view_detailed_exam_result(request, attempt_id):
-    attempt = get_object_or_404(EmployeeTestAttempt, id=attempt_id, is_completed=True)
+    attempt = get_object_or_404(
+        EmployeeTestAttempt.objects.select_related('employee__user', 'test_schedule__technology'),
+        id=attempt_id, is_completed=True
+    )
     answers = attempt.answers.all().select_related('question') # Get all answers for this attempt
 
-    # Calculate details for the result page
-    correct_count = 0
-    total_marks_obtained = 0
-    total_possible_marks = 0
-
-    for ans in answers:
-        total_possible_marks += ans.question.marks
-        if ans.selected_option == ans.question.correct_option:
-            correct_count += 1
-            total_marks_obtained += ans.question.marks
-
+    # Details for the result page were stored when the attempt was graded
     context = {
         'attempt': attempt,
         'answers': answers,
-        'correct_count': correct_count,
-        'total_questions': answers.count(),
-        'total_marks_obtained': total_marks_obtained,
-        'total_possible_marks': total_possible_marks,
+        'correct_count': attempt.correct_count,
+        'total_questions': attempt.question_count,
+        'total_marks_obtained': attempt.marks_obtained,
+        'total_possible_marks': attempt.total_marks,
     }
     return render(request, 'results/employee_result.html', context) # Re-using employee result template
 
@@ -227,17 +311,25 @@ def view_detailed_exam_result(request, attempt_id):
 @login_required
 @user_passes_test(is_admin, login_url='/employee/login/')
 def declare_result(request, attempt_id):
-    attempt = get_object_or_404(EmployeeTestAttempt, id=attempt_id, is_completed=True)
+    attempt = get_object_or_404(
+        EmployeeTestAttempt.objects.select_related('employee__user', 'test_schedule__technology'),
+        id=attempt_id, is_completed=True
+    )
     # Check if a result has already been declared for this attempt
     result, created = EmployeeResult.objects.get_or_create(
         employee=attempt.employee,
         test_schedule=attempt.test_schedule,
         defaults={
+            'test_attempt': attempt,
             'score': attempt.score,
             'declared_by': request.user,
-            'passed': attempt.score >= 50 # Example: Pass if score is 50% or more
+            'passed': attempt.test_schedule.is_pass(attempt.score) # Pass mark is set per test schedule
         }
     )
+    if result.test_attempt_id is None:
+        # Results declared before attempts were linked
+        result.test_attempt = attempt
+        result.save(update_fields=['test_attempt'])
 
     if not created:
         messages.info(request, "Result for this attempt has already been declared.")
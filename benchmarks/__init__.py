@@ -0,0 +1,9 @@
+# Benchmark scripts for ExamHub; run them as modules from the project root,
+# e.g. `python -m benchmarks.submit_exam`. Django is configured on package import.
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ExamHub.settings')
+
+import django
+
+django.setup()
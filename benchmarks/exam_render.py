@@ -0,0 +1,101 @@
+"""Benchmark: rendering the question cards of the exam page.
+
+Compares the original per-request template loop (five `get_item` lookups per question)
+with the pre-rendered fragments from `employee.fragments`, for a resumed paper. That both
+render the same cards is checked by the test suite (employee.tests.QuestionCardTest).
+
+    python -m benchmarks.exam_render [--questions 100] [--iterations 200]
+"""
+import argparse
+import random
+
+from django.template import engines
+
+from employee.fragments import render_question_cards
+from questionbank.cache import get_question_bank
+
+from .utils import Timer, benchmark_database, seed_technology, summarize_ms
+
+# The question loop as it was in templates/employee/exam.html before fragments were cached
+LEGACY_TEMPLATE = """{% load dict_extras %}{% for question in questions %}
+        <div class="card mb-3">
+            <div class="card-header">
+                Question {{ forloop.counter }}: <small class="float-end">Marks: {{ question.marks|floatformat:1 }}</small>
+            </div>
+            <div class="card-body">
+                <p class="card-text fw-bold">{{ question.question_text }}</p>
+                <div class="form-check mb-2">
+                    <input class="form-check-input" type="radio" name="question_{{ question.id }}" id="q{{ question.id }}_a" value="A" {% if existing_answers|get_item:question.id == 'A' %}checked{% endif %}>
+                    <label class="form-check-label" for="q{{ question.id }}_a">
+                        A) {{ question.option_a }}
+                    </label>
+                </div>
+                <div class="form-check mb-2">
+                    <input class="form-check-input" type="radio" name="question_{{ question.id }}" id="q{{ question.id }}_b" value="B" {% if existing_answers|get_item:question.id == 'B' %}checked{% endif %}>
+                    <label class="form-check-label" for="q{{ question.id }}_b">
+                        B) {{ question.option_b }}
+                    </label>
+                </div>
+                <div class="form-check mb-2">
+                    <input class="form-check-input" type="radio" name="question_{{ question.id }}" id="q{{ question.id }}_c" value="C" {% if existing_answers|get_item:question.id == 'C' %}checked{% endif %}>
+                    <label class="form-check-label" for="q{{ question.id }}_c">
+                        C) {{ question.option_c }}
+                    </label>
+                </div>
+                <div class="form-check mb-2">
+                    <input class="form-check-input" type="radio" name="question_{{ question.id }}" id="q{{ question.id }}_d" value="D" {% if existing_answers|get_item:question.id == 'D' %}checked{% endif %}>
+                    <label class="form-check-label" for="q{{ question.id }}_d">
+                        D) {{ question.option_d }}
+                    </label>
+                </div>
+                <div class="form-check mb-2">
+                    <input class="form-check-input" type="radio" name="question_{{ question.id }}" id="q{{ question.id }}_none" value="" {% if not existing_answers|get_item:question.id %}checked{% endif %}>
+                    <label class="form-check-label" for="q{{ question.id }}_none">
+                        No Answer / Clear Selection
+                    </label>
+                </div>
+            </div>
+        </div>
+{% endfor %}"""
+
+
+def run(question_count, iterations):
+    technology = seed_technology('RenderBench', question_count)
+    bank = get_question_bank(technology)
+    questions = [bank.questions[question_id] for question_id in random.sample(bank.question_ids, question_count)]
+    existing_answers = {question.id: random.choice('ABCD') for question in questions[: question_count // 2]}
+
+    legacy_template = engines['django'].from_string(LEGACY_TEMPLATE)
+    context = {'questions': questions, 'existing_answers': existing_answers}
+
+    with Timer() as cold:
+        render_question_cards(bank, questions, existing_answers)
+
+    legacy_samples, fragment_samples = [], []
+    for _ in range(iterations):
+        with Timer() as timer:
+            legacy_template.render(context)
+        legacy_samples.append(timer.elapsed)
+        with Timer() as timer:
+            render_question_cards(bank, questions, existing_answers)
+        fragment_samples.append(timer.elapsed)
+
+    legacy, fragments = summarize_ms(legacy_samples), summarize_ms(fragment_samples)
+    print(f"Question cards for a {question_count}-question paper, {iterations} renders each")
+    print(f"{'':>22} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+    print(f"{'template loop':>22} {legacy['p50_ms']:>9} {legacy['p95_ms']:>9} {legacy['mean_ms']:>9}")
+    print(f"{'cached fragments':>22} {fragments['p50_ms']:>9} {fragments['p95_ms']:>9} {fragments['mean_ms']:>9}")
+    print(f"{'first (cold) render':>22} {round(cold.elapsed * 1000, 2):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+    with benchmark_database():
+        run(args.questions, args.iterations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark: item analysis of one test schedule (response matrix load + NumPy statistics).
+
+The target is well under a second for 10,000 attempts x 100 questions, cold (not cached).
+
+    python -m benchmarks.item_analysis [--attempts 10000] [--questions 100]
+"""
+import argparse
+import random
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from employee.models import EmployeeProfile, EmployeeTestAttempt
+from questionbank.cache import get_question_bank
+from questionbank.models import Answer
+from results.analytics import analyze_responses, compute_item_analysis, get_item_analysis, load_response_matrix
+
+from .utils import Timer, benchmark_database, seed_employees, seed_schedule, seed_technology
+
+
+def seed_attempts(test_schedule, question_ids, attempts, batch_size=5000):
+    seed_employees(attempts, prefix='analysis')
+    now = timezone.now()
+    EmployeeTestAttempt.objects.bulk_create([
+        EmployeeTestAttempt(employee=employee, test_schedule=test_schedule, is_completed=True, end_time=now)
+        for employee in EmployeeProfile.objects.all()
+    ], batch_size=batch_size)
+
+    batch = []
+    for attempt_id in EmployeeTestAttempt.objects.values_list('id', flat=True).iterator():
+        for question_id in question_ids:
+            batch.append(Answer(test_attempt_id=attempt_id, question_id=question_id,
+                                selected_option=random.choice('ABCDD') if random.random() > 0.05 else None))
+        if len(batch) >= batch_size:
+            Answer.objects.bulk_create(batch)
+            batch = []
+    Answer.objects.bulk_create(batch)
+
+
+def run(attempts, questions):
+    technology = seed_technology('Analysis', questions)
+    test_schedule = seed_schedule(technology, total_questions=questions)
+    question_ids = list(technology.question_set.values_list('id', flat=True))
+    with Timer() as seeding:
+        seed_attempts(test_schedule, question_ids, attempts)
+    print(f"item analysis: {attempts} attempts x {questions} questions (seeded in {seeding.elapsed:.1f} s)")
+
+    bank = get_question_bank(technology)
+    with Timer() as load:
+        matrix = load_response_matrix(test_schedule)
+    with Timer() as statistics:
+        analysis = analyze_responses(bank, *matrix)
+    with Timer() as total:
+        compute_item_analysis(test_schedule)
+    cache.clear()
+    get_item_analysis(test_schedule)
+    with Timer() as cached:
+        get_item_analysis(test_schedule)
+
+    print(f"{'matrix load ms':>15} {'statistics ms':>14} {'total ms':>9} {'cached ms':>10}")
+    print(f"{load.elapsed * 1000:>15.1f} {statistics.elapsed * 1000:>14.1f} "
+          f"{total.elapsed * 1000:>9.1f} {cached.elapsed * 1000:>10.2f}")
+    assert analysis['attempt_count'] == attempts and analysis['question_count'] == questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--attempts', type=int, default=10000)
+    parser.add_argument('--questions', type=int, default=100)
+    args = parser.parse_args()
+    with benchmark_database():
+        run(args.attempts, args.questions)
+
+
+if __name__ == '__main__':
+    main()
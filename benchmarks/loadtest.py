@@ -0,0 +1,224 @@
+"""Load test: simulated candidates taking an exam concurrently, end to end.
+
+Every candidate logs in, opens the dashboard, starts the exam, loads the remaining paper
+pages, autosaves a few answers, submits and opens the result - all through the real URL
+routes, in-process with the Django test client and one thread per concurrent candidate.
+A file-backed SQLite test database is used so lock contention shows up as it would in
+production. Nothing outside this process is needed.
+
+Per endpoint the run reports p50/p95/p99 latency, throughput, SQL queries per request,
+errors and "database is locked" errors. Results are saved as JSON under
+benchmarks/results/ and compared with the previous run.
+
+    python -m benchmarks.loadtest [--candidates 500] [--concurrency 50] [--questions 2000]
+"""
+import argparse
+import datetime
+import json
+import logging
+import random
+import re
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from .utils import BENCH_PASSWORD, benchmark_database, percentile, seed_employees, seed_schedule, seed_technology
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+QUESTION_FIELD_RE = re.compile(r'name="question_(\d+)"')
+PAPER_URL_RE = re.compile(r'/questionbank/api/attempts/\d+/paper/')
+
+
+class Recorder:
+    """Collects one sample per request, grouped by URL name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, endpoint, elapsed, queries, status, lock_error=False, error=False):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((elapsed, queries, status, lock_error, error))
+
+    def summary(self, wall_time, failed_journeys=0):
+        endpoints = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            latencies = [sample[0] for sample in samples]
+            # Failed requests also run the error handling, so only successful ones count towards queries
+            query_counts = [sample[1] for sample in samples if not sample[4]] or [0]
+            endpoints[endpoint] = {
+                'requests': len(samples),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+                'max_ms': round(max(latencies) * 1000, 2),
+                'throughput_rps': round(len(samples) / wall_time, 2),
+                'avg_queries': round(statistics.fmean(query_counts), 2),
+                'max_queries': max(query_counts),
+                'errors': sum(1 for sample in samples if sample[4]),
+                'lock_errors': sum(1 for sample in samples if sample[3]),
+            }
+        total = sum(endpoint['requests'] for endpoint in endpoints.values())
+        return {
+            'wall_time_s': round(wall_time, 2),
+            'total_requests': total,
+            'throughput_rps': round(total / wall_time, 2),
+            'lock_errors': sum(endpoint['lock_errors'] for endpoint in endpoints.values()),
+            'errors': sum(endpoint['errors'] for endpoint in endpoints.values()),
+            'failed_journeys': failed_journeys, # Candidates stopped by an exception outside a request
+            'endpoints': endpoints,
+        }
+
+
+def timed_request(client, recorder, method, path, data=None, expected=(200, 302, 304)):
+    endpoint = resolve(path.split('?')[0]).url_name
+    lock_error = error = False
+    status = None
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        try:
+            response = client.get(path) if method == 'GET' else client.post(path, data or {})
+            status = response.status_code
+            error = status not in expected
+        except OperationalError as exc:
+            response = None
+            lock_error = 'locked' in str(exc)
+            error = True
+        except Exception:
+            response = None
+            error = True
+        elapsed = time.perf_counter() - start
+    recorder.record(endpoint, elapsed, len(queries), status, lock_error, error)
+    return response
+
+
+def candidate_journey(username, test_schedule_id, recorder, answers_to_autosave, think_time):
+    client = Client()
+    try:
+        timed_request(client, recorder, 'POST', reverse('employee_login'),
+                      {'username': username, 'password': BENCH_PASSWORD})
+        timed_request(client, recorder, 'GET', reverse('employee_dashboard'))
+        response = timed_request(client, recorder, 'GET', reverse('take_exam', args=[test_schedule_id]))
+        if response is None or response.status_code != 200:
+            return
+        # Parse the page like a browser would; response.context isn't reliable across threads
+        html = response.content.decode()
+        question_ids = [int(qid) for qid in dict.fromkeys(QUESTION_FIELD_RE.findall(html))]
+        paper_url = PAPER_URL_RE.search(html)
+        if paper_url:
+            page, has_next = 2, True
+            while has_next:
+                response = timed_request(client, recorder, 'GET', f"{paper_url.group(0)}?page={page}")
+                if response is None or response.status_code != 200:
+                    break
+                paper_page = response.json()
+                question_ids.extend(question['id'] for question in paper_page['questions'])
+                page, has_next = page + 1, paper_page['has_next']
+
+        chosen = {question_id: random.choice('ABCD') for question_id in question_ids}
+        for question_id in random.sample(question_ids, min(answers_to_autosave, len(question_ids))):
+            time.sleep(think_time * random.random())
+            timed_request(client, recorder, 'POST', reverse('autosave_answer', args=[test_schedule_id]),
+                          {'question_id': question_id, 'selected_option': chosen[question_id]})
+
+        response = timed_request(client, recorder, 'POST', reverse('submit_exam', args=[test_schedule_id]),
+                                 {f'question_{question_id}': option for question_id, option in chosen.items()})
+        if response is not None and response.status_code == 302:
+            timed_request(client, recorder, 'GET', response.url)
+    finally:
+        connection.close() # Each worker thread has its own connection
+
+
+def print_report(summary, previous):
+    print(f"\n{'endpoint':<22} {'reqs':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} "
+          f"{'queries':>8} {'errors':>7} {'locked':>7} {'Δp95 ms':>9}")
+    for endpoint, stats in summary['endpoints'].items():
+        delta = ''
+        if previous and endpoint in previous['endpoints']:
+            delta = f"{stats['p95_ms'] - previous['endpoints'][endpoint]['p95_ms']:+.2f}"
+        print(f"{endpoint:<22} {stats['requests']:>6} {stats['p50_ms']:>9} {stats['p95_ms']:>9} "
+              f"{stats['p99_ms']:>9} {stats['throughput_rps']:>8} {stats['avg_queries']:>8} "
+              f"{stats['errors']:>7} {stats['lock_errors']:>7} {delta:>9}")
+    print(f"\n{summary['total_requests']} requests in {summary['wall_time_s']} s "
+          f"({summary['throughput_rps']} req/s), {summary['errors']} errors, "
+          f"{summary['lock_errors']} 'database is locked' errors, {summary['failed_journeys']} failed candidates")
+
+
+def latest_result():
+    results = sorted(RESULTS_DIR.glob('loadtest-*.json'))
+    return json.loads(results[-1].read_text()) if results else None
+
+
+def save_result(summary, options):
+    RESULTS_DIR.mkdir(exist_ok=True)
+    timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = RESULTS_DIR / f"loadtest-{timestamp}.json"
+    path.write_text(json.dumps({'options': options, **summary}, indent=2))
+    return path
+
+
+def run(options):
+    technology = seed_technology('LoadTest', options['questions'])
+    test_schedule = seed_schedule(technology, total_questions=options['paper'])
+    users = seed_employees(options['candidates'], prefix='load')
+
+    recorder = Recorder()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+        futures = [
+            pool.submit(candidate_journey, user.username, test_schedule.id, recorder,
+                        options['autosaves'], options['think_time'])
+            for user in users
+        ]
+    wall_time = time.perf_counter() - start
+    # A journey that raised (outside the requests, which record their own errors) is a failure too
+    failures = [future.exception() for future in futures if future.exception() is not None]
+    if failures:
+        logger.error("%d candidate(s) failed; the first one with:", len(failures), exc_info=failures[0])
+    return recorder.summary(wall_time, failed_journeys=len(failures))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--candidates', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=50, help="Candidates active at the same time.")
+    parser.add_argument('--questions', type=int, default=2000, help="Size of the question bank.")
+    parser.add_argument('--paper', type=int, default=50, help="Questions per paper.")
+    parser.add_argument('--autosaves', type=int, default=5, help="Answers autosaved per candidate before submitting.")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Max seconds a candidate waits between answers.")
+    parser.add_argument('--real-password-hashing', action='store_true',
+                        help="Keep the production password hasher (login then dominates the run).")
+    parser.add_argument('--no-save', action='store_true', help="Don't save the results to benchmarks/results/.")
+    options = vars(parser.parse_args())
+
+    logging.getLogger('django.request').setLevel(logging.CRITICAL) # Errors are counted, not logged
+    if not options['real_password_hashing']:
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+    previous = latest_result()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with benchmark_database(test_db_file=Path(tmp_dir) / 'loadtest.sqlite3'):
+            summary = run(options)
+
+    print(f"Load test: {options['candidates']} candidates, concurrency {options['concurrency']}, "
+          f"{options['questions']}-question bank, {options['paper']}-question papers")
+    print_report(summary, previous)
+    if not options['no_save']:
+        print(f"Saved to {save_result(summary, options)}")
+    if summary['failed_journeys']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
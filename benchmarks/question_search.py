@@ -0,0 +1,79 @@
+"""Benchmark: full-text question search over a large question bank.
+
+The target is a few milliseconds per search over 100,000 questions.
+
+    python -m benchmarks.question_search [--questions 100000] [--searches 200]
+"""
+import argparse
+import random
+
+from django.db import transaction
+
+from administrator.models import Technology
+from questionbank.models import Question
+from questionbank.search import get_search_backend, search_question_ids
+
+from .utils import Timer, benchmark_database, summarize_ms
+
+# A few thousand distinct terms, so most words are about as selective as in a real question bank
+SYLLABLES = 'ka lo mi ne ru ta vo zi pe sa do fu'.split()
+WORDS = sorted({''.join(random.Random(i).choices(SYLLABLES, k=4)) for i in range(5000)})
+COMMON_WORD = 'behave' # In every question
+
+
+def seed_questions(question_count, technologies=10, batch_size=5000):
+    technology_ids = [Technology.objects.create(name=f'Search {i}').id for i in range(technologies)]
+    batch = []
+    for i in range(question_count):
+        words = random.sample(WORDS, 8)
+        batch.append(Question(
+            technology_id=technology_ids[i % technologies],
+            question_text=f"Question {i}: how does a {' '.join(words[:5])} behave?",
+            option_a=words[5], option_b=words[6], option_c=words[7], option_d='none of these',
+            correct_option='A',
+        ))
+        if len(batch) >= batch_size:
+            Question.objects.bulk_create(batch)
+            batch = []
+    Question.objects.bulk_create(batch)
+    with transaction.atomic():
+        get_search_backend().rebuild() # bulk_create bypasses the index signals
+    return technology_ids
+
+
+def run(question_count, searches):
+    with Timer() as seeding:
+        technology_ids = seed_questions(question_count)
+    print(f"question search: {question_count} questions (seeded and indexed in {seeding.elapsed:.1f} s)")
+
+    cases = {
+        'common word': lambda: COMMON_WORD,
+        'one word': lambda: random.choice(WORDS),
+        'two words': lambda: ' '.join(random.sample(WORDS, 2)),
+        'three word prefixes': lambda: ' '.join(word[:4] for word in random.sample(WORDS, 3)),
+        'two words + technology': lambda: ' '.join(random.sample(WORDS, 2)),
+    }
+    print(f"{'case':<24} {'matches':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, make_query in cases.items():
+        samples, matches = [], 0
+        for _ in range(searches):
+            technology_id = random.choice(technology_ids) if 'technology' in name else None
+            query = make_query()
+            with Timer() as timer:
+                matches += len(search_question_ids(query, technology_id=technology_id, limit=50))
+            samples.append(timer.elapsed)
+        stats = summarize_ms(samples)
+        print(f"{name:<24} {matches / searches:>8.1f} {stats['p50_ms']:>8} {stats['p95_ms']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=100000)
+    parser.add_argument('--searches', type=int, default=200)
+    args = parser.parse_args()
+    with benchmark_database():
+        run(args.questions, args.searches)
+
+
+if __name__ == '__main__':
+    main()
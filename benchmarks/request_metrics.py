@@ -0,0 +1,76 @@
+"""Benchmark: overhead of the request metrics (ExamHub/metrics.py) on the exam hot paths.
+
+Times the same requests with and without RequestMetricsMiddleware and the instrumented template
+backend, in alternating blocks so both see the same machine load. The target is under 2%.
+
+    python -m benchmarks.request_metrics [--requests 300] [--rounds 6]
+"""
+import argparse
+import random
+
+from django.conf import settings
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from .utils import BENCH_PASSWORD, Timer, benchmark_database, seed_employees, seed_schedule, seed_technology, summarize_ms
+
+WARMUP_REQUESTS = 20 # After each settings switch, so template compilation isn't timed
+
+
+def plain_settings():
+    """MIDDLEWARE and TEMPLATES without the instrumentation."""
+    middleware = [name for name in settings.MIDDLEWARE if name != 'ExamHub.metrics.RequestMetricsMiddleware']
+    templates = [{**settings.TEMPLATES[0], 'BACKEND': 'django.template.backends.django.DjangoTemplates'}]
+    return {'MIDDLEWARE': middleware, 'TEMPLATES': templates}
+
+
+def run(request_count, rounds):
+    technology = seed_technology('Metrics', 500)
+    test_schedule = seed_schedule(technology, total_questions=50)
+    user = seed_employees(1, prefix='metrics')[0]
+
+    client = Client()
+    client.login(username=user.username, password=BENCH_PASSWORD)
+    questions = client.get(reverse('take_exam', args=[test_schedule.id])).context['questions']
+    cases = {
+        'take_exam (resume)': lambda client: client.get(reverse('take_exam', args=[test_schedule.id])),
+        'autosave_answer': lambda client: client.post(reverse('autosave_answer', args=[test_schedule.id]), {
+            'question_id': random.choice(questions).id, 'selected_option': random.choice('ABCD')}),
+        'employee_dashboard': lambda client: client.get(reverse('employee_dashboard')),
+    }
+
+    samples = {(name, mode): [] for name in cases for mode in ('plain', 'instrumented')}
+    for round_number in range(rounds):
+        modes = ['plain', 'instrumented'] if round_number % 2 == 0 else ['instrumented', 'plain']
+        for mode in modes:
+            with override_settings(**(plain_settings() if mode == 'plain' else {})):
+                client = Client() # Loads the middleware of the current settings
+                client.login(username=user.username, password=BENCH_PASSWORD)
+                for name, request in cases.items():
+                    for _ in range(WARMUP_REQUESTS):
+                        request(client)
+                    for _ in range(request_count):
+                        with Timer() as timer:
+                            request(client)
+                        samples[name, mode].append(timer.elapsed)
+
+    print(f"request metrics overhead: {request_count} requests x {rounds} rounds per case and mode")
+    print(f"{'case':<22} {'plain p50':>10} {'instr. p50':>11} {'plain mean':>11} {'instr. mean':>12} {'overhead':>9}")
+    for name in cases:
+        plain, instrumented = summarize_ms(samples[name, 'plain']), summarize_ms(samples[name, 'instrumented'])
+        overhead = (instrumented['mean_ms'] / plain['mean_ms'] - 1) * 100
+        print(f"{name:<22} {plain['p50_ms']:>10} {instrumented['p50_ms']:>11} "
+              f"{plain['mean_ms']:>11} {instrumented['mean_ms']:>12} {overhead:>8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300, help="Timed requests per case, mode and round.")
+    parser.add_argument('--rounds', type=int, default=6)
+    args = parser.parse_args()
+    with benchmark_database():
+        run(args.requests, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark: cost of one `submit_exam` call as the question bank grows.
+
+Submission should only touch the questions served on the candidate's paper, so the
+per-candidate time and query count must stay flat from a 100 to a 10,000 question bank.
+
+    python -m benchmarks.submit_exam [--candidates 20] [--paper 50]
+"""
+import argparse
+import random
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .utils import BENCH_PASSWORD, Timer, benchmark_database, seed_employees, seed_schedule, seed_technology, summarize_ms
+
+BANK_SIZES = (100, 500, 2000, 10000)
+
+
+def run(candidates, paper_size):
+    rows = []
+    for bank_size in BANK_SIZES:
+        technology = seed_technology(f"Bank{bank_size}", bank_size)
+        test_schedule = seed_schedule(technology, total_questions=paper_size)
+        users = seed_employees(candidates, prefix=f"bank{bank_size}_")
+
+        timings, query_counts = [], []
+        for user in users:
+            client = Client()
+            client.login(username=user.username, password=BENCH_PASSWORD)
+            response = client.get(reverse('take_exam', args=[test_schedule.id]))
+            post_data = {
+                f"question_{question.id}": random.choice('ABCD')
+                for question in response.context['questions']
+            }
+            with CaptureQueriesContext(connection) as queries, Timer() as timer:
+                client.post(reverse('submit_exam', args=[test_schedule.id]), post_data)
+            timings.append(timer.elapsed)
+            query_counts.append(len(queries))
+
+        rows.append((bank_size, summarize_ms(timings), max(query_counts)))
+
+    print(f"submit_exam: {candidates} candidates per bank, {paper_size} questions per paper")
+    print(f"{'bank size':>10} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9} {'queries':>8}")
+    for bank_size, stats, queries in rows:
+        print(f"{bank_size:>10} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['mean_ms']:>9} {queries:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--candidates', type=int, default=20)
+    parser.add_argument('--paper', type=int, default=50, help="Questions per paper (TestSchedule.total_questions).")
+    args = parser.parse_args()
+    with benchmark_database():
+        run(args.candidates, args.paper)
+
+
+if __name__ == '__main__':
+    main()
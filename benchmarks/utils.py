@@ -0,0 +1,105 @@
+"""Shared helpers for the ExamHub benchmark scripts.
+
+Each script runs against a throwaway test database, so it never touches ``db.sqlite3``.
+Run them from the project root, e.g. ``python -m benchmarks.submit_exam``.
+"""
+import datetime
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from administrator.models import Technology, TestSchedule
+from employee.models import EmployeeProfile
+from questionbank.models import Question
+
+BENCH_PASSWORD = 'Bench-pass-1'
+
+
+@contextmanager
+def benchmark_database(test_db_file=None):
+    """Create an isolated test database for the duration of a benchmark run.
+
+    SQLite test databases live in memory by default; pass `test_db_file` to use a file instead,
+    which is what concurrent (multi-threaded) runs need to see real locking behaviour.
+    """
+    if test_db_file:
+        connection.settings_dict['TEST']['NAME'] = str(test_db_file)
+    setup_test_environment() # Also allows the 'testserver' host used by the test client
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_technology(name, question_count, batch_size=1000):
+    technology = Technology.objects.create(name=name)
+    Question.objects.bulk_create([
+        Question(
+            technology=technology,
+            question_text=f"{name} question {i}: which option is correct?",
+            option_a=f"Option A {i}", option_b=f"Option B {i}",
+            option_c=f"Option C {i}", option_d=f"Option D {i}",
+            correct_option=random.choice('ABCD'), marks=1,
+        )
+        for i in range(question_count)
+    ], batch_size=batch_size)
+    return technology
+
+
+def seed_schedule(technology, total_questions=50, duration_minutes=60):
+    now = timezone.now()
+    return TestSchedule.objects.create(
+        technology=technology,
+        start_time=now - datetime.timedelta(hours=1),
+        end_time=now + datetime.timedelta(hours=2),
+        duration_minutes=duration_minutes,
+        total_questions=total_questions,
+        is_active=True,
+    )
+
+
+def seed_employees(count, prefix='bench'):
+    # Password hashing dominates user creation, so hash once and reuse it
+    password_hash = User(username='x')
+    password_hash.set_password(BENCH_PASSWORD)
+    User.objects.bulk_create([
+        User(username=f"{prefix}{i}", password=password_hash.password) for i in range(count)
+    ])
+    users = list(User.objects.filter(username__startswith=prefix).order_by('id'))
+    EmployeeProfile.objects.bulk_create([
+        EmployeeProfile(user=user, employee_id=f"{prefix.upper()}{user.id}") for user in users
+    ])
+    return users
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_ms(samples):
+    return {
+        'p50_ms': round(percentile(samples, 50) * 1000, 2),
+        'p95_ms': round(percentile(samples, 95) * 1000, 2),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 2) if samples else 0.0,
+    }
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
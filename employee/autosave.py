@@ -0,0 +1,27 @@
+from django.db import transaction
+
+from .models import EmployeeTestAttempt
+from ExamHub.db import retry_on_lock
+from questionbank.models import Answer
+
+# Autosaved answers are written through to `Answer` as they arrive, one small upsert per change,
+# so the write load is spread over the exam window instead of landing at the deadline. Nothing is
+# held in process memory: with several workers, the submission (or the expiry sweep) on any of
+# them grades every answer autosaved on the others.
+
+
+@retry_on_lock
+def save_answer(attempt_id, question_id, selected_option):
+    """Upsert one autosaved answer; returns False if the attempt has been submitted meanwhile."""
+    with transaction.atomic():
+        # Write transactions begin IMMEDIATE (see DATABASES), so a submission can't commit
+        # between this check and the write and have its graded answers changed afterwards
+        if not EmployeeTestAttempt.objects.select_for_update().filter(id=attempt_id, is_completed=False).exists():
+            return False
+        Answer.objects.bulk_create(
+            [Answer(test_attempt_id=attempt_id, question_id=question_id, selected_option=selected_option)],
+            update_conflicts=True,
+            unique_fields=['test_attempt', 'question'],
+            update_fields=['selected_option'],
+        )
+    return True
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Dashboard summaries, reference data and rendered fragments are invalidated by deleting (or
+# versioning) keys in the default cache, which only reaches other workers if they share it.
+
+PER_PROCESS_CACHES = ('django.core.cache.backends.locmem.LocMemCache', 'ExamHub.cache.LocMemCache')
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.CACHES.get('default', {}).get('BACKEND') not in PER_PROCESS_CACHES:
+        return []
+    return [Warning(
+        "The default cache is local memory, private to each process.",
+        hint="With more than one worker, an invalidation in one leaves the others serving stale "
+             "dashboards and pages; use a shared backend such as ExamHub.cache.RedisCache.",
+        id='employee.W001',
+    )]
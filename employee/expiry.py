@@ -0,0 +1,111 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateTimeField, DurationField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from .models import EmployeeProfile, EmployeeTestAttempt
+from .summary import invalidate_employee_summaries
+from ExamHub.db import retry_on_lock
+from administrator.stats import increment_counters
+from questionbank.cache import get_question_bank
+from questionbank.models import Answer, AttemptQuestion
+from results.grading import grade_selections, apply_grade
+from results.leaderboard import record_completed_attempts
+
+# Attempts whose time ran out without a submission (closed tab, lost connection) are graded
+# from the answers saved so far and closed here, in batches, instead of staying open forever.
+#
+# The sweep leaves attempts open for EXAM_SUBMISSION_GRACE_SECONDS past their deadline, so the
+# exam page's own submission at the deadline gets there first; one that still arrives after an
+# attempt was closed on timeout, within the grace period, is merged into it (see submit_exam).
+
+DEFAULT_SUBMISSION_GRACE_SECONDS = 15
+
+
+def attempt_deadline(test_attempt):
+    test_schedule = test_attempt.test_schedule
+    return min(test_attempt.start_time + datetime.timedelta(minutes=test_schedule.duration_minutes),
+               test_schedule.end_time)
+
+
+def submission_grace():
+    return datetime.timedelta(seconds=getattr(settings, 'EXAM_SUBMISSION_GRACE_SECONDS', DEFAULT_SUBMISSION_GRACE_SECONDS))
+
+
+def closed_on_timeout(test_attempt):
+    # finalize_attempts closes an attempt at its deadline; a submission at the moment it was made
+    return test_attempt.is_completed and test_attempt.end_time == attempt_deadline(test_attempt)
+
+
+def find_expired_attempt_ids(now=None):
+    cutoff = (now or timezone.now()) - submission_grace()
+    # The deadline of attempt_deadline, compared in SQL: past the schedule's end, or past the
+    # attempt's own start plus its test's duration
+    time_limit = ExpressionWrapper(
+        F('start_time') + ExpressionWrapper(F('test_schedule__duration_minutes') * datetime.timedelta(minutes=1),
+                                            output_field=DurationField()),
+        output_field=DateTimeField(),
+    )
+    return list(EmployeeTestAttempt.objects.alias(time_limit=time_limit).filter(
+        Q(test_schedule__end_time__lt=cutoff) | Q(time_limit__lt=cutoff),
+        is_completed=False,
+    ).order_by().values_list('id', flat=True))
+
+
+@retry_on_lock
+def finalize_attempts(attempt_ids):
+    """Grade and close the given open attempts from their saved answers; returns how many were closed."""
+    with transaction.atomic():
+        attempts = list(EmployeeTestAttempt.objects.select_for_update(of=('self',)).select_related(
+            'test_schedule__technology'
+        ).filter(id__in=attempt_ids, is_completed=False))
+        if not attempts:
+            return 0
+        attempt_ids = [attempt.id for attempt in attempts]
+
+        papers = {}
+        for attempt_id, question_id in AttemptQuestion.objects.filter(
+                test_attempt_id__in=attempt_ids).order_by('position').values_list('test_attempt_id', 'question_id'):
+            papers.setdefault(attempt_id, []).append(question_id)
+        selections = {}
+        for attempt_id, question_id, selected_option in Answer.objects.filter(
+                test_attempt_id__in=attempt_ids).values_list('test_attempt_id', 'question_id', 'selected_option'):
+            selections.setdefault(attempt_id, {})[question_id] = selected_option
+
+        missing_answers = []
+        graded_fields = []
+        for attempt in attempts:
+            answer_key = get_question_bank(attempt.test_schedule.technology).answer_key
+            attempt_selections = selections.get(attempt.id, {})
+            # Attempts without a stored paper are graded on the questions they answered
+            served_ids = papers.get(attempt.id) or list(attempt_selections)
+            attempt_key = {qid: answer_key[qid] for qid in served_ids if qid in answer_key}
+
+            missing_answers.extend(
+                Answer(test_attempt=attempt, question_id=question_id, selected_option=None)
+                for question_id in attempt_key if question_id not in attempt_selections
+            )
+            graded_fields = apply_grade(attempt, grade_selections(attempt_key, attempt_selections))
+            attempt.is_completed = True
+            attempt.end_time = attempt_deadline(attempt)
+
+        # Every served question gets an answer row, as on a normal submission
+        Answer.objects.bulk_create(missing_answers, batch_size=500, ignore_conflicts=True)
+        EmployeeTestAttempt.objects.bulk_update(attempts, graded_fields + ['is_completed', 'end_time'], batch_size=500)
+        # bulk_update sends no post_save
+        increment_counters(completed_exam_attempts=len(attempts))
+        invalidate_employee_summaries(*EmployeeProfile.objects.filter(
+            id__in={attempt.employee_id for attempt in attempts}).values_list('user_id', flat=True))
+        record_completed_attempts(*attempts)
+    return len(attempts)
+
+
+def sweep_expired_attempts(now=None, batch_size=200):
+    """Finalize every attempt past its time limit or its schedule's end time (plus the grace period); returns how many were closed."""
+    expired_ids = find_expired_attempt_ids(now)
+    closed = 0
+    for start in range(0, len(expired_ids), batch_size):
+        closed += finalize_attempts(expired_ids[start:start + batch_size])
+    return closed
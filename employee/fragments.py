@@ -0,0 +1,36 @@
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+# Question cards on the exam page are rendered once per question and question bank version,
+# then reused for every candidate. Only the question number and the checked radio button
+# differ between candidates, so those are left as slots and filled in at render time.
+
+QUESTION_CARD_TEMPLATE = 'employee/_question_card.html'
+# Escaped question text can never contain '<', so this marker can't clash with user content
+SLOT = '<!--slot-->'
+# Order of the checked-state slots in the card after the question number slot
+SLOT_OPTIONS = ('A', 'B', 'C', 'D', '')
+
+
+def get_question_fragment(question_bank, question):
+    """Return the card for `question` as static HTML parts split around its slots."""
+    parts = question_bank.fragments.get(question.id)
+    if parts is None:
+        html = render_to_string(QUESTION_CARD_TEMPLATE, {'question': question, 'slot': mark_safe(SLOT)})
+        parts = html.split(SLOT)
+        question_bank.fragments[question.id] = parts
+    return parts
+
+
+def render_question_cards(question_bank, questions, existing_answers, start=1):
+    """Render the cards for `questions`, numbered from `start`, with each candidate's answers checked."""
+    html = []
+    for number, question in enumerate(questions, start):
+        parts = get_question_fragment(question_bank, question)
+        selected_option = existing_answers.get(question.id) or ''
+        slot_values = [str(number)] + ['checked' if selected_option == option else '' for option in SLOT_OPTIONS]
+        for part, value in zip(parts, slot_values):
+            html.append(part)
+            html.append(value)
+        html.append(parts[-1])
+    return mark_safe(''.join(html))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from employee.expiry import sweep_expired_attempts
+
+
+class Command(BaseCommand):
+    help = "Grade and close exam attempts whose time limit or schedule end time has passed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Attempts finalized per transaction.")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Keep running and sweep every INTERVAL seconds (default: sweep once and exit).")
+
+    def handle(self, *args, **options):
+        while True:
+            closed = sweep_expired_attempts(batch_size=options['batch_size'])
+            self.stdout.write(f"Finalized {closed} expired attempt(s).")
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
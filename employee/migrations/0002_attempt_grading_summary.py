@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+
+def backfill_grading_summary(apps, schema_editor):
+    # Grade already completed attempts from their stored answers
+    EmployeeTestAttempt = apps.get_model('employee', 'EmployeeTestAttempt')
+    Answer = apps.get_model('questionbank', 'Answer')
+
+    summaries = {}
+    rows = Answer.objects.filter(test_attempt__is_completed=True).values_list(
+        'test_attempt_id', 'selected_option', 'question__correct_option', 'question__marks'
+    )
+    for attempt_id, selected_option, correct_option, marks in rows.iterator():
+        summary = summaries.setdefault(attempt_id, [0, 0, 0, 0])
+        summary[0] += 1
+        summary[3] += marks
+        if selected_option == correct_option:
+            summary[1] += 1
+            summary[2] += marks
+
+    attempts = []
+    for attempt in EmployeeTestAttempt.objects.filter(id__in=list(summaries)):
+        attempt.question_count, attempt.correct_count, attempt.marks_obtained, attempt.total_marks = summaries[attempt.id]
+        attempts.append(attempt)
+    EmployeeTestAttempt.objects.bulk_update(
+        attempts, ['question_count', 'correct_count', 'marks_obtained', 'total_marks'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0001_initial'),
+        ('questionbank', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeetestattempt',
+            name='correct_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of correctly answered questions.'),
+        ),
+        migrations.AddField(
+            model_name='employeetestattempt',
+            name='marks_obtained',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Total marks obtained for correct answers.', max_digits=8),
+        ),
+        migrations.AddField(
+            model_name='employeetestattempt',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, help_text="Number of questions on the attempt's paper."),
+        ),
+        migrations.AddField(
+            model_name='employeetestattempt',
+            name='total_marks',
+            field=models.DecimalField(decimal_places=2, default=0, help_text="Total marks available on the attempt's paper.", max_digits=8),
+        ),
+        migrations.RunPython(backfill_grading_summary, migrations.RunPython.noop),
+    ]
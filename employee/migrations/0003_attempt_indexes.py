@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0005_testschedule_window_index'),
+        ('employee', '0002_attempt_grading_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeetestattempt',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['employee', 'end_time'], name='attempt_employee_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeetestattempt',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['end_time'], name='attempt_done_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeetestattempt',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['test_schedule', 'end_time'], name='attempt_schedule_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeetestattempt',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['start_time'], name='attempt_open_idx'),
+        ),
+    ]
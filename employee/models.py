@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User # Django's built-in User model
 from administrator.models import TestSchedule # Import TestSchedule from administrator app
 
@@ -21,10 +22,28 @@ class EmployeeTestAttempt(models.Model):
     score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True,
                                 help_text="Employee's score (e.g., percentage).")
     is_completed = models.BooleanField(default=False, help_text="True if the test attempt has been submitted.")
+    # Grading summary, stored when the attempt is submitted so result pages don't recompute it
+    question_count = models.PositiveIntegerField(default=0, help_text="Number of questions on the attempt's paper.")
+    correct_count = models.PositiveIntegerField(default=0, help_text="Number of correctly answered questions.")
+    marks_obtained = models.DecimalField(max_digits=8, decimal_places=2, default=0,
+                                         help_text="Total marks obtained for correct answers.")
+    total_marks = models.DecimalField(max_digits=8, decimal_places=2, default=0,
+                                      help_text="Total marks available on the attempt's paper.")
 
     class Meta:
         unique_together = ('employee', 'test_schedule') # An employee can only attempt a specific test schedule once.
         ordering = ['-start_time'] # Order by latest attempt first
+        indexes = [
+            # Partial on is_completed (see TestSchedule's index), so each also covers only the rows it serves
+            models.Index(fields=['employee', 'end_time'], condition=Q(is_completed=True),
+                         name='attempt_employee_done_idx'), # Employee dashboard, latest results first
+            models.Index(fields=['end_time'], condition=Q(is_completed=True),
+                         name='attempt_done_end_idx'), # Results listing and exports
+            models.Index(fields=['test_schedule', 'end_time'], condition=Q(is_completed=True),
+                         name='attempt_schedule_done_idx'), # Leaderboards and result declaration
+            models.Index(fields=['start_time'], condition=Q(is_completed=False),
+                         name='attempt_open_idx'), # Open attempts, for the expiry sweep
+        ]
 
     def __str__(self):
         return f"{self.employee.employee_id} - {self.test_schedule.technology.name} Test Attempt"
\ No newline at end of file
@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import EmployeeProfile, EmployeeTestAttempt
+from .summary import bump_schedules_version, invalidate_employee_summaries
+from administrator.models import Technology, TestSchedule
+
+# Invalidates the cached employee dashboard summaries (employee/summary.py) on row-by-row writes.
+# Bulk writes of attempts (employee/expiry.py) invalidate the summaries themselves.
+
+
+def user_ids_of(*employee_ids):
+    return list(EmployeeProfile.objects.filter(id__in=employee_ids).values_list('user_id', flat=True))
+
+
+@receiver(post_save, sender=EmployeeTestAttempt, dispatch_uid='employee_summary_attempt_save')
+@receiver(post_delete, sender=EmployeeTestAttempt, dispatch_uid='employee_summary_attempt_delete')
+def attempt_changed(sender, instance, **kwargs):
+    if EmployeeTestAttempt.employee.is_cached(instance):
+        invalidate_employee_summaries(instance.employee.user_id)
+    else:
+        invalidate_employee_summaries(*user_ids_of(instance.employee_id))
+
+
+@receiver(post_save, sender=TestSchedule, dispatch_uid='employee_summary_schedule_save')
+@receiver(post_delete, sender=TestSchedule, dispatch_uid='employee_summary_schedule_delete')
+@receiver(post_save, sender=Technology, dispatch_uid='employee_summary_technology_save')
+@receiver(post_delete, sender=Technology, dispatch_uid='employee_summary_technology_delete')
+def schedules_changed(sender, instance, **kwargs):
+    # Every summary may list the schedule (or its technology's name)
+    transaction.on_commit(bump_schedules_version)
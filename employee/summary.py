@@ -0,0 +1,137 @@
+import datetime
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.utils import timezone
+
+from .models import EmployeeTestAttempt
+from administrator.models import TestSchedule
+
+# Dashboard summary of one employee (open tests, attempts in progress, recent results and score
+# statistics), built with a few indexed queries and kept in the Django cache until it can change:
+# - the employee starts or finishes an attempt (invalidate_employee_summaries, via signals),
+# - any test schedule is added, edited or deleted (a global schedules version in the cache key),
+# - a schedule opens or closes, or an attempt's time runs out (the entry expires at that moment).
+# Entries are plain dicts, so the dashboard page and the JSON endpoint serve the same data.
+# Invalidation only reaches other workers through a shared cache backend (see CACHES in settings;
+# `manage.py check --deploy` warns about the per-process default).
+
+SCHEDULES_VERSION_KEY = 'employee-summary:schedules-version'
+DEFAULT_RECENT_RESULTS = 10
+DEFAULT_MAX_AGE = 15 * 60
+
+
+def get_schedules_version():
+    # Seeded with the current time if missing (first use, or evicted), so a lost version never
+    # lets summaries cached under an older one come back
+    cache.add(SCHEDULES_VERSION_KEY, time.time_ns(), timeout=None)
+    return cache.get(SCHEDULES_VERSION_KEY)
+
+
+def bump_schedules_version():
+    try:
+        cache.incr(SCHEDULES_VERSION_KEY)
+    except ValueError: # Not in the cache; the next read starts a new version anyway
+        pass
+
+
+def summary_cache_key(user_id, schedules_version):
+    return f'employee-summary:{user_id}:{schedules_version}'
+
+
+def invalidate_employee_summaries(*user_ids):
+    # After commit, so a concurrent request can't cache the state from before the change
+    keys = [summary_cache_key(user_id, get_schedules_version()) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def build_employee_summary(employee, now=None):
+    now = now or timezone.now()
+    recent_count = getattr(settings, 'EMPLOYEE_SUMMARY_RECENT_RESULTS', DEFAULT_RECENT_RESULTS)
+    attempts = EmployeeTestAttempt.objects.filter(employee=employee)
+
+    # Schedules open now that this employee hasn't completed; the completed ones are excluded with
+    # an indexed NOT IN on the employee's attempts instead of a join across all attempts
+    completed_schedule_ids = attempts.filter(is_completed=True).values('test_schedule_id')
+    open_schedules = TestSchedule.objects.filter(
+        is_active=True, start_time__lte=now, end_time__gte=now
+    ).exclude(id__in=completed_schedule_ids).select_related('technology').order_by('end_time', 'id')
+
+    in_progress = attempts.filter(is_completed=False, test_schedule__end_time__gte=now).select_related(
+        'test_schedule__technology').order_by('-start_time')
+
+    recent = attempts.filter(is_completed=True).select_related('test_schedule__technology').order_by('-end_time', '-id')[:recent_count]
+
+    stats = attempts.filter(is_completed=True).aggregate(
+        completed=Count('id'), average_score=Avg('score'), best_score=Max('score'),
+        passed=Count('id', filter=Q(score__gte=F('test_schedule__pass_mark'))),
+    )
+    next_opening = TestSchedule.objects.filter(is_active=True, start_time__gt=now).aggregate(next=Min('start_time'))['next']
+
+    summary = {
+        'employee': {'employee_id': employee.employee_id, 'department': employee.department},
+        'open_schedules': [{
+            'id': schedule.id,
+            'technology': schedule.technology.name,
+            'start_time': schedule.start_time,
+            'end_time': schedule.end_time,
+            'duration_minutes': schedule.duration_minutes,
+            'total_questions': schedule.total_questions,
+        } for schedule in open_schedules],
+        'in_progress': [{
+            'attempt_id': attempt.id,
+            'test_schedule_id': attempt.test_schedule_id,
+            'technology': attempt.test_schedule.technology.name,
+            'start_time': attempt.start_time,
+            'duration_minutes': attempt.test_schedule.duration_minutes,
+            # As employee.expiry.attempt_deadline (which imports this module)
+            'deadline': min(attempt.start_time + datetime.timedelta(minutes=attempt.test_schedule.duration_minutes),
+                            attempt.test_schedule.end_time),
+        } for attempt in in_progress],
+        'recent_results': [{
+            'attempt_id': attempt.id,
+            'test_schedule_id': attempt.test_schedule_id,
+            'technology': attempt.test_schedule.technology.name,
+            'end_time': attempt.end_time,
+            'score': float(attempt.score or 0),
+            'passed': attempt.test_schedule.is_pass(attempt.score or 0),
+        } for attempt in recent],
+        'stats': {
+            'completed': stats['completed'],
+            'passed': stats['passed'],
+            'average_score': round(float(stats['average_score']), 2) if stats['average_score'] is not None else None,
+            'best_score': float(stats['best_score']) if stats['best_score'] is not None else None,
+        },
+    }
+
+    # The summary changes on its own when the next schedule opens or closes, or an attempt runs out of time
+    boundaries = [schedule['end_time'] for schedule in summary['open_schedules']]
+    boundaries += [attempt['deadline'] for attempt in summary['in_progress']]
+    boundaries += [next_opening] if next_opening else []
+    max_age = getattr(settings, 'EMPLOYEE_SUMMARY_MAX_AGE', DEFAULT_MAX_AGE)
+    # Identifies the content (not when it was built), for conditional GETs of the JSON endpoint
+    content = json.dumps(summary, cls=DjangoJSONEncoder, sort_keys=True)
+    summary['etag'] = hashlib.sha1(content.encode()).hexdigest()
+    summary['valid_until'] = min([now + datetime.timedelta(seconds=max_age), *[b for b in boundaries if b > now]])
+    summary['generated_at'] = now
+    return summary
+
+
+def get_employee_summary(user, now=None):
+    """The cached dashboard summary of `user`'s employee profile, rebuilt when missing or out of date.
+
+    The profile is only loaded to rebuild; raises EmployeeProfile.DoesNotExist if there is none.
+    """
+    now = now or timezone.now()
+    cache_key = summary_cache_key(user.id, get_schedules_version())
+    summary = cache.get(cache_key)
+    if summary is None or summary['valid_until'] <= now:
+        summary = build_employee_summary(user.employee_profile, now)
+        cache.set(cache_key, summary, max(int((summary['valid_until'] - now).total_seconds()), 1))
+    return summary
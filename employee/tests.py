@@ -1,2 +1,666 @@
-from django.test import TestCase
+import datetime
+import io
+import os
+import re
+import tempfile
+import threading
+import unittest
+from decimal import Decimal
 
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.core.cache import cache, caches
+from django.db import connection, connections
+from django.template import engines
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ExamHub.db import full_table_scans, query_plan
+from ExamHub.cache import cache_stats
+from ExamHub.metrics import metrics
+from .autosave import save_answer
+from .fragments import render_question_cards
+from .checks import check_shared_cache
+from .expiry import attempt_deadline, finalize_attempts, find_expired_attempt_ids, sweep_expired_attempts
+from .models import EmployeeProfile, EmployeeTestAttempt
+from .summary import get_employee_summary
+from administrator.models import Technology, TestSchedule
+from benchmarks.exam_render import LEGACY_TEMPLATE
+from questionbank.cache import bump_question_bank_version, get_question_bank, question_bank_cache
+from questionbank.models import Answer, AttemptQuestion, Question
+from results.leaderboard import leaderboards
+
+
+def create_exam(question_count=4, duration_minutes=60, **schedule_fields):
+    """An open, active schedule and its questions (correct option 'A' for the even ones, 'B' for the others)."""
+    now = timezone.now()
+    technology = Technology.objects.create(name='Python')
+    schedule = TestSchedule.objects.create(**{
+        'technology': technology, 'is_active': True, 'duration_minutes': duration_minutes, 'total_questions': question_count,
+        'start_time': now - datetime.timedelta(hours=1), 'end_time': now + datetime.timedelta(hours=2), **schedule_fields})
+    questions = [
+        Question.objects.create(technology=technology, question_text=f'Question {i}', option_a='a', option_b='b',
+                                option_c='c', option_d='d', correct_option='AB'[i % 2])
+        for i in range(question_count)
+    ]
+    return schedule, questions
+
+
+class EmployeeSummaryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.user = User.objects.create_user('alice', password='pw', first_name='Alice')
+        self.employee = EmployeeProfile.objects.create(user=self.user, employee_id='E1', department='QA')
+        self.python = Technology.objects.create(name='Python')
+        self.django = Technology.objects.create(name='Django')
+        self.python_test = self.schedule(self.python, hours_left=2)
+        self.django_test = self.schedule(self.django, hours_left=5)
+        self.schedule(self.python, hours_left=5, starts_in_hours=3) # Not open yet
+        self.client.force_login(self.user)
+
+    def schedule(self, technology, hours_left, starts_in_hours=-1, **fields):
+        return TestSchedule.objects.create(
+            technology=technology, is_active=True, duration_minutes=60,
+            start_time=self.now + datetime.timedelta(hours=starts_in_hours),
+            end_time=self.now + datetime.timedelta(hours=hours_left), **fields)
+
+    def attempt(self, test_schedule, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return EmployeeTestAttempt.objects.create(employee=self.employee, test_schedule=test_schedule, **fields)
+
+    def complete(self, attempt, score):
+        attempt.is_completed, attempt.score, attempt.end_time = True, Decimal(score), timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            attempt.save()
+
+    def summary(self):
+        return self.client.get(reverse('employee_dashboard')).context['summary']
+
+    def test_summary_content(self):
+        summary = self.summary()
+        self.assertEqual([test['id'] for test in summary['open_schedules']], [self.python_test.id, self.django_test.id])
+        self.assertEqual(summary['stats'], {'completed': 0, 'passed': 0, 'average_score': None, 'best_score': None})
+
+        started = self.attempt(self.python_test)
+        summary = self.summary()
+        self.assertEqual([attempt['attempt_id'] for attempt in summary['in_progress']], [started.id])
+
+        self.complete(started, '80')
+        self.complete(self.attempt(self.django_test), '30')
+        summary = self.summary()
+        self.assertEqual(summary['open_schedules'], []) # Completed tests aren't offered again
+        self.assertEqual(summary['in_progress'], [])
+        self.assertEqual([(result['technology'], result['passed']) for result in summary['recent_results']],
+                         [('Django', False), ('Python', True)])
+        self.assertEqual(summary['stats'], {'completed': 2, 'passed': 1, 'average_score': 55.0, 'best_score': 80.0})
+
+    def test_cached_until_something_changes(self):
+        self.summary()
+        with self.assertNumQueries(2): # Session and user only
+            response = self.client.get(reverse('employee_dashboard'))
+        self.assertContains(response, 'Python Test')
+
+        # Editing a schedule shows up on every dashboard
+        self.python_test.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.python_test.save()
+        self.assertEqual([test['id'] for test in self.summary()['open_schedules']], [self.django_test.id])
+
+        # The summary expires when the next schedule opens
+        later = get_employee_summary(self.user, now=self.now + datetime.timedelta(hours=3, minutes=1))
+        self.assertEqual(len(later['open_schedules']), 2)
+
+    def test_expired_attempts_invalidate(self):
+        attempt = self.attempt(self.python_test)
+        self.assertEqual(len(self.summary()['in_progress']), 1)
+        EmployeeTestAttempt.objects.filter(id=attempt.id).update(start_time=self.now - datetime.timedelta(hours=2))
+        with self.captureOnCommitCallbacks(execute=True):
+            finalize_attempts([attempt.id])
+        summary = self.summary()
+        self.assertEqual(summary['in_progress'], [])
+        self.assertEqual(summary['stats']['completed'], 1)
+
+    @override_settings(EMPLOYEE_SUMMARY_RECENT_RESULTS=2)
+    def test_recent_results_are_bounded(self):
+        for hours_left in range(3):
+            self.complete(self.attempt(self.schedule(self.python, hours_left=hours_left + 1)), '60')
+        response = self.client.get(reverse('employee_dashboard'))
+        self.assertEqual(len(response.context['summary']['recent_results']), 2)
+        self.assertContains(response, 'Showing your 2 most recent of 3 results.')
+
+    def test_json_endpoint_with_conditional_get(self):
+        url = reverse('employee_summary_api')
+        response = self.client.get(url)
+        self.assertEqual(response.json()['employee'], {'employee_id': 'E1', 'department': 'QA'})
+        etag = response['ETag']
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.attempt(self.python_test)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['in_progress']), 1)
+
+    def test_user_without_profile(self):
+        self.client.force_login(User.objects.create_user('bob'))
+        self.assertEqual(self.client.get(reverse('employee_summary_api')).status_code, 404)
+        self.assertRedirects(self.client.get(reverse('employee_dashboard')), reverse('employee_login'),
+                             fetch_redirect_response=False)
+
+
+class ExamPaperTest(TestCase):
+    def setUp(self):
+        self.schedule, _ = create_exam(question_count=12, total_questions=5)
+        self.clients = []
+        for username in ('alice', 'bob'):
+            user = User.objects.create_user(username)
+            EmployeeProfile.objects.create(user=user, employee_id=username)
+            client = self.client_class()
+            client.force_login(user)
+            self.clients.append(client)
+
+    def take_exam(self, client):
+        return client.get(reverse('take_exam', args=[self.schedule.id]))
+
+    def paper(self, username):
+        return list(AttemptQuestion.objects.filter(test_attempt__employee__user__username=username)
+                    .order_by('position').values_list('question_id', flat=True))
+
+    def test_resumed_exam_serves_the_stored_paper(self):
+        served = [question.id for question in self.take_exam(self.clients[0]).context['questions']]
+        self.assertEqual(served, self.paper('alice'))
+        for _ in range(3):
+            resumed = self.take_exam(self.clients[0])
+            self.assertEqual([question.id for question in resumed.context['questions']], served)
+        self.assertEqual(len(self.paper('alice')), 5) # Not sampled again
+        self.assertEqual(EmployeeTestAttempt.objects.count(), 1)
+
+    def test_each_attempt_gets_its_own_paper(self):
+        for client in self.clients:
+            self.take_exam(client)
+        alice, bob = EmployeeTestAttempt.objects.order_by('id')
+        self.assertEqual(AttemptQuestion.objects.filter(test_attempt=alice).count(), 5)
+        self.assertEqual(AttemptQuestion.objects.filter(test_attempt=bob).count(), 5)
+        self.assertEqual(self.paper('alice'), [question.id for question in self.take_exam(self.clients[0]).context['questions']])
+        self.assertEqual(self.paper('bob'), [question.id for question in self.take_exam(self.clients[1]).context['questions']])
+
+    def test_resuming_after_the_time_limit_submits_the_saved_answers(self):
+        self.take_exam(self.clients[0])
+        attempt = EmployeeTestAttempt.objects.get()
+        save_answer(attempt.id, self.paper('alice')[0], 'A')
+        EmployeeTestAttempt.objects.filter(id=attempt.id).update(start_time=timezone.now() - datetime.timedelta(minutes=61))
+        response = self.take_exam(self.clients[0])
+        self.assertRedirects(response, reverse('view_employee_result', args=[attempt.id]), fetch_redirect_response=False)
+        attempt.refresh_from_db()
+        self.assertTrue(attempt.is_completed)
+        self.assertEqual(Answer.objects.filter(test_attempt=attempt).count(), 5)
+
+
+class SubmissionGradingTest(TestCase):
+    def setUp(self):
+        self.schedule, self.questions = create_exam(question_count=12, total_questions=5)
+        user = User.objects.create_user('alice')
+        EmployeeProfile.objects.create(user=user, employee_id='E1')
+        self.client.force_login(user)
+        self.paper = self.client.get(reverse('take_exam', args=[self.schedule.id])).context['questions']
+        self.attempt = EmployeeTestAttempt.objects.get()
+
+    def test_only_the_served_paper_is_graded(self):
+        off_paper = [question for question in self.questions if question not in self.paper]
+        posted = {f'question_{question.id}': question.correct_option for question in self.paper[:2] + off_paper}
+        posted[f'question_{self.paper[2].id}'] = 'C' if self.paper[2].correct_option != 'C' else 'D'
+        self.client.post(reverse('submit_exam', args=[self.schedule.id]), posted)
+
+        self.attempt.refresh_from_db()
+        # Unanswered paper questions count as wrong; questions that weren't served are ignored
+        self.assertEqual((self.attempt.question_count, self.attempt.correct_count, self.attempt.score), (5, 2, Decimal('40')))
+        self.assertEqual((self.attempt.marks_obtained, self.attempt.total_marks), (2, 5))
+        stored = dict(Answer.objects.filter(test_attempt=self.attempt).values_list('question_id', 'selected_option'))
+        self.assertEqual(set(stored), {question.id for question in self.paper})
+        self.assertEqual([stored[question.id] for question in self.paper[3:]], [None, None])
+
+
+class QuestionCardTest(TestCase):
+    def setUp(self):
+        self.schedule, self.questions = create_exam(question_count=3)
+        self.questions[1].question_text = '<script>alert("x")</script> & <!--slot--> "quoted"'
+        self.questions[1].option_b = '<b>bold</b>'
+        self.questions[1].save()
+        self.bank = get_question_bank(self.schedule.technology)
+        self.questions = [self.bank.questions[question.id] for question in self.questions]
+
+    def test_fragments_match_the_template_loop(self):
+        existing_answers = {self.questions[0].id: 'C', self.questions[1].id: 'A'}
+        expected = engines['django'].from_string(LEGACY_TEMPLATE).render(
+            {'questions': self.questions, 'existing_answers': existing_answers})
+        for _ in range(2): # Rendered, then from the cached fragments
+            html = render_question_cards(self.bank, self.questions, existing_answers)
+            self.assertEqual(' '.join(html.split()), ' '.join(expected.split()))
+
+    def test_question_text_is_escaped(self):
+        html = render_question_cards(self.bank, self.questions[1:2], {})
+        self.assertIn('&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt; &amp; &lt;!--slot--&gt;', html)
+        self.assertIn('B) &lt;b&gt;bold&lt;/b&gt;', html)
+        self.assertNotIn('<script>', html)
+        self.assertEqual(len(self.bank.fragments[self.questions[1].id]), 7) # Text that looks like a slot isn't one
+
+    def test_previous_answers_are_checked(self):
+        question = self.questions[0]
+        html = render_question_cards(self.bank, [question], {question.id: 'C'}, start=4)
+        self.assertIn('Question 4:', html)
+        self.assertEqual(re.findall(r'value="([A-D]?)" checked', html), ['C'])
+        html = render_question_cards(self.bank, [question], {})
+        self.assertEqual(re.findall(r'value="([A-D]?)" checked', html), ['']) # "No answer"
+
+
+class AnswerAutosaveTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.schedule, _ = create_exam()
+        self.user = User.objects.create_user('alice', password='pw')
+        EmployeeProfile.objects.create(user=self.user, employee_id='E1')
+        # Two clients stand in for two workers serving the same candidate
+        self.worker_a, self.worker_b = self.client_class(), self.client_class()
+        for client in (self.worker_a, self.worker_b):
+            client.force_login(self.user)
+        self.questions = self.worker_a.get(reverse('take_exam', args=[self.schedule.id])).context['questions']
+        self.attempt = EmployeeTestAttempt.objects.get(employee__user=self.user)
+
+    def autosave(self, client, question, option):
+        return client.post(reverse('autosave_answer', args=[self.schedule.id]),
+                           {'question_id': question.id, 'selected_option': option})
+
+    def stored_answers(self):
+        return dict(Answer.objects.filter(test_attempt=self.attempt).values_list('question_id', 'selected_option'))
+
+    def test_answers_are_written_through(self):
+        first, second = self.questions[:2]
+        self.assertEqual(self.autosave(self.worker_a, first, 'A').json(), {'saved': True})
+        self.autosave(self.worker_a, second, 'C')
+        self.autosave(self.worker_b, second, 'D') # The latest change wins, whichever worker took it
+        self.assertEqual(self.stored_answers(), {first.id: 'A', second.id: 'D'})
+        # Resuming on the other worker shows them
+        response = self.worker_b.get(reverse('take_exam', args=[self.schedule.id]))
+        self.assertEqual(response.context['existing_answers'], {str(first.id): 'A', str(second.id): 'D'})
+
+    def test_submission_on_another_worker_grades_every_autosave(self):
+        for question in self.questions[:2]:
+            self.autosave(self.worker_a, question, question.correct_option)
+        self.autosave(self.worker_b, self.questions[2], 'D')
+        self.worker_b.post(reverse('submit_exam', args=[self.schedule.id]), {})
+        self.attempt.refresh_from_db()
+        self.assertTrue(self.attempt.is_completed)
+        self.assertEqual((self.attempt.correct_count, self.attempt.question_count), (2, 4))
+        self.assertEqual(self.stored_answers(), {
+            self.questions[0].id: self.questions[0].correct_option, self.questions[1].id: self.questions[1].correct_option,
+            self.questions[2].id: 'D', self.questions[3].id: None,
+        })
+
+    def test_autosave_after_submission_is_refused(self):
+        self.autosave(self.worker_a, self.questions[0], 'A')
+        self.worker_b.post(reverse('submit_exam', args=[self.schedule.id]), {})
+        response = self.autosave(self.worker_a, self.questions[0], 'B')
+        self.assertEqual(response.status_code, 404) # No ongoing attempt any more
+        self.assertEqual(self.stored_answers()[self.questions[0].id], 'A')
+        # Even when the submission lands between the view's check and the write
+        self.assertFalse(save_answer(self.attempt.id, self.questions[0].id, 'B'))
+        self.assertEqual(self.stored_answers()[self.questions[0].id], 'A')
+
+    def test_invalid_answers_are_rejected(self):
+        self.assertEqual(self.autosave(self.worker_a, self.questions[0], 'E').status_code, 400)
+        other = Question.objects.create(technology=self.schedule.technology, question_text='Not on the paper',
+                                        option_a='a', option_b='b', option_c='c', option_d='d', correct_option='A')
+        self.assertEqual(self.autosave(self.worker_a, other, 'A').status_code, 400)
+        self.assertEqual(self.stored_answers(), {})
+
+
+@override_settings(EXAM_SUBMISSION_GRACE_SECONDS=15)
+class AttemptExpiryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.schedule, self.questions = create_exam(duration_minutes=30)
+        self.now = timezone.now()
+        self.clients = {}
+
+    def start(self, username, started_ago, correct_answers=0):
+        """An attempt started `started_ago` before now, with its first questions answered correctly (autosaved)."""
+        user = User.objects.create_user(username, password='pw')
+        EmployeeProfile.objects.create(user=user, employee_id=username)
+        client = self.clients[username] = self.client_class()
+        client.force_login(user)
+        paper = client.get(reverse('take_exam', args=[self.schedule.id])).context['questions']
+        attempt = EmployeeTestAttempt.objects.get(employee__user=user)
+        for question in paper[:correct_answers]:
+            client.post(reverse('autosave_answer', args=[self.schedule.id]),
+                        {'question_id': question.id, 'selected_option': question.correct_option})
+        EmployeeTestAttempt.objects.filter(id=attempt.id).update(start_time=self.now - started_ago)
+        attempt.refresh_from_db()
+        attempt.paper = paper
+        return attempt
+
+    def answers(self, attempt):
+        return dict(Answer.objects.filter(test_attempt=attempt).values_list('question_id', 'selected_option'))
+
+    def test_sweep_closes_attempts_past_their_deadline_and_grace(self):
+        expired = self.start('expired', datetime.timedelta(minutes=40), correct_answers=3)
+        in_time = self.start('in_time', datetime.timedelta(minutes=29))
+        in_grace = self.start('in_grace', datetime.timedelta(minutes=30, seconds=5))
+
+        self.assertEqual(sorted(find_expired_attempt_ids(self.now)), [expired.id])
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('sweep_expired_attempts', stdout=out)
+        self.assertIn('Finalized 1 expired attempt(s).', out.getvalue())
+
+        expired.refresh_from_db()
+        self.assertTrue(expired.is_completed)
+        self.assertEqual(expired.end_time, attempt_deadline(expired))
+        self.assertEqual((expired.correct_count, expired.question_count, expired.score), (3, 4, Decimal('75')))
+        self.assertEqual(len(self.answers(expired)), 4) # Unanswered questions are recorded too
+        self.assertFalse(EmployeeTestAttempt.objects.filter(id__in=[in_time.id, in_grace.id], is_completed=True).exists())
+
+        # Past the grace period, and past the schedule's end, they are closed too
+        TestSchedule.objects.filter(id=self.schedule.id).update(end_time=self.now - datetime.timedelta(minutes=1))
+        self.assertEqual(sweep_expired_attempts(), 2)
+        self.assertEqual(sweep_expired_attempts(), 0)
+
+    def test_short_attempt_expires_while_a_longer_test_is_open(self):
+        long_schedule = TestSchedule.objects.create(
+            technology=self.schedule.technology, is_active=True, duration_minutes=180, total_questions=4,
+            start_time=self.schedule.start_time, end_time=self.now + datetime.timedelta(hours=4))
+        long_attempt = EmployeeTestAttempt.objects.create(
+            employee=EmployeeProfile.objects.create(user=User.objects.create_user('bob'), employee_id='bob'),
+            test_schedule=long_schedule)
+        EmployeeTestAttempt.objects.filter(id=long_attempt.id).update(start_time=self.now - datetime.timedelta(minutes=60))
+        short_attempt = self.start('alice', datetime.timedelta(minutes=60)) # 30 minutes past its deadline
+
+        self.assertEqual(find_expired_attempt_ids(self.now), [short_attempt.id])
+        self.assertEqual(sweep_expired_attempts(self.now), 1)
+        # The long one once it is past its own time limit
+        self.assertEqual(find_expired_attempt_ids(self.now + datetime.timedelta(minutes=121)), [long_attempt.id])
+
+    def test_submission_overtaken_by_the_sweep_is_merged(self):
+        attempt = self.start('alice', datetime.timedelta(minutes=30, seconds=5), correct_answers=1)
+        # The sweep ran a little later (another process, or a skewed clock) and closed the attempt
+        self.assertEqual(sweep_expired_attempts(self.now + datetime.timedelta(seconds=20)), 1)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.correct_count, 1)
+
+        posted = {f'question_{question.id}': question.correct_option for question in attempt.paper[1:3]}
+        response = self.clients['alice'].post(reverse('submit_exam', args=[self.schedule.id]), posted)
+        self.assertRedirects(response, reverse('view_employee_result', args=[attempt.id]), fetch_redirect_response=False)
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.correct_count, attempt.score), (3, Decimal('75')))
+        self.assertEqual(attempt.end_time, attempt_deadline(attempt)) # Still closed at the deadline
+
+    def test_submissions_after_the_grace_period_are_not_merged(self):
+        attempt = self.start('alice', datetime.timedelta(minutes=31), correct_answers=1)
+        sweep_expired_attempts()
+        posted = {f'question_{question.id}': question.correct_option for question in attempt.paper}
+        response = self.clients['alice'].post(reverse('submit_exam', args=[self.schedule.id]), posted, follow=True)
+        self.assertContains(response, 'This exam has already been submitted.')
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.correct_count, 1)
+
+    def test_repeated_submission_is_not_graded_again(self):
+        attempt = self.start('alice', datetime.timedelta(minutes=5))
+        client = self.clients['alice']
+        client.post(reverse('submit_exam', args=[self.schedule.id]), {f'question_{attempt.paper[0].id}': 'D'})
+        client.post(reverse('submit_exam', args=[self.schedule.id]),
+                    {f'question_{question.id}': question.correct_option for question in attempt.paper})
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.correct_count, 0)
+        self.assertEqual(self.answers(attempt)[attempt.paper[0].id], 'D')
+
+
+class QueryPlanTest(TestCase):
+    """The employee-facing hot queries must be index lookups, never full table scans."""
+
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        technology = Technology.objects.create(name='Python')
+        self.schedules = [TestSchedule.objects.create(
+            technology=technology, is_active=True, start_time=now - datetime.timedelta(hours=1),
+            end_time=now + datetime.timedelta(hours=i + 1)) for i in range(3)]
+        for i in range(3):
+            user = User.objects.create_user(f'employee{i}', password='pw')
+            employee = EmployeeProfile.objects.create(user=user, employee_id=f'E{i}')
+            EmployeeTestAttempt.objects.create(employee=employee, test_schedule=self.schedules[0], is_completed=True,
+                                               score=Decimal(50 + i), end_time=now)
+            EmployeeTestAttempt.objects.create(employee=employee, test_schedule=self.schedules[1])
+        self.user = user
+        self.client.force_login(user)
+
+    def assertNoFullTableScans(self, queries):
+        for query in queries:
+            if query['sql'].startswith('SELECT'):
+                self.assertEqual(full_table_scans(query['sql']), [], f"{query['sql']}\n{query_plan(query['sql'])}")
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', "Checks SQLite query plans.")
+    def test_dashboard_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('employee_dashboard'))
+        self.assertNoFullTableScans(queries)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', "Checks SQLite query plans.")
+    def test_result_page_queries(self):
+        attempt = EmployeeTestAttempt.objects.get(employee__user=self.user, is_completed=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('view_employee_result', args=[attempt.id]))
+        self.assertNoFullTableScans(queries)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', "Checks SQLite query plans.")
+    def test_expiry_sweep_reads_only_open_attempts(self):
+        with CaptureQueriesContext(connection) as queries:
+            find_expired_attempt_ids(timezone.now() + datetime.timedelta(days=1))
+        self.assertNoFullTableScans(queries)
+
+
+@override_settings(SLOW_REQUEST_THRESHOLD=60) # Waiting out the other submissions is the point here
+class SubmissionConcurrencyTest(TransactionTestCase):
+    """Exam-day submissions through submit_exam, against a file database with the production SQLite settings.
+
+    The in-memory test database doesn't use WAL or the busy timeout, so each thread here (the
+    test's and one per candidate) uses a connection to a migrated temporary file database as its
+    'default': every candidate submits at the same moment, and each submission must be graded and
+    stored without a "database is locked".
+    """
+
+    candidates = 48
+    questions_per_paper = 50
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_dict = {**connections['default'].settings_dict, 'NAME': os.path.join(directory.name, 'exam.sqlite3')}
+        # The in-memory test database stays open (its last connection closing would drop it)
+        memory_connection = connections['default']
+        self.addCleanup(connections.__setitem__, 'default', memory_connection) # Runs last
+        self.addCleanup(self.reset_process_caches)
+        self.use_file_database()
+        self.addCleanup(connections['default'].close)
+        call_command('migrate', verbosity=0, interactive=False)
+
+        self.schedule, _ = create_exam(question_count=self.questions_per_paper)
+        self.papers = {}
+        for i in range(self.candidates):
+            user = User.objects.create_user(f'candidate{i}') # No password to hash; the client logs in directly
+            EmployeeProfile.objects.create(user=user, employee_id=f'E{i}')
+            client = self.client_class()
+            client.force_login(user)
+            paper = client.get(reverse('take_exam', args=[self.schedule.id])).context['questions']
+            self.papers[client] = EmployeeTestAttempt.objects.get(employee__user=user).id, paper
+
+    def use_file_database(self):
+        # Connections are per thread: this only changes the calling thread's 'default'
+        connections['default'] = connections['default'].__class__(self.settings_dict, 'default')
+
+    def reset_process_caches(self):
+        # Entries loaded from the file database, whose ids the in-memory one reuses
+        cache.clear()
+        question_bank_cache.clear()
+        leaderboards.clear()
+        ContentType.objects.clear_cache()
+
+    def test_simultaneous_submissions_never_lock(self):
+        barrier = threading.Barrier(self.candidates)
+        errors, responses = [], []
+
+        def candidate(client, paper):
+            self.use_file_database()
+            try:
+                barrier.wait()
+                # Every question answered correctly on the final form, nothing autosaved before
+                responses.append(client.post(reverse('submit_exam', args=[self.schedule.id]),
+                                             {f'question_{question.id}': question.correct_option for question in paper}))
+            except Exception as exc: # A lock error surfaces here, raised through the test client
+                errors.append(exc)
+            finally:
+                connections['default'].close()
+
+        threads = [threading.Thread(target=candidate, args=(client, paper)) for client, (_, paper) in self.papers.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(response.status_code for response in responses), [302] * self.candidates)
+        with connections['default'].cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+        for attempt_id, paper in self.papers.values():
+            attempt = EmployeeTestAttempt.objects.get(id=attempt_id)
+            self.assertEqual((attempt.is_completed, attempt.correct_count, attempt.score), (True, self.questions_per_paper, 100))
+            self.assertEqual(dict(Answer.objects.filter(test_attempt_id=attempt_id).values_list('question_id', 'selected_option')),
+                             {question.id: question.correct_option for question in paper})
+
+
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        metrics.clear()
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='pw')
+        EmployeeProfile.objects.create(user=self.user, employee_id='E1')
+        self.client.force_login(self.user)
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode()
+
+    def test_requests_are_recorded_per_url_name(self):
+        for _ in range(2):
+            self.client.get(reverse('employee_dashboard'))
+        self.client.get('/no/such/page/')
+        text = self.scrape()
+        self.assertIn('examhub_requests_total{view="employee_dashboard",method="GET",status="200"} 2', text)
+        self.assertIn('examhub_request_duration_seconds_bucket{view="employee_dashboard",method="GET",le="+Inf"} 2', text)
+        self.assertIn('examhub_request_duration_seconds_count{view="employee_dashboard",method="GET"} 2', text)
+        self.assertIn('examhub_requests_total{view="unmatched",method="GET",status="404"} 1', text)
+        samples = dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+        self.assertGreater(float(samples['examhub_request_db_queries_sum{view="employee_dashboard",method="GET"}']), 0)
+        self.assertGreater(float(samples['examhub_request_db_seconds_total{view="employee_dashboard",method="GET"}']), 0)
+        self.assertGreater(float(samples['examhub_request_template_seconds_total{view="employee_dashboard",method="GET"}']), 0)
+        self.assertEqual(samples['examhub_slow_requests_total{view="employee_dashboard",method="GET"}'], '0')
+
+    @override_settings(SLOW_REQUEST_THRESHOLD=0)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs('examhub.slow_requests', 'WARNING') as logs:
+            self.client.get(reverse('employee_dashboard'))
+            text = self.scrape() # Itself logged too, at this threshold
+        self.assertIn('Slow request GET /employee/dashboard/ (employee_dashboard, 200)', logs.output[0])
+        self.assertIn('FROM "employee_employeetestattempt"', logs.output[0])
+        self.assertIn('examhub_slow_requests_total{view="employee_dashboard",method="GET"} 1', text)
+
+    def test_metrics_endpoint_is_restricted(self):
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.1.2.3').status_code, 403)
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.1.2.3').status_code, 200)
+
+
+class CacheLayerTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='pw', first_name='Alice')
+        employee = EmployeeProfile.objects.create(user=self.user, employee_id='E1')
+        now = timezone.now()
+        self.technology = Technology.objects.create(name='Python')
+        schedule = TestSchedule.objects.create(technology=self.technology, start_time=now - datetime.timedelta(hours=1),
+                                               end_time=now + datetime.timedelta(hours=1))
+        self.attempt = EmployeeTestAttempt.objects.create(employee=employee, test_schedule=schedule, end_time=now,
+                                                          score=50, is_completed=True, question_count=2)
+        for i, selected in enumerate('AB'):
+            question = Question.objects.create(technology=self.technology, question_text=f'Question {i}', option_a='a',
+                                               option_b='b', option_c='c', option_d='d', correct_option='A')
+            Answer.objects.create(test_attempt=self.attempt, question=question, selected_option=selected)
+
+    def test_home_page_is_cached_for_anonymous_visitors_only(self):
+        response = self.client.get(reverse('home'))
+        self.assertTemplateUsed(response, 'home.html')
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.templates, []) # Served from the cache
+        self.assertContains(response, 'Register')
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('home'))
+        self.assertTemplateUsed(response, 'home.html')
+        self.assertContains(response, 'Welcome, Alice')
+
+    def test_answer_breakdown_is_cached_per_attempt(self):
+        self.client.force_login(self.user)
+        url = reverse('view_employee_result', args=[self.attempt.id])
+        self.assertContains(self.client.get(url), 'Question 1')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, 'Question 1')
+        self.assertFalse([query for query in queries if 'questionbank_answer' in query['sql']])
+
+        # Editing a question bumps the bank version, which is part of the fragment's key
+        Question.objects.filter(question_text='Question 0').update(question_text='Edited question')
+        bump_question_bank_version(self.technology.id)
+        self.assertContains(self.client.get(url), 'Edited question')
+
+    def test_lookups_are_counted_and_reported(self):
+        before = cache_stats()['default']
+        hits, misses = before.hits, before.misses
+        cache.get('absent')
+        cache.set('present', 1)
+        cache.get('present')
+        self.assertEqual(cache.get_many(['present', 'absent']), {'present': 1})
+        self.assertEqual((before.hits - hits, before.misses - misses), (2, 2))
+
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+        self.client.force_login(self.user)
+        text = self.client.get(reverse('metrics')).content.decode()
+        samples = dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+        self.assertGreaterEqual(int(samples['examhub_cache_lookups_total{cache="default",result="hit"}']), hits + 2)
+        self.assertGreaterEqual(int(samples['examhub_cache_lookups_total{cache="default",result="miss"}']), misses + 2)
+        self.assertTrue(0 < float(samples['examhub_cache_hit_ratio{cache="default"}']) < 1)
+
+    def test_file_based_cache_counts_lookups(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CACHES={'default': {'BACKEND': 'ExamHub.cache.FileBasedCache', 'LOCATION': directory}}):
+                caches['default'].set('present', 1)
+                caches['default'].get('present')
+                caches['default'].get('absent')
+                stats = cache_stats()['default']
+                self.assertGreaterEqual(stats.hits, 1)
+                self.assertGreaterEqual(stats.misses, 1)
+                self.assertEqual(stats, caches['default'].stats)
+
+
+    def test_deploy_check_warns_about_per_process_cache(self):
+        self.assertEqual([message.id for message in check_shared_cache(None)], ['employee.W001'])
+        with override_settings(CACHES={'default': {'BACKEND': 'ExamHub.cache.FileBasedCache', 'LOCATION': '/tmp/examhub'}}):
+            self.assertEqual(check_shared_cache(None), [])
@@ -8,7 +8,9 @@ urlpatterns = [
     path('register/', views.employee_register, name='employee_register'),
     path('logout/', CustomLogoutView.as_view(next_page='home'), name='employee_logout'), # Using Django's LogoutView
     path('dashboard/', views.employee_dashboard, name='employee_dashboard'),
+    path('api/summary/', views.employee_summary_api, name='employee_summary_api'),
     path('exam/<int:test_schedule_id>/', views.take_exam, name='take_exam'),
     path('exam/<int:test_schedule_id>/submit/', views.submit_exam, name='submit_exam'), # Dedicated URL for submission
+    path('exam/<int:test_schedule_id>/autosave/', views.autosave_answer, name='autosave_answer'), # Per-question autosave
     path('results/<int:attempt_id>/', views.view_employee_result, name='view_employee_result'),
 ]
\ No newline at end of file
@@ -2,16 +2,33 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
 from django.utils import timezone # Use Django's timezone aware datetime
 from django.contrib.auth.views import LogoutView
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.views.decorators.http import require_POST
 
 from .forms import EmployeeLoginForm, EmployeeRegistrationForm
 from .models import EmployeeProfile, EmployeeTestAttempt
+from .autosave import save_answer
+from .fragments import render_question_cards
+from .expiry import attempt_deadline, closed_on_timeout, finalize_attempts, submission_grace
+from .summary import get_employee_summary
+from ExamHub.db import retry_on_lock
 from administrator.models import TestSchedule, Technology
 from questionbank.models import Question, Answer # Important: Answer model is tied to Question and EmployeeTestAttempt
+from questionbank.cache import get_question_bank
+from questionbank.papers import generate_paper, get_paper_questions, load_answer_key
+from results.grading import grade_selections, apply_grade
+from results.leaderboard import record_completed_attempts, attach_rankings
 
 import datetime
-import random # For randomizing questions
+
+VALID_OPTIONS = {code for code, _ in Question.OPTION_CHOICES}
 
 # --- Authentication Views ---
 def employee_login(request):
@@ -67,47 +84,45 @@ class CustomLogoutView(LogoutView):
 @login_required
 def employee_dashboard(request):
     try:
-        employee_profile = request.user.employee_profile
+        summary = get_employee_summary(request.user)
     except EmployeeProfile.DoesNotExist:
         messages.error(request, "Your employee profile is missing. Please contact administration.")
         logout(request) # Log out invalid users
         return redirect('employee_login')
+    return render(request, 'employee/dashboard.html', {'summary': summary})
 
-    current_time = timezone.now()
-
-    # Get available tests
-    available_tests = TestSchedule.objects.filter(
-        is_active=True,
-        start_time__lte=current_time,
-        end_time__gte=current_time
-    ).exclude(employeetestattempt__employee=employee_profile, employeetestattempt__is_completed=True) # Exclude already completed tests
-
-    # Get ongoing tests (started but not completed)
-    ongoing_tests = EmployeeTestAttempt.objects.filter(
-        employee=employee_profile,
-        is_completed=False,
-        test_schedule__end_time__gte=current_time # Still within the test schedule's end time
-    ).select_related('test_schedule__technology')
 
-    # Get past attempts/results
-    past_attempts = EmployeeTestAttempt.objects.filter(
-        employee=employee_profile,
-        is_completed=True
-    ).order_by('-end_time').select_related('test_schedule__technology')
-
-    context = {
-        'employee': employee_profile,
-        'available_tests': available_tests,
-        'ongoing_tests': ongoing_tests,
-        'past_attempts': past_attempts,
-    }
-    return render(request, 'employee/dashboard.html', context)
+@login_required
+def employee_summary_api(request):
+    # Polled by dashboards: answers 304 Not Modified (no body) while the summary is unchanged
+    try:
+        summary = get_employee_summary(request.user)
+    except EmployeeProfile.DoesNotExist:
+        return JsonResponse({'error': "Employee profile not found."}, status=404)
+    etag = quote_etag(summary['etag'])
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse({key: value for key, value in summary.items() if key != 'etag'})
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 # --- Exam Taking Views ---
+@retry_on_lock
+def start_attempt(employee_profile, test_schedule, current_time):
+    with transaction.atomic():
+        test_attempt = EmployeeTestAttempt.objects.create(
+            employee=employee_profile,
+            test_schedule=test_schedule,
+            start_time=current_time,
+            is_completed=False
+        )
+        return test_attempt, generate_paper(test_attempt)
+
 @login_required
 def take_exam(request, test_schedule_id):
-    test_schedule = get_object_or_404(TestSchedule, id=test_schedule_id)
+    test_schedule = get_object_or_404(TestSchedule.objects.select_related('technology'), id=test_schedule_id)
     employee_profile = request.user.employee_profile
     current_time = timezone.now()
 
@@ -121,6 +136,8 @@ def take_exam(request, test_schedule_id):
         employee=employee_profile,
         test_schedule=test_schedule
     ).first()
+    if test_attempt:
+        test_attempt.test_schedule = test_schedule # Reuse the schedule and technology loaded above
 
     if test_attempt and test_attempt.is_completed:
         messages.warning(request, "You have already completed this test.")
@@ -128,8 +145,10 @@ def take_exam(request, test_schedule_id):
     elif test_attempt and not test_attempt.is_completed:
         # Resume an ongoing test
         if current_time > test_attempt.start_time + datetime.timedelta(minutes=test_schedule.duration_minutes):
-            messages.error(request, "Time limit for this test has expired. Submitting your answers.")
-            return redirect('submit_exam', test_schedule_id=test_schedule.id) # Force submission
+            # Grade the answers saved so far and close the attempt
+            finalize_attempts([test_attempt.id])
+            messages.error(request, "Time limit for this test has expired. Your saved answers have been submitted.")
+            return redirect('view_employee_result', attempt_id=test_attempt.id)
         # Calculate time left
         time_elapsed_seconds = (current_time - test_attempt.start_time).total_seconds()
         remaining_time_seconds = (test_schedule.duration_minutes * 60) - time_elapsed_seconds
@@ -137,29 +156,27 @@ def take_exam(request, test_schedule_id):
 
         # Retrieve previously answered questions to pre-fill if any
         existing_answers = {ans.question_id: ans.selected_option for ans in test_attempt.answers.all()}
-        questions = list(Question.objects.filter(technology=test_schedule.technology).order_by('?')[:test_schedule.total_questions])
+        questions = get_paper_questions(test_attempt) # Same paper as when the attempt was started
 
     else:
-        # Create a new attempt
-        test_attempt = EmployeeTestAttempt.objects.create(
-            employee=employee_profile,
-            test_schedule=test_schedule,
-            start_time=current_time,
-            is_completed=False
-        )
+        # Create a new attempt and persist its paper (already in random order) together
+        test_attempt, questions = start_attempt(employee_profile, test_schedule, current_time)
         messages.info(request, "Exam started. Good luck!")
-        # Get questions for the first time
-        questions = list(Question.objects.filter(technology=test_schedule.technology).order_by('?')[:test_schedule.total_questions])
-        random.shuffle(questions) # Shuffle to ensure different order each time
         remaining_time_seconds = test_schedule.duration_minutes * 60
         existing_answers = {}
 
+    # Only the first page is rendered here; the rest is fetched lazily from the paper API
+    question_bank = get_question_bank(test_schedule.technology)
+    page_size = settings.EXAM_PAPER_PAGE_SIZE
     context = {
         'test_schedule': test_schedule,
         'questions': questions,
+        'question_cards': render_question_cards(question_bank, questions[:page_size], existing_answers),
+        'has_more_questions': len(questions) > page_size,
+        'page_size': page_size,
         'test_attempt_id': test_attempt.id,
         'time_left_seconds': int(remaining_time_seconds),
-        'existing_answers': existing_answers,
+        'existing_answers': {str(qid): option for qid, option in existing_answers.items() if option},
     }
     return render(request, 'employee/exam.html', context)
 
@@ -170,77 +187,139 @@ def submit_exam(request, test_schedule_id):
         messages.error(request, "Invalid request method for exam submission.")
         return redirect('employee_dashboard')
 
-    test_schedule = get_object_or_404(TestSchedule, id=test_schedule_id)
+    test_schedule = get_object_or_404(TestSchedule.objects.select_related('technology'), id=test_schedule_id)
     employee_profile = request.user.employee_profile
     current_time = timezone.now()
 
-    test_attempt = get_object_or_404(EmployeeTestAttempt,
-                                     employee=employee_profile,
-                                     test_schedule=test_schedule,
-                                     is_completed=False) # Only process incomplete attempts
+    @retry_on_lock
+    def seal_attempt():
+        with transaction.atomic():
+            # Lock the attempt so a double-click or a timer auto-submit cannot grade it twice
+            test_attempt = get_object_or_404(EmployeeTestAttempt.objects.select_for_update(of=('self',)),
+                                             employee=employee_profile,
+                                             test_schedule=test_schedule)
+            test_attempt.test_schedule = test_schedule
+            if test_attempt.is_completed:
+                # Only the page's submission at the deadline, overtaken by the expiry sweep, is
+                # still taken: its answers are merged into the attempt, which is graded again
+                if not (closed_on_timeout(test_attempt)
+                        and current_time <= attempt_deadline(test_attempt) + submission_grace()):
+                    return test_attempt, None
+
+            # Only the questions served on this attempt's paper are recorded and graded
+            answer_key = load_answer_key(test_attempt)
+            if not answer_key:
+                # Attempts started before papers were persisted: fall back to the questions that were posted
+                posted_ids = [int(key[len('question_'):]) for key in request.POST
+                              if key.startswith('question_') and key[len('question_'):].isdigit()]
+                bank_answer_key = get_question_bank(test_schedule.technology).answer_key
+                answer_key = {question_id: bank_answer_key[question_id] for question_id in posted_ids if question_id in bank_answer_key}
+
+            # Start from the autosaved answers, then apply whatever the final form posted
+            selections = {ans.question_id: ans.selected_option for ans in test_attempt.answers.all()}
+
+            for question_id in answer_key:
+                field_name = f'question_{question_id}'
+                if field_name in request.POST:
+                    selections[question_id] = request.POST.get(field_name) or None # None if not answered
+                if selections.get(question_id) not in VALID_OPTIONS:
+                    selections[question_id] = None
+            # Record an answer for every served question, regardless of whether it's chosen
+            answers = [
+                Answer(test_attempt=test_attempt, question_id=question_id, selected_option=selections[question_id])
+                for question_id in answer_key
+            ]
+            grade = grade_selections(answer_key, selections)
+
+            # Seal the attempt: upsert the final answers for the whole paper in one batched write
+            Answer.objects.bulk_create(
+                answers,
+                update_conflicts=True,
+                unique_fields=['test_attempt', 'question'],
+                update_fields=['selected_option'],
+            )
+
+            graded_fields = apply_grade(test_attempt, grade)
+            if not test_attempt.is_completed:
+                test_attempt.is_completed = True
+                test_attempt.end_time = current_time
+                graded_fields += ['is_completed', 'end_time']
+            test_attempt.save(update_fields=graded_fields)
+            record_completed_attempts(test_attempt)
+            if 'is_completed' not in graded_fields:
+                # Regraded: drop the answer breakdown cached for the result page
+                fragment_key = make_template_fragment_key(
+                    'attempt-answers', [test_attempt.id, test_schedule.technology.question_bank_version])
+                transaction.on_commit(lambda: cache.delete(fragment_key))
+        return test_attempt, grade
+
+    test_attempt, grade = seal_attempt()
+    if grade is None:
+        messages.info(request, "This exam has already been submitted.")
+        return redirect('view_employee_result', attempt_id=test_attempt.id)
 
-    # Ensure exam is submitted within valid time limit (or force submit if time up)
+    # Tell the candidate if the exam was submitted late (it is graded all the same)
     if current_time > test_attempt.start_time + datetime.timedelta(minutes=test_schedule.duration_minutes):
         messages.warning(request, "Your exam was automatically submitted as the time limit expired.")
     elif current_time > test_schedule.end_time:
         messages.warning(request, "The exam window has closed. Your exam was automatically submitted.")
 
-    questions = Question.objects.filter(technology=test_schedule.technology)
-  
-    score = 0
-    total_possible_marks = 0
-    # Clear previous answers for this attempt before saving new ones (in case of re-submission/resume)
-    test_attempt.answers.all().delete()
-
-    for question in questions:
-        selected_option = request.POST.get(f'question_{question.id}')
-        # Record the answer regardless of whether it's correct or chosen
-        Answer.objects.create(
-            test_attempt=test_attempt,
-            question=question,
-            selected_option=selected_option # This will be None if not answered
-        )
-        total_possible_marks += question.marks
-        if selected_option == question.correct_option:
-            score += question.marks
+    messages.success(request, f"Exam submitted! Your score: {grade.percentage:.2f}%")
+    return redirect('view_employee_result', attempt_id=test_attempt.id)
 
-    # Calculate percentage score
-    # Ensure no division by zero if there are no questions
-    percentage_score = (score / total_possible_marks) * 100 if total_possible_marks > 0 else 0
 
-    test_attempt.score = percentage_score
-    test_attempt.is_completed = True
-    test_attempt.end_time = current_time
-    test_attempt.save()
+@login_required
+@require_POST
+def autosave_answer(request, test_schedule_id):
+    # Called by the exam page whenever an answer changes; each change is written through at once
+    test_attempt = EmployeeTestAttempt.objects.filter(
+        employee__user=request.user,
+        test_schedule_id=test_schedule_id,
+        is_completed=False
+    ).select_related('test_schedule').first()
+    if test_attempt is None:
+        return JsonResponse({'saved': False, 'error': 'No ongoing attempt for this test.'}, status=404)
+
+    test_schedule = test_attempt.test_schedule
+    current_time = timezone.now()
+    if (current_time > test_attempt.start_time + datetime.timedelta(minutes=test_schedule.duration_minutes)
+            or current_time > test_schedule.end_time):
+        return JsonResponse({'saved': False, 'error': 'Time limit for this test has expired.'}, status=409)
+
+    question_id = request.POST.get('question_id', '')
+    selected_option = request.POST.get('selected_option') or None
+    if not question_id.isdigit() or (selected_option is not None and selected_option not in VALID_OPTIONS):
+        return JsonResponse({'saved': False, 'error': 'Invalid answer.'}, status=400)
+    if not test_attempt.paper_questions.filter(question_id=int(question_id)).exists():
+        return JsonResponse({'saved': False, 'error': 'Question is not part of this paper.'}, status=400)
 
-    messages.success(request, f"Exam submitted! Your score: {percentage_score:.2f}%")
-    return redirect('view_employee_result', attempt_id=test_attempt.id)
+    if not save_answer(test_attempt.id, int(question_id), selected_option):
+        return JsonResponse({'saved': False, 'error': 'This test has already been submitted.'}, status=409)
+    return JsonResponse({'saved': True})
 
 
 # --- Employee Result View ---
 @login_required
 def view_employee_result(request, attempt_id):
     employee_profile = request.user.employee_profile
-    attempt = get_object_or_404(EmployeeTestAttempt, id=attempt_id, employee=employee_profile, is_completed=True)
+    attempt = get_object_or_404(
+        EmployeeTestAttempt.objects.select_related('employee__user', 'test_schedule__technology'),
+        id=attempt_id, employee=employee_profile, is_completed=True
+    )
     answers = Answer.objects.filter(test_attempt=attempt).select_related('question').order_by('question__id')
 
-    # Calculate summary details
-    correct_count = 0
-    total_marks_obtained = 0
-    total_possible_marks = 0
-
-    for ans in answers:
-        total_possible_marks += ans.question.marks
-        if ans.selected_option == ans.question.correct_option:
-            correct_count += 1
-            total_marks_obtained += ans.question.marks
+    attach_rankings([attempt])
 
+    # Summary details were computed once at submission time
     context = {
         'attempt': attempt,
         'answers': answers,
-        'correct_count': correct_count,
-        'total_questions': answers.count(),
-        'total_marks_obtained': total_marks_obtained,
-        'total_possible_marks': total_possible_marks,
+        'correct_count': attempt.correct_count,
+        'total_questions': attempt.question_count,
+        'total_marks_obtained': attempt.marks_obtained,
+        'total_possible_marks': attempt.total_marks,
+        'rank': attempt.rank,
+        'percentile': attempt.percentile,
+        'ranked_count': attempt.ranked_count,
     }
     return render(request, 'results/employee_result.html', context) # Re-use results app template
\ No newline at end of file
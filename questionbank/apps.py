@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class QuestionbankConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'questionbank'
+
+    def ready(self):
+        from . import signals # noqa: F401 -- connects the search index receivers
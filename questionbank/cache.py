@@ -0,0 +1,102 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from administrator.models import Technology
+from .models import Question
+
+
+class QuestionBank:
+    """Snapshot of one technology's questions at a given question bank version."""
+
+    __slots__ = ('technology_id', 'version', 'questions', 'question_ids', 'answer_key', 'fragments')
+
+    def __init__(self, technology_id, version, questions):
+        self.technology_id = technology_id
+        self.version = version
+        self.questions = {question.id: question for question in questions}
+        self.question_ids = list(self.questions) # Pool that papers are sampled from
+        self.answer_key = {question.id: (question.correct_option, question.marks) for question in questions}
+        self.fragments = {} # question_id -> pre-rendered HTML parts, filled lazily by the exam page
+
+
+class QuestionBankCache:
+    """In-process LRU cache of question banks, keyed by technology and checked against its version.
+
+    Exam pages read questions, options, the answer key and marks from here, so the
+    `questionbank_question` table is only queried again after the bank version changes.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._banks = OrderedDict() # technology_id -> QuestionBank, least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, technology_id, version):
+        with self._lock:
+            bank = self._banks.get(technology_id)
+            if bank is not None and bank.version == version:
+                self._banks.move_to_end(technology_id)
+                self.hits += 1
+                return bank
+            self.misses += 1
+
+        bank = QuestionBank(technology_id, version, list(Question.objects.filter(technology_id=technology_id).order_by('id')))
+        with self._lock:
+            self._banks[technology_id] = bank
+            self._banks.move_to_end(technology_id)
+            while len(self._banks) > self.max_entries:
+                self._banks.popitem(last=False)
+                self.evictions += 1
+        return bank
+
+    def discard(self, *technology_ids):
+        with self._lock:
+            for technology_id in technology_ids:
+                self._banks.pop(technology_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._banks.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self._banks),
+                'max_entries': self.max_entries,
+                'cached_questions': sum(len(bank.questions) for bank in self._banks.values()),
+            }
+
+
+question_bank_cache = QuestionBankCache(max_entries=getattr(settings, 'QUESTION_BANK_CACHE_MAX_TECHNOLOGIES', 32))
+
+
+def get_question_bank(technology):
+    return question_bank_cache.get(technology.id, technology.question_bank_version)
+
+
+def bump_question_bank_version(*technology_ids):
+    # Called whenever questions of a technology are added, moved or deleted; every process
+    # sees the new version on its next lookup and reloads the bank.
+    technology_ids = {technology_id for technology_id in technology_ids if technology_id is not None}
+    if technology_ids:
+        Technology.objects.filter(id__in=technology_ids).update(question_bank_version=F('question_bank_version') + 1)
+
+
+def question_bank_changed(*technology_ids):
+    # For row-by-row question writes (questionbank/signals.py): this process's banks are dropped
+    # at once, and the version is bumped for every process once the change is committed
+    technology_ids = {technology_id for technology_id in technology_ids if technology_id is not None}
+    question_bank_cache.discard(*technology_ids)
+    transaction.on_commit(lambda: bump_question_bank_version(*technology_ids))
@@ -0,0 +1,183 @@
+import csv
+import io
+import itertools
+import json
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from administrator.forms import QuestionImportForm
+from administrator.stats import increment_counters
+from .cache import bump_question_bank_version
+from .models import Question
+from .search import get_search_backend
+from .similarity import LSHIndex, index_questions, match_signatures, question_signature
+
+# Bulk import of questions into one technology. The file is read record by record (never fully
+# loaded), every record is validated with the same rules as the "Add Question" form, and valid
+# questions are written in batches. Invalid rows are reported and skipped; questions whose
+# content hash already exists in the technology (or earlier in the file) are skipped as duplicates.
+# A file that can't be parsed past some point (malformed JSON/CSV, not UTF-8) stops the import
+# there: the questions before it are kept, and the report says where reading stopped.
+# Near-duplicates (reworded copies, see questionbank/similarity.py) are imported but flagged.
+
+IMPORT_FIELDS = QuestionImportForm.Meta.fields
+JSON_READ_SIZE = 64 * 1024
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    duplicates: int = 0
+    errors: list = field(default_factory=list) # (row number, message) pairs
+    near_duplicates: list = field(default_factory=list) # (row number, message) pairs, rows were imported
+    read_error: tuple = None # (row number, message) of the row the file couldn't be read past
+
+    @property
+    def rows(self):
+        return self.created + self.duplicates + len(self.errors)
+
+
+def iter_csv_records(stream):
+    yield from csv.DictReader(stream)
+
+
+def iter_json_records(stream):
+    """Yield the objects of a JSON array, or of JSON Lines, reading the stream in chunks."""
+    buffer = stream.read(JSON_READ_SIZE).lstrip()
+    if buffer.startswith('['):
+        yield from _iter_json_array(buffer[1:], stream)
+    else:
+        yield from _iter_json_lines(buffer, stream)
+
+
+def _iter_json_array(buffer, stream):
+    decoder = json.JSONDecoder()
+    position = 0
+    while True:
+        # Skip whitespace and the comma between elements
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if buffer.startswith(']', position):
+            return
+        try:
+            record, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # Usually an element cut off at the end of the chunk: read on and retry
+            chunk = stream.read(JSON_READ_SIZE)
+            if not chunk:
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield record
+
+
+def _iter_json_lines(buffer, stream):
+    while True:
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        chunk = stream.read(JSON_READ_SIZE)
+        if not chunk:
+            break
+        buffer += chunk
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+def read_records(records, report):
+    """Yield (row number, record), stopping at the first row that can't be parsed (noted in `report`)."""
+    records = iter(records)
+    for row_number in itertools.count(1):
+        try:
+            record = next(records)
+        except StopIteration:
+            return
+        except (ValueError, UnicodeDecodeError, csv.Error) as e: # Malformed JSON/CSV or not UTF-8
+            report.read_error = (row_number, str(e))
+            return
+        yield row_number, record
+
+
+def open_records(uploaded_file, filename):
+    """Iterate the records of a binary file object, choosing the parser from the file name."""
+    stream = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+    if filename.lower().endswith(('.json', '.jsonl')):
+        return iter_json_records(stream)
+    return iter_csv_records(stream)
+
+
+def clean_record(record):
+    if not isinstance(record, dict):
+        return None
+    data = {name: str(record.get(name) if record.get(name) is not None else '').strip() for name in IMPORT_FIELDS}
+    data['correct_option'] = data['correct_option'].upper()
+    if not data['marks']:
+        data['marks'] = str(Question._meta.get_field('marks').default) # Same default as the model
+    return data
+
+
+def import_questions(records, technology, batch_size=500):
+    """Validate and insert `records` (an iterable of dicts) as questions of `technology`."""
+    report = ImportReport()
+    seen_hashes = set(Question.objects.filter(technology=technology).values_list('content_hash', flat=True))
+    file_index = LSHIndex() # Signatures of the rows imported so far, by row number
+    imported_ids = []
+    batch = [] # (row number, question, signature, near-duplicate rows of this file)
+
+    def write_batch():
+        questions = [question for _, question, _, _ in batch]
+        signatures = [signature for _, _, signature, _ in batch]
+        # Questions that were in the bank before this import; rows of this file are matched in memory
+        stored_matches = match_signatures(technology.id, signatures, exclude_ids=imported_ids)
+        for (row_number, _, _, file_matches), matches in zip(batch, stored_matches):
+            similar = [(f"question #{question.id}", score) for question, score in matches]
+            similar += [(f"row {other_row}", score) for other_row, score in file_matches]
+            if similar:
+                description, score = max(similar, key=lambda match: match[1])
+                report.near_duplicates.append((row_number, f"Similar to {description} ({score:.0%})."))
+
+        with transaction.atomic():
+            Question.objects.bulk_create(questions)
+            # bulk_create sends no post_save, so update the counters and indexes here
+            increment_counters(total_questions=len(questions))
+            get_search_backend().index(questions)
+            index_questions(questions, signatures)
+        imported_ids.extend(question.id for question in questions)
+        report.created += len(questions)
+        batch.clear()
+
+    try:
+        for row_number, record in read_records(records, report):
+            data = clean_record(record)
+            if data is None:
+                report.errors.append((row_number, "Expected an object with question fields."))
+                continue
+            form = QuestionImportForm(data)
+            if not form.is_valid():
+                messages = [f"{name}: {' '.join(errors)}" for name, errors in form.errors.items()]
+                report.errors.append((row_number, '; '.join(messages)))
+                continue
+
+            question = form.save(commit=False)
+            question.technology = technology
+            question.content_hash = question.compute_content_hash()
+            if question.content_hash in seen_hashes:
+                report.duplicates += 1
+                continue
+            seen_hashes.add(question.content_hash)
+            signature = question_signature(question)
+            batch.append((row_number, question, signature, file_index.query(signature)))
+            file_index.add(row_number, signature)
+            if len(batch) >= batch_size:
+                write_batch()
+
+        if batch:
+            write_batch()
+    finally:
+        # Each batch is committed on its own, so even an import that fails halfway has changed the bank
+        if report.created:
+            bump_question_bank_version(technology.id)
+    return report
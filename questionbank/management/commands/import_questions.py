@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from administrator.models import Technology
+from questionbank.importer import import_questions, open_records
+
+
+class Command(BaseCommand):
+    help = "Import questions for one technology from a CSV, JSON array or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import (.csv, .json or .jsonl).")
+        parser.add_argument('--technology', required=True, help="Name of the technology the questions belong to.")
+        parser.add_argument('--create-technology', action='store_true',
+                            help="Create the technology if it doesn't exist yet.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Questions inserted per transaction.")
+
+    def handle(self, *args, **options):
+        if options['create_technology']:
+            technology, _ = Technology.objects.get_or_create(name=options['technology'])
+        else:
+            technology = Technology.objects.filter(name=options['technology']).first()
+            if technology is None:
+                raise CommandError(f"Technology '{options['technology']}' not found (use --create-technology).")
+
+        try:
+            with open(options['path'], 'rb') as source:
+                report = import_questions(open_records(source, options['path']), technology,
+                                          batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(f"Could not open {options['path']}: {e}")
+
+        for row_number, message in report.errors:
+            self.stderr.write(f"Row {row_number}: {message}")
+        for row_number, message in report.near_duplicates:
+            self.stderr.write(f"Row {row_number} (imported): {message}")
+        self.stdout.write(f"{report.rows} row(s) read: {report.created} imported, "
+                          f"{report.duplicates} duplicate(s) skipped, {len(report.errors)} with errors, "
+                          f"{len(report.near_duplicates)} near-duplicate(s) flagged.")
+        if report.read_error:
+            row_number, error = report.read_error
+            raise CommandError(f"Could not read {options['path']} past row {row_number - 1}: {error} "
+                               f"(the {report.created} question(s) imported before it were kept).")
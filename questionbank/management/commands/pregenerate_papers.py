@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from administrator.models import TestSchedule
+from questionbank.papers import pregenerate_papers
+
+
+class Command(BaseCommand):
+    help = "Build question papers ahead of time for active test schedules so exam starts only claim one."
+
+    def add_arguments(self, parser):
+        parser.add_argument('schedule_ids', nargs='*', type=int,
+                            help="Test schedule ids (default: every active schedule that hasn't ended).")
+        parser.add_argument('--count', type=int, default=None,
+                            help="Papers to keep ready per schedule (default: one per employee without an attempt).")
+
+    def handle(self, *args, **options):
+        test_schedules = TestSchedule.objects.select_related('technology')
+        if options['schedule_ids']:
+            test_schedules = test_schedules.filter(id__in=options['schedule_ids'])
+            if not test_schedules.exists():
+                raise CommandError("No test schedules found with the given ids.")
+        else:
+            test_schedules = test_schedules.filter(is_active=True, end_time__gte=timezone.now())
+
+        for test_schedule in test_schedules:
+            created = pregenerate_papers(test_schedule, count=options['count'])
+            self.stdout.write(f"{test_schedule}: {created} paper(s) prepared, "
+                              f"{test_schedule.prepared_papers.count()} ready")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from questionbank.search import get_search_backend
+from questionbank.similarity import rebuild_similarity_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the question search index and the near-duplicate bands from the question table."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        with transaction.atomic():
+            indexed = backend.rebuild()
+            banded = rebuild_similarity_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} question(s) with {type(backend).__name__}; "
+                                             f"near-duplicate bands rebuilt for {banded}."))
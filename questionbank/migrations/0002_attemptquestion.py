@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0001_initial'),
+        ('questionbank', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttemptQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(help_text="Position of the question in the attempt's paper (0-based).")),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='questionbank.question')),
+                ('test_attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paper_questions', to='employee.employeetestattempt')),
+            ],
+            options={
+                'ordering': ['test_attempt', 'position'],
+                'unique_together': {('test_attempt', 'question')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0002_technology_question_bank_version'),
+        ('questionbank', '0002_attemptquestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreparedPaper',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_bank_version', models.PositiveIntegerField(help_text='Technology question bank version the paper was sampled from; stale papers are never claimed.')),
+                ('question_ids', models.JSONField(help_text='Ordered ids of the questions on this paper.')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('test_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prepared_papers', to='administrator.testschedule')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
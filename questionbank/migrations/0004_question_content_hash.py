@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:52
+
+import hashlib
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def question_content_hash(technology_id, question_text, option_a, option_b, option_c, option_d, correct_option):
+    # Frozen copy of questionbank.models.question_content_hash as of this migration
+    parts = [str(technology_id), question_text, option_a, option_b, option_c, option_d, correct_option]
+    return hashlib.sha256('\x1f'.join((part or '').strip() for part in parts).encode()).hexdigest()
+
+
+def backfill_content_hash(apps, schema_editor):
+    Question = apps.get_model('questionbank', 'Question')
+    questions = []
+    for question in Question.objects.order_by('id').iterator(chunk_size=BATCH_SIZE):
+        question.content_hash = question_content_hash(
+            question.technology_id, question.question_text, question.option_a, question.option_b,
+            question.option_c, question.option_d, question.correct_option,
+        )
+        questions.append(question)
+        if len(questions) >= BATCH_SIZE:
+            Question.objects.bulk_update(questions, ['content_hash'])
+            questions.clear()
+    Question.objects.bulk_update(questions, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionbank', '0003_preparedpaper'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='SHA-256 of the technology, text, options and answer; finds exact duplicates.', max_length=64),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# FTS5 index used by questionbank.search.SQLiteFTSBackend; other databases use the plain
+# substring fallback and get no table. The rowid is the question id.
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS questionbank_question_fts USING fts5("
+        "question_text, option_a, option_b, option_c, option_d, technology_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO questionbank_question_fts "
+        "(rowid, question_text, option_a, option_b, option_c, option_d, technology_id) "
+        "SELECT id, question_text, option_a, option_b, option_c, option_d, technology_id FROM questionbank_question"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS questionbank_question_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionbank', '0004_question_content_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
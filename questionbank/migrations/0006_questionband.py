@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:01
+
+import random
+import re
+import zlib
+from array import array
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of the MinHash band keys of questionbank/similarity.py as of this migration (the
+# pure-Python path; the optional numpy one gives the same keys). Stored keys must keep matching
+# the live code, which NearDuplicateTest checks.
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+MASK_64 = (1 << 64) - 1
+_seeded = random.Random(0x5EED)
+PERMUTATIONS = [(_seeded.getrandbits(64) | 1, _seeded.getrandbits(64)) for _ in range(NUM_PERMUTATIONS)]
+BATCH_SIZE = 500 # Questions whose band rows are written at a time
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', (text or '').lower()))
+
+
+def question_band_keys(question):
+    options = [question.option_a, question.option_b, question.option_c, question.option_d]
+    text = ' | '.join([normalize(question.question_text), *sorted(normalize(option) for option in options)])
+    hashes = [zlib.crc32(text[i:i + SHINGLE_SIZE].encode()) for i in range(max(len(text) - SHINGLE_SIZE + 1, 1))]
+    signature = array('Q', [min(((a * h + b) & MASK_64) >> 32 for h in hashes) for a, b in PERMUTATIONS])
+    return [band << 32 | zlib.crc32(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+            for band in range(BANDS)]
+
+
+def backfill_bands(apps, schema_editor):
+    Question = apps.get_model('questionbank', 'Question')
+    QuestionBand = apps.get_model('questionbank', 'QuestionBand')
+    bands = []
+    for number, question in enumerate(Question.objects.order_by('id').iterator(chunk_size=BATCH_SIZE), start=1):
+        bands.extend(QuestionBand(question_id=question.id, technology_id=question.technology_id, key=key)
+                     for key in question_band_keys(question))
+        if number % BATCH_SIZE == 0:
+            QuestionBand.objects.bulk_create(bands)
+            bands.clear()
+    QuestionBand.objects.bulk_create(bands)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0004_dashboardcounter'),
+        ('questionbank', '0005_question_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(help_text='Band number and hash of the signature rows in that band.')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarity_bands', to='questionbank.question')),
+                ('technology', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='administrator.technology')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['technology', 'key'], name='questionban_technol_128be1_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_bands, migrations.RunPython.noop),
+    ]
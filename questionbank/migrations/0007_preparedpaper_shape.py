@@ -0,0 +1,32 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def discard_prepared_papers(apps, schema_editor):
+    # Papers prepared so far don't record what they were sampled for; they are rebuilt by
+    # `pregenerate_papers` (exam starts sample live papers until then)
+    apps.get_model('questionbank', 'PreparedPaper').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0005_testschedule_window_index'),
+        ('questionbank', '0006_questionband'),
+    ]
+
+    operations = [
+        migrations.RunPython(discard_prepared_papers, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='preparedpaper',
+            name='technology',
+            field=models.ForeignKey(default=0, on_delete=django.db.models.deletion.CASCADE, to='administrator.technology'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='preparedpaper',
+            name='total_questions',
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=False,
+        ),
+    ]
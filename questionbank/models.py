@@ -1,7 +1,14 @@
+import hashlib
+
 from django.db import models
-from administrator.models import Technology # Import Technology from administrator app
+from administrator.models import Technology, TestSchedule # Import from administrator app
 from employee.models import EmployeeTestAttempt # Import EmployeeTestAttempt
 
+def question_content_hash(technology_id, question_text, option_a, option_b, option_c, option_d, correct_option):
+    # Surrounding whitespace is ignored; anything else that differs makes a different question
+    parts = [str(technology_id), question_text, option_a, option_b, option_c, option_d, correct_option]
+    return hashlib.sha256('\x1f'.join((part or '').strip() for part in parts).encode()).hexdigest()
+
 # Model for individual questions
 class Question(models.Model):
     # Choices for options (A, B, C, D)
@@ -23,6 +30,8 @@ class Question(models.Model):
                                       help_text="Select the correct option (A, B, C, or D).")
     marks = models.DecimalField(max_digits=5, decimal_places=2, default=1.0,
                                 help_text="Marks awarded for correctly answering this question.")
+    content_hash = models.CharField(max_length=64, db_index=True, editable=False, default='',
+                                    help_text="SHA-256 of the technology, text, options and answer; finds exact duplicates.")
 
     class Meta:
         ordering = ['technology', 'id'] # Order for consistent display/management
@@ -30,6 +39,24 @@ class Question(models.Model):
     def __str__(self):
         return f"[{self.technology.name}] {self.question_text[:75]}..." # Display first 75 chars
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        question = super().from_db(db, field_names, values)
+        # The technology as stored, so a save that moves the question also refreshes the bank it left
+        question.stored_technology_id = question.__dict__.get('technology_id')
+        return question
+
+    def save(self, *args, **kwargs):
+        self.content_hash = self.compute_content_hash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content_hash' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'content_hash']
+        super().save(*args, **kwargs)
+
+    def compute_content_hash(self):
+        return question_content_hash(self.technology_id, self.question_text, self.option_a, self.option_b,
+                                     self.option_c, self.option_d, self.correct_option)
+
 # Model to store an employee's selected answer for a specific question in a specific attempt
 class Answer(models.Model):
     test_attempt = models.ForeignKey(EmployeeTestAttempt, on_delete=models.CASCADE, related_name='answers')
@@ -45,4 +72,50 @@ class Answer(models.Model):
         return f"Attempt {self.test_attempt.id} - Q{self.question.id} - Ans: {self.selected_option}"
 
     def is_correct(self):
-        return self.selected_option == self.question.correct_option
\ No newline at end of file
+        return self.selected_option == self.question.correct_option
+
+# Model to store the ordered question paper served to an employee for a specific attempt
+class AttemptQuestion(models.Model):
+    test_attempt = models.ForeignKey(EmployeeTestAttempt, on_delete=models.CASCADE, related_name='paper_questions')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    position = models.PositiveIntegerField(help_text="Position of the question in the attempt's paper (0-based).")
+
+    class Meta:
+        unique_together = ('test_attempt', 'question') # A question appears at most once per paper.
+        ordering = ['test_attempt', 'position']
+
+    def __str__(self):
+        return f"Attempt {self.test_attempt_id} - #{self.position + 1} - Q{self.question_id}"
+
+
+# Question paper built ahead of time for a test schedule, claimed by the next attempt that starts
+class PreparedPaper(models.Model):
+    test_schedule = models.ForeignKey(TestSchedule, on_delete=models.CASCADE, related_name='prepared_papers')
+    # What the paper was sampled for: papers that no longer match the schedule (edited since) or
+    # its question bank are never claimed. Versions are per technology, so both are needed.
+    technology = models.ForeignKey(Technology, on_delete=models.CASCADE)
+    total_questions = models.PositiveIntegerField()
+    question_bank_version = models.PositiveIntegerField(
+        help_text="Technology question bank version the paper was sampled from; stale papers are never claimed.")
+    question_ids = models.JSONField(help_text="Ordered ids of the questions on this paper.")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"Prepared paper {self.id} for {self.test_schedule}"
+
+
+# Locality-sensitive hash bands of a question's MinHash signature (see questionbank/similarity.py).
+# Questions sharing any band key with a new question are its near-duplicate candidates.
+class QuestionBand(models.Model):
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='similarity_bands')
+    technology = models.ForeignKey(Technology, on_delete=models.CASCADE)
+    key = models.BigIntegerField(help_text="Band number and hash of the signature rows in that band.")
+
+    class Meta:
+        indexes = [models.Index(fields=['technology', 'key'])]
+
+    def __str__(self):
+        return f"Q{self.question_id} band key {self.key}"
@@ -0,0 +1,111 @@
+import random
+
+from employee.models import EmployeeProfile
+from .cache import get_question_bank
+from .models import AttemptQuestion, PreparedPaper
+
+# Papers are sampled from the cached per-technology id pool, which avoids the full scan + sort
+# that `order_by('?')` costs on every exam start. Callers are expected to have loaded
+# `test_attempt.test_schedule.technology` already (select_related) so no extra query is needed.
+
+CLAIM_CANDIDATES = 16
+
+
+def sample_question_ids(question_bank, total_questions):
+    return random.sample(question_bank.question_ids, min(len(question_bank.question_ids), total_questions))
+
+
+def current_paper_fields(test_schedule, question_bank):
+    # A prepared paper can be claimed only while all of these still hold
+    return {
+        'technology_id': test_schedule.technology_id,
+        'total_questions': test_schedule.total_questions,
+        'question_bank_version': question_bank.version,
+    }
+
+
+def claim_prepared_paper(test_schedule, question_bank):
+    """Take one pre-generated paper matching the schedule and bank as they are now, or return None if there is none left."""
+    while True:
+        # Pick among a few candidates at random so concurrent starters rarely race for the same row
+        candidates = list(test_schedule.prepared_papers.filter(
+            **current_paper_fields(test_schedule, question_bank)
+        ).values_list('id', 'question_ids')[:CLAIM_CANDIDATES])
+        if not candidates:
+            return None
+        random.shuffle(candidates)
+        for paper_id, question_ids in candidates:
+            # Deleting is the claim: if another request got there first, try the next paper
+            if PreparedPaper.objects.filter(id=paper_id).delete()[0]:
+                return [question_id for question_id in question_ids if question_id in question_bank.questions]
+
+
+def papers_need_preparing(test_schedule, changed_fields):
+    # When a schedule is switched on, or an active one's papers change shape
+    return test_schedule.is_active and bool({'is_active', 'technology', 'total_questions'} & set(changed_fields))
+
+
+def pregenerate_papers(test_schedule, count=None, batch_size=500):
+    """Build papers for `test_schedule` ahead of its start so starting an exam only claims one.
+
+    By default one paper is prepared per employee who hasn't attempted the schedule yet.
+    Papers sampled from an older question bank version, or before the schedule's technology or
+    number of questions was changed, are discarded. Returns the number created.
+    """
+    bank = get_question_bank(test_schedule.technology)
+    paper_fields = current_paper_fields(test_schedule, bank)
+    test_schedule.prepared_papers.exclude(**paper_fields).delete()
+    if count is None:
+        count = EmployeeProfile.objects.exclude(employeetestattempt__test_schedule=test_schedule).count()
+    count -= test_schedule.prepared_papers.count()
+    if count <= 0 or not bank.question_ids:
+        return 0
+
+    PreparedPaper.objects.bulk_create([
+        PreparedPaper(
+            test_schedule=test_schedule,
+            question_ids=sample_question_ids(bank, test_schedule.total_questions),
+            **paper_fields,
+        )
+        for _ in range(count)
+    ], batch_size=batch_size)
+    return count
+
+
+def generate_paper(test_attempt):
+    """Claim a pre-generated paper (or sample a new one) for the attempt and persist it in order."""
+    test_schedule = test_attempt.test_schedule
+    bank = get_question_bank(test_schedule.technology)
+    question_ids = claim_prepared_paper(test_schedule, bank)
+    if question_ids is None:
+        question_ids = sample_question_ids(bank, test_schedule.total_questions)
+
+    AttemptQuestion.objects.bulk_create([
+        AttemptQuestion(test_attempt=test_attempt, question_id=question_id, position=position)
+        for position, question_id in enumerate(question_ids)
+    ])
+    return [bank.questions[question_id] for question_id in question_ids]
+
+
+def get_paper_question_ids(test_attempt):
+    return list(test_attempt.paper_questions.order_by('position').values_list('question_id', flat=True))
+
+
+def get_paper_questions(test_attempt):
+    """Return the attempt's questions in paper order, generating the paper on first use."""
+    question_ids = get_paper_question_ids(test_attempt)
+    if not question_ids:
+        # Attempts started before papers were persisted have no paper yet
+        return generate_paper(test_attempt)
+    bank = get_question_bank(test_attempt.test_schedule.technology)
+    return [bank.questions[question_id] for question_id in question_ids if question_id in bank.questions]
+
+
+def load_answer_key(test_attempt):
+    """Map each question on the attempt's paper to its (correct_option, marks)."""
+    bank = get_question_bank(test_attempt.test_schedule.technology)
+    return {
+        question_id: bank.answer_key[question_id]
+        for question_id in get_paper_question_ids(test_attempt)
+        if question_id in bank.answer_key
+    }
@@ -0,0 +1,126 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Question
+
+# Full-text search over question text and options. The backend is chosen with the
+# QUESTION_SEARCH_BACKEND setting (by default, from the database in use); question saves and
+# deletes keep its index in sync (questionbank/signals.py), and code that bulk-inserts questions
+# indexes them itself.
+
+INDEXED_FIELDS = ['question_text', 'option_a', 'option_b', 'option_c', 'option_d']
+DEFAULT_MAX_RESULTS = 500
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query or '')
+
+
+class DatabaseSearchBackend:
+    """Fallback for databases without a full-text index: case-insensitive substring match, newest first."""
+
+    def index(self, questions):
+        pass
+
+    def remove(self, question_ids):
+        pass
+
+    def rebuild(self):
+        return Question.objects.count()
+
+    def search(self, query, technology_id=None, limit=DEFAULT_MAX_RESULTS):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        questions = Question.objects.all()
+        if technology_id is not None:
+            questions = questions.filter(technology_id=technology_id)
+        for term in terms:
+            questions = questions.filter(Q.create([(f'{name}__icontains', term) for name in INDEXED_FIELDS], connector=Q.OR))
+        return list(questions.order_by('-id').values_list('id', flat=True)[:limit])
+
+
+class SQLiteFTSBackend:
+    """SQLite FTS5 index (the questionbank_question_fts table, created by migration 0005), ranked by BM25.
+
+    Every word of the query must appear in the question or one of its options, as a whole word or a
+    word prefix; matches in the question text weigh more than matches in an option.
+    """
+
+    table = 'questionbank_question_fts'
+    column_weights = (10.0, 2.0, 2.0, 2.0, 2.0) # question_text, option_a .. option_d
+
+    def index(self, questions):
+        rows = [(question.id, *(getattr(question, name) for name in INDEXED_FIELDS), question.technology_id)
+                for question in questions]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            # FTS5 has no upsert; drop any previous version of the rows first
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, {', '.join(INDEXED_FIELDS)}, technology_id) "
+                f"VALUES (%s, {', '.join(['%s'] * len(INDEXED_FIELDS))}, %s)",
+                rows,
+            )
+
+    def remove(self, question_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(question_id,) for question_id in question_ids])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, {', '.join(INDEXED_FIELDS)}, technology_id) "
+                f"SELECT id, {', '.join(INDEXED_FIELDS)}, technology_id FROM {Question._meta.db_table}"
+            )
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')") # Merge index segments
+            cursor.execute(f"SELECT COUNT(*) FROM {self.table}")
+            return cursor.fetchone()[0]
+
+    def search(self, query, technology_id=None, limit=DEFAULT_MAX_RESULTS):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        # Each term quoted (so FTS5 operators in user input are plain words) and prefix-matched
+        match = ' '.join(f'"{term}"*' for term in terms)
+        sql = f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s"
+        params = [match]
+        if technology_id is not None:
+            sql += " AND technology_id = %s"
+            params.append(technology_id)
+        sql += f" ORDER BY bm25({self.table}, {', '.join(map(str, self.column_weights))}) LIMIT %s"
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    backend = getattr(settings, 'QUESTION_SEARCH_BACKEND', None)
+    if backend is None:
+        backend = SQLiteFTSBackend if connection.vendor == 'sqlite' else DatabaseSearchBackend
+    elif isinstance(backend, str):
+        backend = import_string(backend)
+    return backend()
+
+
+def search_question_ids(query, technology_id=None, limit=None):
+    """Ids of the questions matching `query`, best match first."""
+    if limit is None:
+        limit = getattr(settings, 'QUESTION_SEARCH_MAX_RESULTS', DEFAULT_MAX_RESULTS)
+    return get_search_backend().search(query, technology_id=technology_id, limit=limit)
+
+
+def search_questions(query, technology_id=None, limit=None):
+    """Matching questions (with their technology), best match first."""
+    question_ids = search_question_ids(query, technology_id, limit)
+    questions = Question.objects.select_related('technology').in_bulk(question_ids)
+    return [questions[question_id] for question_id in question_ids if question_id in questions]
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import question_bank_changed
+from .models import Question
+from .search import INDEXED_FIELDS, get_search_backend
+from .similarity import index_questions
+
+# Keeps the question search index (questionbank/search.py) and the near-duplicate bands
+# (questionbank/similarity.py) in step with row-by-row question writes. Both are written in the
+# same transaction as the question, so a rollback undoes all of it. Deleted questions' bands
+# go with them (ON DELETE CASCADE).
+#
+# Every such write also refreshes the cached question banks (questionbank/cache.py), however it
+# is made: views, the Django admin, the shell, fixtures or data migrations. Bulk writes, which
+# send no signals, bump the version themselves (see questionbank/importer.py).
+
+
+@receiver(post_save, sender=Question, dispatch_uid='question_search_index_save')
+def index_saved_question(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & {*INDEXED_FIELDS, 'technology'}:
+        return # Nothing searchable changed
+    get_search_backend().index([instance])
+    index_questions([instance])
+
+
+@receiver(post_delete, sender=Question, dispatch_uid='question_search_index_delete')
+def remove_deleted_question(sender, instance, **kwargs):
+    get_search_backend().remove([instance.id])
+
+
+@receiver(post_save, sender=Question, dispatch_uid='question_bank_save')
+def refresh_bank_of_saved_question(sender, instance, **kwargs):
+    question_bank_changed(getattr(instance, 'stored_technology_id', None), instance.technology_id)
+    instance.stored_technology_id = instance.technology_id
+
+
+@receiver(post_delete, sender=Question, dispatch_uid='question_bank_delete')
+def refresh_bank_of_deleted_question(sender, instance, **kwargs):
+    question_bank_changed(instance.technology_id)
@@ -0,0 +1,220 @@
+import random
+import re
+import zlib
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+from .models import Question, QuestionBand
+
+try:
+    import numpy as np
+except ImportError: # Optional; only makes signatures faster (the results are identical)
+    np = None
+
+# Near-duplicate detection with MinHash + locality-sensitive hashing (LSH).
+#
+# A question (text plus its options, in any order) is reduced to the set of its 5-character
+# shingles. Its MinHash signature holds, for each of 64 random hash functions, the smallest hash
+# of any shingle; two signatures agree in a given position with probability equal to the Jaccard
+# similarity of the shingle sets. The signature is cut into 16 bands of 4 values and each band is
+# hashed to a key stored in QuestionBand; questions sharing at least one key are candidates
+# (a pair with similarity 0.7 shares one with probability ~0.99, a pair at 0.3 with ~0.12),
+# and candidates are kept only if their signatures agree at least NEAR_DUPLICATE_THRESHOLD.
+# Finding the near-duplicates of a question is thus an index lookup, not a scan of the bank.
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+MASK_64 = (1 << 64) - 1
+DEFAULT_THRESHOLD = 0.7
+KEYS_PER_QUERY = 5000 # Stays well below SQLite's limit on query parameters
+INSERT_COLUMNS = ['question_id', 'technology_id', 'key']
+
+# Multiply-shift hash functions h(x) = ((a * x + b) mod 2**64) >> 32, a odd. The seed is fixed:
+# stored band keys must stay comparable across processes and restarts.
+_seeded = random.Random(0x5EED)
+PERMUTATIONS = [(_seeded.getrandbits(64) | 1, _seeded.getrandbits(64)) for _ in range(NUM_PERMUTATIONS)]
+if np is not None:
+    _MULTIPLIERS = np.array([a for a, _ in PERMUTATIONS], dtype=np.uint64)[:, None]
+    _INCREMENTS = np.array([b for _, b in PERMUTATIONS], dtype=np.uint64)[:, None]
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', (text or '').lower()))
+
+
+def shingle_hashes(question_text, options):
+    # Options are sorted so the same answers in a different order still match
+    text = ' | '.join([normalize(question_text), *sorted(normalize(option) for option in options)])
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(max(len(text) - SHINGLE_SIZE + 1, 1))}
+    return [zlib.crc32(shingle.encode()) for shingle in shingles]
+
+
+def minhash(hashes):
+    if np is not None:
+        # uint64 arithmetic wraps around, which is the mod 2**64 of the hash functions
+        values = np.array(hashes, dtype=np.uint64)
+        return array('Q', ((_MULTIPLIERS * values + _INCREMENTS) >> np.uint64(32)).min(axis=1).tolist())
+    return array('Q', [min(((a * h + b) & MASK_64) >> 32 for h in hashes) for a, b in PERMUTATIONS])
+
+
+def band_keys(signature):
+    # Band number in the high bits, so equal rows in different bands never collide
+    return [band << 32 | zlib.crc32(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+            for band in range(BANDS)]
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(a == b for a, b in zip(signature, other)) / NUM_PERMUTATIONS
+
+
+def question_signature(question):
+    options = [question.option_a, question.option_b, question.option_c, question.option_d]
+    return minhash(shingle_hashes(question.question_text, options))
+
+
+def get_threshold(threshold=None):
+    return threshold if threshold is not None else getattr(settings, 'NEAR_DUPLICATE_THRESHOLD', DEFAULT_THRESHOLD)
+
+
+class LSHIndex:
+    """In-memory LSH index of signatures, for comparing questions that aren't stored (yet)."""
+
+    def __init__(self):
+        self.buckets = defaultdict(list) # band key -> items
+        self.signatures = {}
+
+    def add(self, item, signature):
+        self.signatures[item] = signature
+        for key in band_keys(signature):
+            self.buckets[key].append(item)
+
+    def query(self, signature, threshold=None):
+        """Items similar to `signature`, as (item, similarity) pairs, most similar first."""
+        threshold = get_threshold(threshold)
+        candidates = {item for key in band_keys(signature) for item in self.buckets.get(key, ())}
+        matches = [(item, similarity(signature, self.signatures[item])) for item in candidates]
+        return sorted([match for match in matches if match[1] >= threshold], key=lambda match: -match[1])
+
+
+def index_questions(questions, signatures=None):
+    """(Re)write the stored band keys of saved questions; `signatures` may be passed if already computed."""
+    if signatures is None:
+        signatures = [question_signature(question) for question in questions]
+    QuestionBand.objects.filter(question__in=[question.id for question in questions]).delete()
+    # 16 rows per question: a plain executemany, since building model instances would cost more than the insert
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {QuestionBand._meta.db_table} ({', '.join(map(connection.ops.quote_name, INSERT_COLUMNS))}) "
+            f"VALUES (%s, %s, %s)",
+            [(question.id, question.technology_id, key)
+             for question, signature in zip(questions, signatures)
+             for key in band_keys(signature)],
+        )
+
+
+def rebuild_similarity_index(batch_size=1000):
+    QuestionBand.objects.all().delete()
+    batch = []
+    count = 0
+    for question in Question.objects.order_by('id').iterator(chunk_size=batch_size):
+        batch.append(question)
+        if len(batch) >= batch_size:
+            index_questions(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        index_questions(batch)
+        count += len(batch)
+    return count
+
+
+def match_signatures(technology_id, signatures, threshold=None, exclude_ids=()):
+    """For each signature, the stored questions of the technology similar to it: [(question, similarity), ...]."""
+    keys_per_signature = [band_keys(signature) for signature in signatures]
+    all_keys = list({key for keys in keys_per_signature for key in keys})
+    questions_by_key = defaultdict(set)
+    for start in range(0, len(all_keys), KEYS_PER_QUERY):
+        for key, question_id in QuestionBand.objects.filter(
+                technology_id=technology_id, key__in=all_keys[start:start + KEYS_PER_QUERY]).values_list('key', 'question_id'):
+            questions_by_key[key].add(question_id)
+
+    candidate_ids = set().union(*questions_by_key.values()) - set(exclude_ids)
+    candidates = Question.objects.in_bulk(candidate_ids)
+    candidate_signatures = {question_id: question_signature(question) for question_id, question in candidates.items()}
+
+    threshold = get_threshold(threshold)
+    results = []
+    for signature, keys in zip(signatures, keys_per_signature):
+        matched_ids = set().union(*(questions_by_key.get(key, ()) for key in keys)) & candidate_ids
+        matches = [(candidates[question_id], similarity(signature, candidate_signatures[question_id]))
+                   for question_id in matched_ids]
+        results.append(sorted([match for match in matches if match[1] >= threshold], key=lambda match: (-match[1], match[0].id)))
+    return results
+
+
+def find_near_duplicates(question, threshold=None):
+    """Stored questions of the same technology that are near-duplicates of `question` (saved or not)."""
+    exclude_ids = [question.id] if question.id else []
+    return match_signatures(question.technology_id, [question_signature(question)], threshold, exclude_ids)[0]
+
+
+@dataclass
+class NearDuplicateGroup:
+    questions: list
+    similarity: float # Highest similarity between two questions of the group
+
+
+def near_duplicate_groups(technology, threshold=None):
+    """Groups of near-duplicate questions in a technology's bank, largest first.
+
+    Only questions sharing a band key with another question are loaded and compared.
+    """
+    threshold = get_threshold(threshold)
+    bands = QuestionBand.objects.filter(technology=technology)
+    shared_keys = bands.order_by().values('key').annotate(questions=Count('id')).filter(questions__gt=1).values('key')
+    questions_by_key = defaultdict(list)
+    for key, question_id in bands.filter(key__in=shared_keys).values_list('key', 'question_id'):
+        questions_by_key[key].append(question_id)
+    buckets = list(questions_by_key.values())
+
+    candidates = Question.objects.in_bulk({question_id for bucket in buckets for question_id in bucket})
+    signatures = {question_id: question_signature(question) for question_id, question in candidates.items()}
+
+    # Union-find over the verified pairs
+    parent = {question_id: question_id for question_id in candidates}
+
+    def find(question_id):
+        while parent[question_id] != question_id:
+            parent[question_id] = parent[parent[question_id]]
+            question_id = parent[question_id]
+        return question_id
+
+    best = defaultdict(float) # root -> highest pair similarity
+    compared = set()
+    for bucket in buckets:
+        for i, first in enumerate(bucket):
+            for second in bucket[i + 1:]:
+                pair = (min(first, second), max(first, second))
+                if pair in compared or first not in signatures or second not in signatures:
+                    continue
+                compared.add(pair)
+                score = similarity(signatures[first], signatures[second])
+                if score >= threshold:
+                    root_first, root_second = find(first), find(second)
+                    parent[root_second] = root_first
+                    best[root_first] = max(best[root_first], best.pop(root_second, 0.0), score)
+
+    members = defaultdict(list)
+    for question_id in candidates:
+        members[find(question_id)].append(candidates[question_id])
+    groups = [NearDuplicateGroup(sorted(questions, key=lambda question: question.id), best[root])
+              for root, questions in members.items() if len(questions) > 1]
+    return sorted(groups, key=lambda group: (-len(group.questions), -group.similarity, group.questions[0].id))
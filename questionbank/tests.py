@@ -1 +1,488 @@
+import datetime
+import importlib
+import io
+import json
+import tempfile
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .cache import QuestionBankCache, bump_question_bank_version, get_question_bank
+from .importer import import_questions, open_records
+from .papers import claim_prepared_paper, generate_paper
+from .search import DatabaseSearchBackend, SQLiteFTSBackend, get_search_backend, search_question_ids
+from .similarity import find_near_duplicates, near_duplicate_groups
+from .models import AttemptQuestion, PreparedPaper, Question, QuestionBand
+from administrator.models import Technology, TestSchedule
+from employee.models import EmployeeProfile, EmployeeTestAttempt
+
+CSV_HEADER = 'question_text,option_a,option_b,option_c,option_d,correct_option,marks\n'
+
+
+def question_row(i, correct='A', marks='1'):
+    return {'question_text': f'What is {i}?', 'option_a': 'a', 'option_b': 'b', 'option_c': 'c',
+            'option_d': 'd', 'correct_option': correct, 'marks': marks}
+
+
+class QuestionBankCacheTest(TestCase):
+    def setUp(self):
+        self.technologies = [Technology.objects.create(name=name) for name in ('Python', 'Go', 'Rust')]
+        for technology in self.technologies:
+            Question.objects.create(technology=technology, question_text=f'{technology.name} question', option_a='a',
+                                    option_b='b', option_c='c', option_d='d', correct_option='A')
+
+    def test_least_recently_used_bank_is_evicted(self):
+        banks = QuestionBankCache(max_entries=2)
+        python, go, rust = (technology.id for technology in self.technologies)
+        banks.get(python, 0)
+        banks.get(go, 0)
+        banks.get(python, 0) # Go is now the least recently used
+        banks.get(rust, 0)
+        with self.assertNumQueries(0):
+            banks.get(python, 0)
+            banks.get(rust, 0)
+        with self.assertNumQueries(1):
+            banks.get(go, 0) # Evicted: loaded again, evicting Python
+        self.assertEqual({key: banks.stats()[key] for key in ('hits', 'misses', 'evictions', 'entries', 'hit_rate')},
+                         {'hits': 3, 'misses': 4, 'evictions': 2, 'entries': 2, 'hit_rate': round(3 / 7, 4)})
+
+    def test_new_version_reloads_the_bank(self):
+        banks = QuestionBankCache()
+        technology = self.technologies[0]
+        bank = banks.get(technology.id, 0)
+        Question.objects.filter(technology=technology).update(correct_option='C') # No signals
+        self.assertIs(banks.get(technology.id, 0), bank)
+        reloaded = banks.get(technology.id, 1)
+        self.assertEqual([correct for correct, _ in reloaded.answer_key.values()], ['C'])
+        self.assertEqual((banks.stats()['hits'], banks.stats()['misses']), (1, 2))
+
+    def test_question_writes_refresh_the_bank(self):
+        python, go, _ = self.technologies
+        question = Question.objects.get(technology=python)
+        self.assertEqual(list(get_question_bank(python).questions), [question.id])
+
+        # However the question is saved: this process's bank at once, every process's on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            question.technology = go
+            question.save()
+        self.assertEqual(list(get_question_bank(python).questions), [])
+        for technology in (python, go):
+            technology.refresh_from_db()
+            self.assertEqual(technology.question_bank_version, 1) # The bank it left and the one it joined
+        self.assertEqual(len(get_question_bank(go).questions), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            question.delete()
+        go.refresh_from_db()
+        self.assertEqual((go.question_bank_version, len(get_question_bank(go).questions)), (2, 1))
+
+
+class PreparedPaperTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(self.admin)
+        self.python, self.go = Technology.objects.create(name='Python'), Technology.objects.create(name='Go')
+        for technology in (self.python, self.go):
+            for i in range(6):
+                Question.objects.create(technology=technology, question_text=f'{technology.name} question {i}',
+                                        option_a='a', option_b='b', option_c='c', option_d='d', correct_option='A')
+        now = timezone.now()
+        self.schedule = TestSchedule.objects.create(technology=self.python, total_questions=4,
+                                                    start_time=now - datetime.timedelta(hours=1),
+                                                    end_time=now + datetime.timedelta(hours=2))
+        self.employees = [EmployeeProfile.objects.create(user=User.objects.create_user(f'employee{i}', password='pw'),
+                                                         employee_id=f'E{i}') for i in range(3)]
+
+    def edit_schedule(self, **changes):
+        fields = {
+            'technology': self.schedule.technology_id, 'total_questions': self.schedule.total_questions,
+            'start_time': timezone.localtime(self.schedule.start_time).strftime('%Y-%m-%d %H:%M'),
+            'end_time': timezone.localtime(self.schedule.end_time).strftime('%Y-%m-%d %H:%M'),
+            'duration_minutes': 60, 'pass_mark': 50, 'is_active': 'on', **changes,
+        }
+        response = self.client.post(reverse('admin_update_test_schedule', args=[self.schedule.id]), fields)
+        self.assertRedirects(response, reverse('admin_manage_tests'), fetch_redirect_response=False)
+        self.schedule.refresh_from_db()
+
+    def prepared(self):
+        return list(self.schedule.prepared_papers.values_list('technology_id', 'total_questions', 'question_ids'))
+
+    def question_ids(self, technology):
+        return set(Question.objects.filter(technology=technology).values_list('id', flat=True))
+
+    def test_activation_prepares_a_paper_per_candidate(self):
+        self.edit_schedule()
+        prepared = self.prepared()
+        self.assertEqual(len(prepared), 3)
+        for technology_id, total_questions, question_ids in prepared:
+            self.assertEqual((technology_id, total_questions, len(question_ids)), (self.python.id, 4, 4))
+            self.assertLessEqual(set(question_ids), self.question_ids(self.python))
+
+        # Starting the exam claims one of them, in its order
+        papers = [question_ids for _, _, question_ids in prepared]
+        self.client.force_login(self.employees[0].user)
+        questions = self.client.get(reverse('take_exam', args=[self.schedule.id])).context['questions']
+        self.assertIn([question.id for question in questions], papers)
+        self.assertEqual(self.schedule.prepared_papers.count(), 2)
+
+    def test_papers_follow_schedule_edits(self):
+        self.edit_schedule()
+        self.edit_schedule(total_questions=5)
+        self.assertEqual({(technology_id, total, len(ids)) for technology_id, total, ids in self.prepared()},
+                         {(self.python.id, 5, 5)})
+        self.edit_schedule(technology=self.go.id)
+        prepared = self.prepared()
+        self.assertEqual(len(prepared), 3)
+        for _, _, question_ids in prepared:
+            self.assertLessEqual(set(question_ids), self.question_ids(self.go))
+
+        self.client.force_login(self.employees[0].user)
+        questions = self.client.get(reverse('take_exam', args=[self.schedule.id])).context['questions']
+        self.assertEqual(len(questions), 5)
+        self.assertEqual({question.technology_id for question in questions}, {self.go.id})
+
+    def test_stale_papers_are_never_claimed(self):
+        self.edit_schedule()
+        # Changes that don't go through the schedule form don't replace the papers
+        TestSchedule.objects.filter(id=self.schedule.id).update(total_questions=2)
+        self.schedule.refresh_from_db()
+        self.assertIsNone(claim_prepared_paper(self.schedule, get_question_bank(self.python)))
+
+        TestSchedule.objects.filter(id=self.schedule.id).update(total_questions=4)
+        self.schedule.refresh_from_db()
+        bump_question_bank_version(self.python.id)
+        self.python.refresh_from_db()
+        self.assertIsNone(claim_prepared_paper(self.schedule, get_question_bank(self.python)))
+        self.assertEqual(PreparedPaper.objects.count(), 3) # Left for the next pregeneration to replace
+
+        attempt = EmployeeTestAttempt.objects.create(employee=self.employees[0], test_schedule=self.schedule)
+        self.assertEqual(len(generate_paper(attempt)), 4) # Sampled live instead
+        self.assertEqual(AttemptQuestion.objects.filter(test_attempt=attempt).count(), 4)
+
+
+class PaperApiTest(TestCase):
+    def setUp(self):
+        technology = Technology.objects.create(name='Python')
+        for i in range(7):
+            Question.objects.create(technology=technology, question_text=f'Question {i}', option_a='a', option_b='b',
+                                    option_c='c', option_d='d', correct_option='A')
+        now = timezone.now()
+        self.schedule = TestSchedule.objects.create(technology=technology, total_questions=7, is_active=True,
+                                                    start_time=now - datetime.timedelta(hours=1),
+                                                    end_time=now + datetime.timedelta(hours=2))
+        self.user = User.objects.create_user('alice', password='pw')
+        EmployeeProfile.objects.create(user=self.user, employee_id='E1')
+        self.client.force_login(self.user)
+        self.paper = [question.id for question in
+                      self.client.get(reverse('take_exam', args=[self.schedule.id])).context['questions']]
+        self.attempt = EmployeeTestAttempt.objects.get(employee__user=self.user)
+        self.url = reverse('attempt_paper_api', args=[self.attempt.id])
+
+    def test_pages_follow_the_paper_order(self):
+        question_ids = []
+        for page in (1, 2, 3):
+            data = self.client.get(self.url, {'page': page, 'page_size': 3}).json()
+            self.assertEqual((data['total_questions'], data['num_pages'], data['has_next']), (7, 3, page < 3))
+            question_ids.extend(question['id'] for question in data['questions'])
+            self.assertEqual([question['number'] for question in data['questions']],
+                             list(range((page - 1) * 3 + 1, min(page * 3, 7) + 1)))
+        self.assertEqual(question_ids, self.paper)
+        self.assertEqual(self.client.get(self.url, {'page': 'x'}).status_code, 400)
+
+    def test_only_the_candidate_can_read_an_ongoing_attempt(self):
+        other = User.objects.create_user('bob', password='pw')
+        EmployeeProfile.objects.create(user=other, employee_id='E2')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302) # To the login page
+
+        self.client.force_login(self.user)
+        EmployeeTestAttempt.objects.filter(id=self.attempt.id).update(is_completed=True)
+        self.assertEqual(self.client.get(self.url).status_code, 404) # Questions aren't served after submission
+
+    def test_unchanged_pages_are_revalidated(self):
+        response = self.client.get(self.url, {'page': 1})
+        etag = response['ETag']
+        self.assertIn('private', response['Cache-Control'])
+        with self.assertNumQueries(3): # Session, user and attempt; no paper or questions
+            response = self.client.get(self.url, {'page': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.client.get(self.url, {'page': 2}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Editing the bank changes every page's tag
+        bump_question_bank_version(self.schedule.technology_id)
+        response = self.client.get(self.url, {'page': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class QuestionImportTest(TestCase):
+    def setUp(self):
+        self.technology = Technology.objects.create(name='Python')
+
+    def test_valid_rows_are_imported_in_batches(self):
+        report = import_questions((question_row(i) for i in range(12)), self.technology, batch_size=5)
+        self.assertEqual((report.created, report.duplicates, report.errors), (12, 0, []))
+        self.assertEqual(Question.objects.filter(technology=self.technology).count(), 12)
+        self.technology.refresh_from_db()
+        self.assertEqual(self.technology.question_bank_version, 1)
+
+    def test_invalid_rows_are_reported_without_aborting(self):
+        rows = [question_row(1), question_row(2, correct='E'), question_row(3, marks='lots'),
+                {**question_row(4), 'option_b': ''}, 'not an object', question_row(6, correct='b', marks='')]
+        report = import_questions(rows, self.technology)
+        self.assertEqual(report.created, 2)
+        self.assertEqual([row_number for row_number, _ in report.errors], [2, 3, 4, 5])
+        self.assertIn('correct_option', report.errors[0][1])
+        self.assertIn('option_b', report.errors[2][1])
+        imported = Question.objects.get(question_text='What is 6?')
+        self.assertEqual((imported.correct_option, imported.marks), ('B', 1))
+
+    def test_exact_duplicates_are_skipped(self):
+        Question.objects.create(technology=self.technology, **question_row(1))
+        rows = [question_row(1), question_row(2), {**question_row(2), 'question_text': '  What is 2?  '}, question_row(3)]
+        report = import_questions(rows, self.technology)
+        self.assertEqual((report.created, report.duplicates), (2, 2))
+        # The same question in another technology is not a duplicate
+        other = Technology.objects.create(name='Django')
+        self.assertEqual(import_questions([question_row(1)], other).created, 1)
+
+    def test_csv_and_json_files(self):
+        csv_file = io.BytesIO(('﻿' + CSV_HEADER + 'What is 1?,a,b,c,d,A,2\n"Comma, quoted",a,b,c,d,D,1\n').encode())
+        report = import_questions(open_records(csv_file, 'questions.csv'), self.technology)
+        self.assertEqual(report.created, 2)
+        self.assertTrue(Question.objects.filter(question_text='Comma, quoted').exists())
+
+        json_file = io.BytesIO(json.dumps([question_row(i) for i in range(10, 13)]).encode())
+        self.assertEqual(import_questions(open_records(json_file, 'questions.json'), self.technology).created, 3)
+        lines_file = io.BytesIO('\n'.join(json.dumps(question_row(i)) for i in range(20, 24)).encode())
+        self.assertEqual(import_questions(open_records(lines_file, 'questions.jsonl'), self.technology).created, 4)
+
+    def test_malformed_file_keeps_the_rows_before_it(self):
+        lines = [json.dumps(question_row(i)) for i in range(5)]
+        lines.insert(3, '{"question_text": "Cut off')
+        report = import_questions(open_records(io.BytesIO('\n'.join(lines).encode()), 'questions.jsonl'),
+                                  self.technology, batch_size=2)
+        self.assertEqual((report.created, report.read_error[0]), (3, 4))
+        self.assertEqual(Question.objects.filter(technology=self.technology).count(), 3)
+        self.technology.refresh_from_db()
+        self.assertEqual(self.technology.question_bank_version, 1) # Committed batches are seen by the bank cache
+
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        upload = SimpleUploadedFile('questions.jsonl', (json.dumps(question_row(7)) + '\n{"question_text": \n').encode())
+        response = self.client.post(reverse('admin_import_questions'), {'technology': self.technology.id, 'file': upload})
+        self.assertContains(response, 'Could not read the file past row 1')
+        self.assertContains(response, 'The 1 question(s) imported from the rows before it were kept.')
+
+    def test_upload_view(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        upload = SimpleUploadedFile('questions.csv', (CSV_HEADER + 'Q1,a,b,c,d,A,1\nQ2,a,b,c,d,Z,1\n').encode())
+        response = self.client.post(reverse('admin_import_questions'), {'technology': self.technology.id, 'file': upload})
+        self.assertEqual(response.context['report'].created, 1)
+        self.assertContains(response, 'Imported 1 question(s) into Python')
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as source:
+            json.dump([question_row(i) for i in range(3)], source)
+            source.flush()
+            output = io.StringIO()
+            call_command('import_questions', source.name, technology='Go', create_technology=True, stdout=output)
+        self.assertIn('3 imported', output.getvalue())
+        self.assertEqual(Question.objects.filter(technology__name='Go').count(), 3)
+
+
+class QuestionSearchTest(TestCase):
+    def setUp(self):
+        self.python = Technology.objects.create(name='Python')
+        self.django = Technology.objects.create(name='Django')
+        self.generators = self.add(self.python, 'How do generators pause between yields?', option_a='With the yield keyword')
+        self.decorators = self.add(self.python, 'What does a decorator return?', option_b='Usually a wrapped generator')
+        self.middleware = self.add(self.django, 'Where is middleware configured?', option_c='In settings.MIDDLEWARE')
+
+    def add(self, technology, text, **options):
+        fields = {'option_a': 'a', 'option_b': 'b', 'option_c': 'c', 'option_d': 'd', **options}
+        return Question.objects.create(technology=technology, question_text=text, correct_option='A', **fields)
+
+    def test_ranked_matches_over_text_and_options(self):
+        # A match in the question text ranks above one in an option
+        self.assertEqual(search_question_ids('generator'), [self.generators.id, self.decorators.id])
+        self.assertEqual(search_question_ids('gen'), [self.generators.id, self.decorators.id]) # Prefix match
+        self.assertEqual(search_question_ids('decorator wrapped'), [self.decorators.id]) # Every word must match
+        self.assertEqual(search_question_ids('settings'), [self.middleware.id])
+        self.assertEqual(search_question_ids('kubernetes'), [])
+        self.assertEqual(search_question_ids('   '), [])
+
+    def test_technology_filter_and_limit(self):
+        self.assertEqual(search_question_ids('generator', technology_id=self.django.id), [])
+        self.assertEqual(search_question_ids('generator', technology_id=self.python.id, limit=1), [self.generators.id])
+
+    def test_query_syntax_is_treated_as_words(self):
+        self.assertEqual(search_question_ids('"generators" (yield* -pause'), [self.generators.id])
+        self.assertEqual(search_question_ids('settings.MIDDLEWARE'), [self.middleware.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.generators.question_text = 'How do coroutines pause?'
+        self.generators.save()
+        self.assertEqual(search_question_ids('coroutines'), [self.generators.id])
+        self.assertEqual(search_question_ids('generator'), [self.decorators.id])
+
+        self.middleware.technology = self.python
+        self.middleware.save(update_fields=['technology'])
+        self.assertEqual(search_question_ids('middleware', technology_id=self.python.id), [self.middleware.id])
+
+        self.decorators.delete()
+        self.python.delete() # Cascades to its questions
+        self.assertEqual(search_question_ids('generator'), [])
+        self.assertEqual(search_question_ids('coroutines middleware settings'), [])
+
+    def test_imported_questions_are_indexed(self):
+        import_questions([question_row(7)], self.django)
+        self.assertEqual(len(search_question_ids('What is 7', technology_id=self.django.id)), 1)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLiteFTSBackend.table}")
+        self.assertEqual(search_question_ids('generators'), [])
+        output = io.StringIO()
+        call_command('rebuild_question_index', stdout=output)
+        self.assertIn('Indexed 3 question(s)', output.getvalue())
+        self.assertEqual(search_question_ids('generators'), [self.generators.id])
+
+    def test_database_fallback_backend(self):
+        backend = DatabaseSearchBackend()
+        self.assertEqual(backend.search('GENERATOR'), [self.decorators.id, self.generators.id])
+        self.assertEqual(backend.search('generator', technology_id=self.django.id), [])
+
+    def test_question_management_search(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        url = reverse('admin_manage_questions')
+        response = self.client.get(url, {'q': 'generator', 'technology': self.python.id})
+        self.assertEqual(response.context['questions'], [self.generators, self.decorators])
+        self.assertContains(response, '2 matches for')
+        self.assertNotContains(response, 'Next page')
+
+        response = self.client.get(url, {'technology': self.django.id})
+        self.assertEqual(list(response.context['questions']), [self.middleware])
+
+    def test_django_admin_search(self):
+        self.client.force_login(User.objects.create_superuser('root', password='pw'))
+        response = self.client.get(reverse('admin:questionbank_question_changelist'), {'q': 'yield'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.generators])
+        self.assertNotContains(response, 'best matches')
+
+        with self.settings(QUESTION_SEARCH_MAX_RESULTS=1):
+            response = self.client.get(reverse('admin:questionbank_question_changelist'), {'q': 'generator'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.generators])
+        self.assertContains(response, 'Only the 1 best matches for &quot;generator&quot; are listed')
+
+    def test_backend_follows_the_database(self):
+        self.assertIsInstance(get_search_backend(), SQLiteFTSBackend) # Tests run on SQLite
+
+
+GENERATOR_QUESTION = {
+    'question_text': 'Which keyword turns a Python function into a generator?',
+    'option_a': 'yield', 'option_b': 'return', 'option_c': 'async', 'option_d': 'lambda',
+}
+REWORDED_GENERATOR_QUESTION = {
+    'question_text': 'Which keyword turns a Python function into a generator function?',
+    'option_a': 'return', 'option_b': 'yield', 'option_c': 'lambda', 'option_d': 'async',
+}
+
+
+class NearDuplicateTest(TestCase):
+    def setUp(self):
+        self.python = Technology.objects.create(name='Python')
+        self.generator = self.add(GENERATOR_QUESTION)
+        for text, answers in [
+            ('What is the average cost of a dict lookup?', 'O(1) O(n) O(log n) O(n^2)'),
+            ('Which module provides deque?', 'collections itertools heapq queue'),
+            ('What does list slicing return?', 'a_copy a_view an_iterator nothing'),
+            ('Which statement rebinds a name in the enclosing scope?', 'nonlocal global del import'),
+            ('Why do CPU-bound threads not speed up CPython code?', 'GIL GC JIT ABI'),
+            ('Which call blocks until a socket has a connection?', 'accept listen bind connect'),
+        ]:
+            self.add(dict(zip(['question_text', 'option_a', 'option_b', 'option_c', 'option_d'], [text, *answers.split()])))
+
+    def add(self, fields, technology=None, correct_option='A'):
+        return Question.objects.create(technology=technology or self.python, correct_option=correct_option, **fields)
+
+    def test_reworded_copy_is_found(self):
+        copy = Question(technology=self.python, correct_option='B', **REWORDED_GENERATOR_QUESTION)
+        matches = find_near_duplicates(copy)
+        self.assertEqual([question for question, _ in matches], [self.generator])
+        self.assertGreaterEqual(matches[0][1], 0.7)
+        # Only the same technology's bank is searched, and a question isn't its own duplicate
+        self.assertEqual(find_near_duplicates(Question(technology=Technology.objects.create(name='Go'), **GENERATOR_QUESTION)), [])
+        self.assertEqual(find_near_duplicates(self.generator), [])
+
+    def test_lookup_cost_does_not_grow_with_bank(self):
+        copy = Question(technology=self.python, correct_option='B', **REWORDED_GENERATOR_QUESTION)
+        with self.assertNumQueries(2): # Band keys, then the candidates
+            find_near_duplicates(copy)
+
+    def test_bands_follow_edits_and_deletes(self):
+        self.generator.question_text = 'What does the GIL protect in CPython?'
+        self.generator.save()
+        copy = Question(technology=self.python, **REWORDED_GENERATOR_QUESTION)
+        self.assertEqual(find_near_duplicates(copy), [])
+        generator_id = self.generator.id
+        self.generator.delete()
+        self.assertFalse(QuestionBand.objects.filter(question_id=generator_id).exists())
+
+    def test_migration_backfill_matches_live_band_keys(self):
+        migration = importlib.import_module('questionbank.migrations.0006_questionband')
+        stored = set(QuestionBand.objects.values_list('question_id', 'key'))
+        QuestionBand.objects.all().delete()
+        migration.backfill_bands(apps, None)
+        self.assertEqual(set(QuestionBand.objects.values_list('question_id', 'key')), stored)
+
+    def test_add_question_asks_for_confirmation(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        data = {'technology': self.python.id, 'correct_option': 'B', 'marks': '1', **REWORDED_GENERATOR_QUESTION}
+        response = self.client.post(reverse('admin_add_question'), data)
+        self.assertEqual([question for question, _ in response.context['near_duplicates']], [self.generator])
+        self.assertContains(response, 'Save anyway')
+        self.assertEqual(Question.objects.count(), 7)
+
+        response = self.client.post(reverse('admin_add_question'), {**data, 'allow_near_duplicate': '1'})
+        self.assertRedirects(response, reverse('admin_manage_questions'))
+        self.assertEqual(Question.objects.count(), 8)
+
+        # Editing the marks alone doesn't ask again
+        copy = Question.objects.latest('id')
+        response = self.client.post(reverse('admin_update_question', args=[copy.id]), {**data, 'marks': '2'})
+        self.assertRedirects(response, reverse('admin_manage_questions'))
+
+    def test_import_flags_near_duplicates(self):
+        rows = [
+            {**REWORDED_GENERATOR_QUESTION, 'correct_option': 'B'}, # Like a stored question
+            {'question_text': 'How are Python sets implemented internally?', 'option_a': 'hash table',
+             'option_b': 'tree', 'option_c': 'list', 'option_d': 'heap', 'correct_option': 'A'},
+            {'question_text': 'How are Python sets implemented internally in CPython?', 'option_a': 'tree',
+             'option_b': 'hash table', 'option_c': 'heap', 'option_d': 'list', 'correct_option': 'B'}, # Like row 2
+        ]
+        report = import_questions(rows, self.python, batch_size=2)
+        self.assertEqual(report.created, 3)
+        self.assertEqual([row_number for row_number, _ in report.near_duplicates], [1, 3])
+        self.assertIn(f'question #{self.generator.id}', report.near_duplicates[0][1])
+        self.assertIn('row 2', report.near_duplicates[1][1])
+
+    def test_technology_report_groups_near_duplicates(self):
+        first_copy = self.add(REWORDED_GENERATOR_QUESTION, correct_option='B')
+        second_copy = self.add({**GENERATOR_QUESTION, 'question_text': 'Which keyword turns a Python function into a generator?!'})
+        groups = near_duplicate_groups(self.python)
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0].questions, [self.generator, first_copy, second_copy])
+
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        response = self.client.get(reverse('admin_near_duplicate_report'), {'technology': self.python.id})
+        self.assertContains(response, '1 group of reworded copies in Python')
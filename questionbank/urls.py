@@ -7,5 +7,7 @@ from . import views
 # (e.g., via AJAX for a complex exam interface).
 urlpatterns = [
     path('api/questions/<int:technology_id>/', views.get_questions_api, name='get_questions_api'),
+    path('api/attempts/<int:attempt_id>/paper/', views.attempt_paper_api, name='attempt_paper_api'),
+    path('api/cache-stats/', views.question_bank_cache_stats_api, name='question_bank_cache_stats'),
 ]
 
@@ -1,8 +1,25 @@
 from django.shortcuts import render
 from django.http import JsonResponse
+from django.conf import settings
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
 from .models import Question
+from .cache import question_bank_cache, get_question_bank
+from .papers import get_paper_question_ids
+from employee.models import EmployeeTestAttempt
+from employee.fragments import render_question_cards
 from django.core import serializers
+
+# Helper function for admin check
+def is_admin(user):
+    return user.is_authenticated and user.is_staff
+
 # Create your views here.
+# Whole question bank of a technology (without answers); restricted to administrators
+@login_required
+@user_passes_test(is_admin, login_url='/employee/login/')
 def get_questions_api(request, technology_id):
     questions = Question.objects.filter(technology_id=technology_id).values(
         'id', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d'
@@ -10,4 +27,61 @@ def get_questions_api(request, technology_id):
     return JsonResponse(list(questions), safe=False)
 
 
+@login_required
+@user_passes_test(is_admin, login_url='/employee/login/')
+def question_bank_cache_stats_api(request):
+    # Hit/miss counters of this process's question bank cache
+    return JsonResponse(question_bank_cache.stats())
+
+
+# Paper API: the candidate's own questions for an ongoing attempt, one page at a time.
+# A page never changes unless the question bank version does, so clients revalidate with
+# If-None-Match and get a 304 without the questions being loaded again.
+@gzip_page
+@login_required
+@require_GET
+def attempt_paper_api(request, attempt_id):
+    test_attempt = EmployeeTestAttempt.objects.select_related('test_schedule__technology').filter(
+        id=attempt_id, employee__user=request.user, is_completed=False
+    ).first()
+    if test_attempt is None:
+        return JsonResponse({'error': 'No ongoing attempt found.'}, status=404)
+
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+        page_size = min(max(1, int(request.GET.get('page_size', settings.EXAM_PAPER_PAGE_SIZE))), 100)
+    except ValueError:
+        return JsonResponse({'error': 'page and page_size must be integers.'}, status=400)
 
+    technology = test_attempt.test_schedule.technology
+    etag = f'"paper-{test_attempt.id}-v{technology.question_bank_version}-p{page}-s{page_size}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        question_ids = get_paper_question_ids(test_attempt)
+        bank = get_question_bank(technology)
+        offset = (page - 1) * page_size
+        page_questions = [bank.questions[qid] for qid in question_ids[offset:offset + page_size] if qid in bank.questions]
+        response = JsonResponse({
+            'attempt_id': test_attempt.id,
+            'page': page,
+            'page_size': page_size,
+            'total_questions': len(question_ids),
+            'num_pages': (len(question_ids) + page_size - 1) // page_size,
+            'has_next': offset + page_size < len(question_ids),
+            'questions': [
+                {
+                    'id': question.id,
+                    'number': number,
+                    'question_text': question.question_text,
+                    'options': {'A': question.option_a, 'B': question.option_b,
+                                'C': question.option_c, 'D': question.option_d},
+                    'marks': str(question.marks),
+                    # Unanswered card; the page applies the candidate's answers client-side
+                    'html': render_question_cards(bank, [question], {}, start=number),
+                }
+                for number, question in enumerate(page_questions, offset + 1)
+            ],
+        })
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
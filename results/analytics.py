@@ -0,0 +1,168 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import BigIntegerField, Case, Count, ExpressionWrapper, F, Max, Value, When
+from django.db import transaction
+from django.utils import timezone
+
+from employee.models import EmployeeTestAttempt
+from questionbank.cache import get_question_bank
+from questionbank.models import Answer, Question
+
+try:
+    import numpy as np
+except ImportError: # Optional dependency, only needed for item analysis
+    np = None
+
+# Item analysis of a test schedule: for every question, how hard it was (p-value), how well it
+# separates strong from weak candidates (point-biserial correlation with the rest of the paper),
+# and how often each option was picked. All completed answers of the schedule are loaded in one
+# query into an attempt x question matrix of option codes and the statistics are computed on
+# whole columns at once.
+#
+# The result is cached until the responses or the answer key can have changed: another attempt
+# completes (the completed count and latest end time in the key), the schedule's questions change
+# (the question bank version), or a completed attempt is regraded or its answers are edited (a
+# per-schedule responses version, bumped from results/signals.py).
+
+OPTIONS = [option for option, _ in Question.OPTION_CHOICES]
+BLANK = len(OPTIONS) # Code of an unanswered question
+NOT_SERVED = -1 # Question wasn't on this attempt's paper
+
+OPTION_CODE = Case(
+    *[When(selected_option=option, then=Value(code)) for code, option in enumerate(OPTIONS)],
+    default=Value(BLANK),
+)
+
+# Each answer is fetched as a single packed integer, attempt_id << 35 | question_id << 3 | option code,
+# which keeps the per-row cost of reading a million answers low (ids must stay below 2**28 and 2**32)
+ATTEMPT_SHIFT = 35
+QUESTION_SHIFT = 3
+PACKED_ANSWER = ExpressionWrapper(
+    F('test_attempt_id') * Value(2 ** ATTEMPT_SHIFT) + F('question_id') * Value(2 ** QUESTION_SHIFT) + OPTION_CODE,
+    output_field=BigIntegerField(),
+)
+
+
+def load_response_matrix(test_schedule):
+    """Return (attempt_ids, question_ids, choices) where choices[i, j] is the option code of attempt i on question j."""
+    packed = Answer.objects.filter(
+        test_attempt__test_schedule=test_schedule, test_attempt__is_completed=True
+    ).order_by().values_list(PACKED_ANSWER, flat=True)
+    rows = np.fromiter(packed, dtype=np.int64)
+
+    attempt_ids, rows_index = np.unique(rows >> ATTEMPT_SHIFT, return_inverse=True)
+    question_ids, columns_index = np.unique((rows & (2 ** ATTEMPT_SHIFT - 1)) >> QUESTION_SHIFT, return_inverse=True)
+    choices = np.full((len(attempt_ids), len(question_ids)), NOT_SERVED, dtype=np.int8)
+    choices[rows_index, columns_index] = rows & (2 ** QUESTION_SHIFT - 1)
+    return attempt_ids, question_ids, choices
+
+
+def masked_correlation(x, y, mask):
+    """Pearson correlation of each column of x with the same column of y, over the rows where mask is set."""
+    counts = mask.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = (x * mask).sum(axis=0) / counts
+        mean_y = (y * mask).sum(axis=0) / counts
+        dx = np.where(mask, x - mean_x, 0.0)
+        dy = np.where(mask, y - mean_y, 0.0)
+        return (dx * dy).sum(axis=0) / np.sqrt((dx * dx).sum(axis=0) * (dy * dy).sum(axis=0))
+
+
+def rounded(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def compute_item_analysis(test_schedule):
+    if np is None:
+        raise ImproperlyConfigured("Item analysis requires NumPy; install it with `pip install numpy`.")
+    bank = get_question_bank(test_schedule.technology)
+    analysis = analyze_responses(bank, *load_response_matrix(test_schedule))
+    analysis['test_schedule_id'] = test_schedule.id
+    return analysis
+
+
+def analyze_responses(bank, attempt_ids, question_ids, choices):
+    known = np.array([question_id in bank.answer_key for question_id in question_ids.tolist()], dtype=bool)
+    question_ids, choices = question_ids[known], choices[:, known]
+
+    key = np.array([OPTIONS.index(bank.answer_key[qid][0]) for qid in question_ids.tolist()], dtype=np.int8)
+    marks = np.array([float(bank.answer_key[qid][1]) for qid in question_ids.tolist()], dtype=np.float64)
+
+    served = choices != NOT_SERVED
+    correct = (choices == key).astype(np.float64)
+    served_count = served.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p_values = correct.sum(axis=0) / served_count
+
+        # Each candidate's score on the rest of their paper (excluding the item itself), as a fraction,
+        # since papers are sampled per attempt and their totals differ
+        obtained = (correct * marks).sum(axis=1, keepdims=True)
+        possible = (served * marks).sum(axis=1, keepdims=True)
+        rest_scores = (obtained - correct * marks) / (possible - marks)
+    point_biserial = masked_correlation(correct, np.nan_to_num(rest_scores), served & (possible - marks > 0))
+
+    option_counts = np.stack([(choices == code).sum(axis=0) for code in range(len(OPTIONS) + 1)])
+
+    questions = bank.questions
+    items = []
+    for column, question_id in enumerate(question_ids.tolist()):
+        question = questions[question_id]
+        counts = option_counts[:, column].tolist()
+        items.append({
+            'question_id': question_id,
+            'question_text': question.question_text,
+            'correct_option': question.correct_option,
+            'marks': float(question.marks),
+            'served': int(served_count[column]),
+            'p_value': rounded(p_values[column]),
+            'point_biserial': rounded(point_biserial[column]),
+            'option_counts': dict(zip(OPTIONS, counts[:BLANK])),
+            'unanswered': counts[BLANK],
+        })
+    return {
+        'attempt_count': len(attempt_ids),
+        'question_count': len(items),
+        'computed_at': timezone.now().isoformat(),
+        'items': items,
+    }
+
+
+def responses_version_key(test_schedule_id):
+    return f'item-analysis:responses-version:{test_schedule_id}'
+
+
+def get_responses_version(test_schedule_id):
+    # Seeded with the current time if missing (first use, or evicted), so a lost version never
+    # lets analyses cached under an older one come back
+    key = responses_version_key(test_schedule_id)
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def bump_responses_version(*test_schedule_ids):
+    # After commit, so a concurrent request can't cache the responses from before the change
+    def bump():
+        for test_schedule_id in test_schedule_ids:
+            try:
+                cache.incr(responses_version_key(test_schedule_id))
+            except ValueError: # Not in the cache; the next read starts a new version anyway
+                pass
+    transaction.on_commit(bump)
+
+
+def get_item_analysis(test_schedule):
+    """Item analysis of `test_schedule`, cached until its responses, grades or questions change."""
+    completed = EmployeeTestAttempt.objects.filter(test_schedule=test_schedule, is_completed=True).aggregate(
+        count=Count('id'), last=Max('end_time')
+    )
+    last = completed['last'].timestamp() if completed['last'] else 0
+    cache_key = (f"item-analysis:{test_schedule.id}:v{test_schedule.technology.question_bank_version}"
+                 f":r{get_responses_version(test_schedule.id)}:{completed['count']}:{last}")
+    analysis = cache.get(cache_key)
+    if analysis is None:
+        analysis = compute_item_analysis(test_schedule)
+        cache.set(cache_key, analysis, getattr(settings, 'ITEM_ANALYSIS_CACHE_SECONDS', 24 * 60 * 60))
+    return analysis
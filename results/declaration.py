@@ -0,0 +1,42 @@
+from django.db import transaction
+
+from .models import EmployeeResult
+from employee.models import EmployeeTestAttempt
+
+
+def declare_schedule_results(test_schedule, declared_by, batch_size=500):
+    """Declare (or re-declare) the result of every completed attempt of `test_schedule`.
+
+    Each employee's latest completed attempt is graded against the schedule's pass mark and
+    written with a single batched upsert; existing results keep their remarks.
+    Returns (created, updated) row counts.
+    """
+    latest_attempts = {}
+    for attempt in EmployeeTestAttempt.objects.filter(test_schedule=test_schedule, is_completed=True).order_by(
+            'employee_id', 'end_time', 'id').only('id', 'employee_id', 'score'):
+        latest_attempts[attempt.employee_id] = attempt # Later attempts of the same employee replace earlier ones
+    if not latest_attempts:
+        return 0, 0
+
+    results = [
+        EmployeeResult(
+            employee_id=employee_id,
+            test_schedule=test_schedule,
+            test_attempt=attempt,
+            score=attempt.score or 0,
+            passed=test_schedule.is_pass(attempt.score),
+            declared_by=declared_by,
+        )
+        for employee_id, attempt in latest_attempts.items()
+    ]
+    with transaction.atomic():
+        existing = set(EmployeeResult.objects.filter(test_schedule=test_schedule,
+                                                     employee_id__in=latest_attempts).order_by().values_list('employee_id', flat=True))
+        EmployeeResult.objects.bulk_create(
+            results,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['employee', 'test_schedule'],
+            update_fields=['test_attempt', 'score', 'passed', 'declared_by'],
+        )
+    return len(results) - len(existing), len(existing)
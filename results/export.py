@@ -0,0 +1,172 @@
+import csv
+import datetime
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import EmployeeResult
+from employee.models import EmployeeTestAttempt
+
+# Result exports are generated row by row: attempts are read from the database in chunks
+# (`iterator`) and every row is written straight into the response stream, so memory use
+# does not depend on how many results are exported.
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = [
+    'Attempt ID', 'Employee ID', 'Employee Name', 'Department', 'Technology', 'Test Schedule ID',
+    'Started At', 'Submitted At', 'Questions', 'Correct Answers', 'Marks Obtained', 'Total Marks',
+    'Score (%)', 'Result Declared', 'Passed', 'Declared At',
+]
+
+
+def export_queryset(technology=None, date_from=None, date_to=None):
+    """Completed attempts (with their declared result, if any) submitted within the date range."""
+    attempts = EmployeeTestAttempt.objects.filter(is_completed=True)
+    if technology is not None:
+        attempts = attempts.filter(test_schedule__technology=technology)
+    # Whole days in the current time zone; kept as plain range filters so the end_time index is usable
+    if date_from:
+        attempts = attempts.filter(end_time__gte=timezone.make_aware(datetime.datetime.combine(date_from, datetime.time.min)))
+    if date_to:
+        next_day = date_to + datetime.timedelta(days=1)
+        attempts = attempts.filter(end_time__lt=timezone.make_aware(datetime.datetime.combine(next_day, datetime.time.min)))
+
+    results = EmployeeResult.objects.filter(employee=OuterRef('employee_id'), test_schedule=OuterRef('test_schedule_id'))
+    return attempts.annotate(
+        result_passed=Subquery(results.values('passed')[:1]),
+        result_declared_at=Subquery(results.values('declared_at')[:1]),
+    ).order_by('end_time', 'id').values_list(
+        'id', 'employee__employee_id', 'employee__user__first_name', 'employee__user__last_name',
+        'employee__user__username', 'employee__department', 'test_schedule__technology__name', 'test_schedule_id',
+        'start_time', 'end_time', 'question_count', 'correct_count', 'marks_obtained', 'total_marks', 'score',
+        'result_passed', 'result_declared_at',
+    )
+
+
+def format_datetime(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def iter_export_rows(queryset):
+    for (attempt_id, employee_id, first_name, last_name, username, department, technology, schedule_id,
+         start_time, end_time, question_count, correct_count, marks_obtained, total_marks, score,
+         passed, declared_at) in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        declared = declared_at is not None
+        yield [
+            attempt_id, employee_id, f'{first_name} {last_name}'.strip() or username, department or '',
+            technology, schedule_id, format_datetime(start_time), format_datetime(end_time),
+            question_count, correct_count, marks_obtained, total_marks, score if score is not None else '',
+            'Yes' if declared else 'No', ('Yes' if passed else 'No') if declared else '', format_datetime(declared_at),
+        ]
+
+
+class Echo:
+    """File-like object whose write() hands back what was written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+# --- XLSX ---
+# An .xlsx file is a zip of XML parts. The worksheet is written as one zip entry whose rows are
+# appended as they are produced; the zip is written to an unseekable buffer that is drained
+# after every chunk of rows, so only the current chunk is ever held in memory.
+
+XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Results" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+class StreamBuffer:
+    """Write-only, unseekable sink for ZipFile; `drain()` returns and forgets what was written."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def xlsx_cell(value):
+    if value is None or value == '':
+        return '<c/>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+
+def xlsx_row(values):
+    return '<row>' + ''.join(xlsx_cell(value) for value in values) + '</row>'
+
+
+def stream_xlsx(rows, rows_per_chunk=500):
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'.encode()
+            )
+            sheet.write(xlsx_row(EXPORT_COLUMNS).encode())
+            for count, row in enumerate(rows, start=1):
+                sheet.write(xlsx_row(row).encode())
+                if count % rows_per_chunk == 0:
+                    yield buffer.drain()
+            sheet.write(b'</sheetData></worksheet>')
+        yield buffer.drain()
+    yield buffer.drain() # Central directory, written when the archive is closed
@@ -1,5 +1,6 @@
 from django import forms
 from .models import EmployeeResult
+from administrator.models import Technology
 
 class EmployeeResultForm(forms.ModelForm):
     # This form is primarily for admin to declare/update a result.
@@ -14,4 +15,21 @@ class EmployeeResultForm(forms.ModelForm):
         }
         labels = {
             'passed': 'Candidate Passed'
-        }
\ No newline at end of file
+        }
+
+class ResultExportForm(forms.Form):
+    # Query-string filters for the results export; every field is optional
+    FORMAT_CHOICES = [('csv', 'CSV'), ('xlsx', 'Excel (XLSX)')]
+
+    technology = forms.ModelChoiceField(queryset=Technology.objects.all(), required=False)
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("The start date must be on or before the end date.")
+        return cleaned_data
@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from decimal import Decimal
+
+# Single place where an attempt's answers are turned into marks and a percentage score.
+# The summary is stored on EmployeeTestAttempt at submission time, so result pages only read it.
+
+
+@dataclass
+class GradeSummary:
+    question_count: int = 0
+    correct_count: int = 0
+    marks_obtained: Decimal = Decimal('0')
+    total_marks: Decimal = Decimal('0')
+
+    @property
+    def percentage(self):
+        # Ensure no division by zero if there are no questions
+        if not self.total_marks:
+            return Decimal('0')
+        return self.marks_obtained / self.total_marks * 100
+
+
+def grade_selections(answer_key, selections):
+    """Grade `selections` ({question_id: option}) against `answer_key` ({question_id: (correct_option, marks)})."""
+    summary = GradeSummary()
+    for question_id, (correct_option, marks) in answer_key.items():
+        summary.question_count += 1
+        summary.total_marks += marks
+        if selections.get(question_id) == correct_option:
+            summary.correct_count += 1
+            summary.marks_obtained += marks
+    return summary
+
+
+def apply_grade(test_attempt, summary):
+    """Copy a grade summary onto the attempt; returns the fields to save."""
+    test_attempt.score = summary.percentage
+    test_attempt.question_count = summary.question_count
+    test_attempt.correct_count = summary.correct_count
+    test_attempt.marks_obtained = summary.marks_obtained
+    test_attempt.total_marks = summary.total_marks
+    return ['score', 'question_count', 'correct_count', 'marks_obtained', 'total_marks']
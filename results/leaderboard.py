@@ -0,0 +1,249 @@
+import threading
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from ExamHub.routers import use_primary
+from employee.models import EmployeeTestAttempt
+
+# Rank and percentile of completed attempts within their test schedule.
+#
+# Scores are percentages with two decimals, so each schedule's scores fall into 10,001 buckets
+# (0.00 .. 100.00). A Fenwick (binary indexed) tree over the bucket counts answers "how many
+# attempts scored at most X" and "which score has the k-th best attempt" in O(log buckets), so
+# ranks and top-N lists never sort the attempts. Each process keeps its leaderboards in memory
+# and adds attempts as they are submitted or finalized. When the database has attempts a board
+# didn't record (completed by another process), only the attempts from the oldest one that was
+# still open at the last check are read again and added; a board is rebuilt from the database
+# only if that doesn't bring it in line (attempts deleted, or graded again long after).
+
+SCORE_BUCKETS = 10001 # 0.00 .. 100.00 in steps of 0.01
+
+
+def score_bucket(score):
+    # Rounded as the score column stores it, so a just-graded score lands where the saved one does
+    score = Decimal(score or 0).quantize(Decimal('0.01'))
+    return min(max(int(score * 100), 0), SCORE_BUCKETS - 1)
+
+
+class FenwickTree:
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.top_bit = 1 << (size.bit_length() - 1)
+
+    def add(self, index, delta):
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, index):
+        """Sum of the counts at positions 0..index."""
+        total = 0
+        index += 1
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, k):
+        """Smallest (0-based) position whose prefix sum is at least k, for 1 <= k <= total."""
+        position = 0
+        step = self.top_bit
+        while step:
+            following = position + step
+            if following <= self.size and self.tree[following] < k:
+                position = following
+                k -= self.tree[following]
+            step >>= 1
+        return position # Last 1-based index with a prefix sum below k, i.e. the 0-based answer
+
+
+class Leaderboard:
+    """Scores of one test schedule's completed attempts."""
+
+    def __init__(self, test_schedule_id):
+        self.test_schedule_id = test_schedule_id
+        self.tree = FenwickTree(SCORE_BUCKETS)
+        self.buckets = {} # bucket -> attempt ids in the order they were recorded (ties keep submission order)
+        self.attempt_buckets = {} # attempt_id -> bucket
+        self.max_attempt_id = 0
+        self.bucket_total = 0 # Sum of the attempts' buckets, i.e. of their scores in hundredths
+        # Attempts with a lower id were all completed, and recorded, when the board last read the
+        # database; later reads start here
+        self.low_water = 0
+
+    def __len__(self):
+        return len(self.attempt_buckets)
+
+    @property
+    def signature(self):
+        # Compared with the database to detect attempts this process didn't record (or not at their current score)
+        return len(self.attempt_buckets), self.max_attempt_id, self.bucket_total
+
+    def add(self, attempt_id, score):
+        bucket = score_bucket(score)
+        previous = self.attempt_buckets.get(attempt_id)
+        if previous == bucket:
+            return
+        if previous is not None:
+            # Graded again (a late submission merged into an attempt closed on timeout)
+            self.tree.add(previous, -1)
+            self.buckets[previous].remove(attempt_id)
+            if not self.buckets[previous]:
+                del self.buckets[previous]
+            self.bucket_total -= previous
+        self.tree.add(bucket, 1)
+        self.bucket_total += bucket
+        self.buckets.setdefault(bucket, []).append(attempt_id)
+        self.attempt_buckets[attempt_id] = bucket
+        self.max_attempt_id = max(self.max_attempt_id, attempt_id)
+
+    def rank(self, attempt_id):
+        """1-based competition rank (attempts with the same score share a rank), or None if not ranked."""
+        bucket = self.attempt_buckets.get(attempt_id)
+        if bucket is None:
+            return None
+        return len(self) - self.tree.prefix_sum(bucket) + 1
+
+    def percentile(self, attempt_id):
+        """Percentage of attempts scoring below this one, counting ties as half."""
+        bucket = self.attempt_buckets.get(attempt_id)
+        if bucket is None:
+            return None
+        below = self.tree.prefix_sum(bucket - 1) if bucket else 0
+        tied = len(self.buckets[bucket])
+        return round((below + tied / 2) / len(self) * 100, 2)
+
+    def top(self, n):
+        """The best `n` attempts as (rank, attempt_id, score) tuples, best first."""
+        entries = []
+        position = 1 # Rank of the next attempt to list
+        while len(entries) < n and position <= len(self):
+            # The attempt at rank `position` is the (len - position + 1)-th smallest score
+            bucket = self.tree.find(len(self) - position + 1)
+            attempt_ids = self.buckets[bucket]
+            score = Decimal(bucket) / 100
+            entries.extend((position, attempt_id, score) for attempt_id in attempt_ids[:n - len(entries)])
+            position += len(attempt_ids)
+        return entries
+
+    def read_new_attempts(self):
+        """Completed attempts from the low-water id on, as (attempt_id, score), with the low-water id for the next read."""
+        attempts = EmployeeTestAttempt.objects.filter(test_schedule_id=self.test_schedule_id)
+        # Taken before the attempts are read: one completed in between is still open here, so the next read covers it
+        oldest_open = attempts.filter(is_completed=False).order_by('id').values_list('id', flat=True).first()
+        newest = attempts.order_by('-id').values_list('id', flat=True).first()
+        low_water = oldest_open if oldest_open is not None else (newest or 0) + 1
+        completed = attempts.filter(is_completed=True)
+        if self.low_water:
+            # A short range of ids; sorting it is cheap, where a first read walks the schedule's index in order
+            completed = completed.filter(id__gte=self.low_water)
+        rows = list(completed.order_by('end_time', 'id').values_list('id', 'score'))
+        return rows, low_water
+
+    def apply(self, rows, low_water):
+        for attempt_id, score in rows:
+            self.add(attempt_id, score) # Already recorded ones are skipped, or moved if graded again
+        self.low_water = max(self.low_water, low_water)
+
+    @classmethod
+    def from_database(cls, test_schedule_id):
+        leaderboard = cls(test_schedule_id)
+        leaderboard.apply(*leaderboard.read_new_attempts())
+        return leaderboard
+
+
+def database_signatures(test_schedule_ids):
+    """What each schedule's up-to-date board has: {test_schedule_id: (attempts, max attempt id, sum of buckets)}."""
+    return {
+        row['test_schedule_id']: (row['count'], row['max_id'], round(Decimal(row['total'] or 0) * 100))
+        for row in EmployeeTestAttempt.objects.filter(
+            test_schedule_id__in=test_schedule_ids, is_completed=True
+        ).order_by().values('test_schedule_id').annotate(count=Count('id'), max_id=Max('id'), total=Sum('score'))
+    }
+
+
+class LeaderboardRegistry:
+    def __init__(self):
+        self._leaderboards = {} # test_schedule_id -> Leaderboard
+        self._lock = threading.Lock()
+
+    def get_many(self, test_schedule_ids):
+        """Up-to-date leaderboards for the given schedules, checked against the database in one query."""
+        test_schedule_ids = set(test_schedule_ids)
+        if not test_schedule_ids:
+            return {}
+        # Always checked against the primary, which the boards' recorded submissions come from;
+        # a lagging replica would make every board look out of date
+        with use_primary():
+            signatures = database_signatures(test_schedule_ids)
+            leaderboards = {}
+            for test_schedule_id in test_schedule_ids:
+                expected = signatures.get(test_schedule_id, (0, 0, 0))
+                with self._lock:
+                    leaderboard = self._leaderboards.get(test_schedule_id)
+                if leaderboard is not None and leaderboard.signature != expected:
+                    leaderboard = self.catch_up(leaderboard, expected)
+                if leaderboard is None:
+                    leaderboard = Leaderboard.from_database(test_schedule_id)
+                    with self._lock:
+                        self._leaderboards[test_schedule_id] = leaderboard
+                leaderboards[test_schedule_id] = leaderboard
+        return leaderboards
+
+    def catch_up(self, leaderboard, expected):
+        """Add the attempts another process completed; returns the board, or None if it has to be rebuilt."""
+        if len(leaderboard) > expected[0]:
+            return None # Attempts were deleted
+        rows, low_water = leaderboard.read_new_attempts()
+        with self._lock:
+            leaderboard.apply(rows, low_water)
+        if leaderboard.signature == database_signatures([leaderboard.test_schedule_id]).get(leaderboard.test_schedule_id, (0, 0, 0)):
+            return leaderboard
+        return None # Attempts below the low-water id changed (deleted, or graded again)
+
+    def get(self, test_schedule_id):
+        return self.get_many([test_schedule_id])[test_schedule_id]
+
+    def record(self, scores):
+        """Add newly completed attempts, as (attempt_id, test_schedule_id, score), to the loaded leaderboards."""
+        with self._lock:
+            for attempt_id, test_schedule_id, score in scores:
+                leaderboard = self._leaderboards.get(test_schedule_id)
+                if leaderboard is not None:
+                    leaderboard.add(attempt_id, score)
+
+    def clear(self):
+        with self._lock:
+            self._leaderboards.clear()
+
+
+leaderboards = LeaderboardRegistry()
+
+
+def record_completed_attempts(*attempts):
+    # Applied once the grading transaction commits, so a rolled-back submission is never ranked
+    scores = [(attempt.id, attempt.test_schedule_id, attempt.score) for attempt in attempts]
+    transaction.on_commit(lambda: leaderboards.record(scores))
+
+
+def get_rankings(attempts):
+    """Map attempt id -> (rank, percentile, ranked attempts of its schedule) for the given completed attempts."""
+    boards = leaderboards.get_many(attempt.test_schedule_id for attempt in attempts)
+    rankings = {}
+    for attempt in attempts:
+        leaderboard = boards[attempt.test_schedule_id]
+        rank = leaderboard.rank(attempt.id)
+        if rank is not None:
+            rankings[attempt.id] = (rank, leaderboard.percentile(attempt.id), len(leaderboard))
+    return rankings
+
+
+def attach_rankings(attempts):
+    # Sets `rank`, `percentile` and `ranked_count` on each completed attempt, for templates
+    rankings = get_rankings(attempts)
+    for attempt in attempts:
+        attempt.rank, attempt.percentile, attempt.ranked_count = rankings.get(attempt.id, (None, None, 0))
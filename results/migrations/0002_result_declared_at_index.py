@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrator', '0005_testschedule_window_index'),
+        ('employee', '0003_attempt_indexes'),
+        ('results', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeeresult',
+            index=models.Index(fields=['declared_at'], name='results_emp_declare_6f907f_idx'),
+        ),
+    ]
@@ -27,6 +27,7 @@ class EmployeeResult(models.Model):
         # If multiple attempts are allowed, this needs rethinking, perhaps link to TestAttempt directly.
         unique_together = ('employee', 'test_schedule')
         ordering = ['-declared_at']
+        indexes = [models.Index(fields=['declared_at'])] # Results listing, newest first
         verbose_name_plural = "Employee Results"
 
     def __str__(self):
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .analytics import bump_responses_version
+from employee.models import EmployeeTestAttempt
+from questionbank.models import Answer
+
+# Invalidates the cached item analyses (results/analytics.py) on row-by-row writes of attempts
+# and answers: regrades, answer edits and deletions made from the views, the Django admin or the
+# shell. Attempts completed in bulk (employee/expiry.py) change the completed count in the key.
+
+
+@receiver(post_save, sender=EmployeeTestAttempt, dispatch_uid='item_analysis_attempt_save')
+@receiver(post_delete, sender=EmployeeTestAttempt, dispatch_uid='item_analysis_attempt_delete')
+def attempt_changed(sender, instance, **kwargs):
+    bump_responses_version(instance.test_schedule_id)
+
+
+@receiver(post_save, sender=Answer, dispatch_uid='item_analysis_answer_save')
+@receiver(post_delete, sender=Answer, dispatch_uid='item_analysis_answer_delete')
+def answer_changed(sender, instance, **kwargs):
+    # Answers of attempts in progress aren't analysed
+    bump_responses_version(*EmployeeTestAttempt.objects.filter(id=instance.test_attempt_id, is_completed=True)
+                           .values_list('test_schedule_id', flat=True))
@@ -1,3 +1,438 @@
-from django.test import TestCase
+import csv
+import datetime
+import importlib
+import importlib.util
+import io
+import math
+import random
+import unittest
+import zipfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ExamHub.db import full_table_scans, query_plan
+from .declaration import declare_schedule_results
+from .grading import grade_selections
+from .leaderboard import Leaderboard, leaderboards, record_completed_attempts
+from .models import EmployeeResult
+from administrator.models import Technology, TestSchedule
+from employee.models import EmployeeProfile, EmployeeTestAttempt
+from questionbank.models import Answer, Question
+
+
+class GradingTest(SimpleTestCase):
+    def test_marks_are_weighted_and_unanswered_questions_are_wrong(self):
+        answer_key = {1: ('A', Decimal('1')), 2: ('B', Decimal('2')), 3: ('C', Decimal('1')), 4: ('D', Decimal('4'))}
+        summary = grade_selections(answer_key, {1: 'A', 2: 'B', 3: 'D', 99: 'A'}) # 4 unanswered, 99 not on the key
+        self.assertEqual((summary.question_count, summary.correct_count), (4, 2))
+        self.assertEqual((summary.marks_obtained, summary.total_marks, summary.percentage), (3, 8, Decimal('37.5')))
+        self.assertEqual(grade_selections({}, {1: 'A'}).percentage, 0)
+
+
+@override_settings(ADMIN_LIST_PAGE_SIZE=4)
+class ResultListPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear() # The technology filter is cached reference data
+        self.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(self.admin)
+        now = timezone.now()
+        self.python = Technology.objects.create(name='Python')
+        self.django = Technology.objects.create(name='Django')
+        self.schedules = [
+            TestSchedule.objects.create(technology=technology, start_time=now, end_time=now + datetime.timedelta(days=1))
+            for technology in (self.python, self.django)
+        ]
+
+    def declare_results(self, count):
+        offset = EmployeeProfile.objects.count()
+        for i in range(offset, offset + count):
+            user = User.objects.create_user(f'employee{i}')
+            employee = EmployeeProfile.objects.create(user=user, employee_id=f'E{i}')
+            schedule = self.schedules[i % 2]
+            attempt = EmployeeTestAttempt.objects.create(employee=employee, test_schedule=schedule,
+                                                         is_completed=True, score=60, end_time=timezone.now())
+            EmployeeResult.objects.create(employee=employee, test_schedule=schedule, test_attempt=attempt,
+                                          score=60, passed=True, declared_by=self.admin)
+
+    def walk(self, params):
+        ids = []
+        query = params
+        while query is not None:
+            response = self.client.get(f"{reverse('view_all_results')}?{query}")
+            page = response.context['page']
+            ids.extend(result.id for result in page)
+            query = page.next_query
+        return ids
+
+    def test_pages_cover_every_result_once(self):
+        self.declare_results(11)
+        expected = list(EmployeeResult.objects.order_by('-declared_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk(''), expected)
+
+    def test_technology_filter_is_kept_across_pages(self):
+        self.declare_results(11)
+        expected = list(EmployeeResult.objects.filter(test_schedule__technology=self.python).order_by(
+            '-declared_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk(f'technology={self.python.id}'), expected)
+
+    def test_query_budget_does_not_grow_with_rows(self):
+        # Session, user, one query for the page and one leaderboard check; the technologies for
+        # the filter come from the cache
+        self.declare_results(3)
+        self.client.get(reverse('view_all_results')) # Loads the leaderboards of this process
+        with self.assertNumQueries(4):
+            self.client.get(reverse('view_all_results'))
+        self.declare_results(30)
+        self.client.get(reverse('view_all_results'))
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('view_all_results'))
+        self.assertContains(response, reverse('view_detailed_result_admin', args=[response.context['page'].object_list[0].id]))
+
+
+class ResultExportTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(self.admin)
+        self.python = Technology.objects.create(name='Python')
+        self.django = Technology.objects.create(name='Django')
+        start = timezone.make_aware(datetime.datetime(2026, 1, 1))
+        self.attempts = []
+        for i, (technology, day) in enumerate([(self.python, 5), (self.django, 10), (self.python, 20), (self.python, 31)]):
+            schedule = TestSchedule.objects.create(technology=technology, start_time=start,
+                                                   end_time=start + datetime.timedelta(days=60))
+            user = User.objects.create_user(f'employee{i}', first_name='Emp', last_name=f'<{i}> & co')
+            employee = EmployeeProfile.objects.create(user=user, employee_id=f'E{i}')
+            self.attempts.append(EmployeeTestAttempt.objects.create(
+                employee=employee, test_schedule=schedule, is_completed=True, score=40 + i * 10,
+                end_time=start + datetime.timedelta(days=day, hours=12),
+            ))
+        EmployeeResult.objects.create(employee=self.attempts[0].employee, test_schedule=self.attempts[0].test_schedule,
+                                      score=40, passed=False, declared_by=self.admin)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_results'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_csv_applies_technology_and_date_filters(self):
+        response = self.export(technology=self.python.id, date_from='2026-01-07', date_to='2026-01-21')
+        self.assertIn('attachment;', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][0], 'Attempt ID')
+        self.assertEqual([int(row[0]) for row in rows[1:]], [self.attempts[2].id])
+
+    def test_csv_includes_declared_result(self):
+        rows = list(csv.reader(io.StringIO(b''.join(self.export().streaming_content).decode())))
+        self.assertEqual(len(rows), 5)
+        first = dict(zip(rows[0], rows[1]))
+        self.assertEqual((first['Result Declared'], first['Passed']), ('Yes', 'No'))
+        self.assertEqual(dict(zip(rows[0], rows[2]))['Result Declared'], 'No')
+
+    def test_xlsx_is_a_valid_workbook(self):
+        response = self.export(format='xlsx')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertIn('xl/workbook.xml', archive.namelist())
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 5)
+        self.assertIn('Emp &lt;3&gt; &amp; co', sheet)
+
+    def test_invalid_date_range_redirects_back(self):
+        response = self.client.get(reverse('export_results'), {'date_from': '2026-02-01', 'date_to': '2026-01-01'})
+        self.assertRedirects(response, reverse('view_all_results'))
+
+
+@unittest.skipUnless(importlib.util.find_spec('numpy'), "item analysis needs NumPy")
+class ItemAnalysisTest(TestCase):
+    # Rows are attempts, columns the three questions (correct options A, B, C); None = unanswered
+    RESPONSES = [
+        ['A', 'B', 'C'],
+        ['A', 'B', 'D'],
+        ['A', 'C', None],
+        ['B', 'C', 'C'],
+        ['D', 'A', 'A'],
+    ]
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(self.admin)
+        now = timezone.now()
+        technology = Technology.objects.create(name='Python')
+        self.schedule = TestSchedule.objects.create(technology=technology, start_time=now,
+                                                    end_time=now + datetime.timedelta(days=1))
+        self.questions = [
+            Question.objects.create(technology=technology, question_text=f'Q{i}', option_a='a', option_b='b',
+                                    option_c='c', option_d='d', correct_option=option)
+            for i, option in enumerate('ABC')
+        ]
+        for i, selections in enumerate(self.RESPONSES):
+            employee = EmployeeProfile.objects.create(user=User.objects.create_user(f'employee{i}'), employee_id=f'E{i}')
+            attempt = EmployeeTestAttempt.objects.create(employee=employee, test_schedule=self.schedule,
+                                                         is_completed=True, end_time=now)
+            Answer.objects.bulk_create([
+                Answer(test_attempt=attempt, question=question, selected_option=option)
+                for question, option in zip(self.questions, selections)
+            ])
+        # An attempt still in progress is left out
+        employee = EmployeeProfile.objects.create(user=User.objects.create_user('ongoing'), employee_id='E99')
+        ongoing = EmployeeTestAttempt.objects.create(employee=employee, test_schedule=self.schedule)
+        Answer.objects.create(test_attempt=ongoing, question=self.questions[0], selected_option='D')
+
+    def expected_point_biserial(self, column):
+        correct = [float(row[column] == 'ABC'[column]) for row in self.RESPONSES]
+        rest = [
+            sum(row[other] == 'ABC'[other] for other in range(3) if other != column) / 2
+            for row in self.RESPONSES
+        ]
+        mean_c, mean_r = sum(correct) / len(correct), sum(rest) / len(rest)
+        cov = sum((c - mean_c) * (r - mean_r) for c, r in zip(correct, rest))
+        var_c = sum((c - mean_c) ** 2 for c in correct)
+        var_r = sum((r - mean_r) ** 2 for r in rest)
+        return cov / math.sqrt(var_c * var_r)
+
+    def test_statistics_match_a_direct_computation(self):
+        response = self.client.get(reverse('item_analysis_api', args=[self.schedule.id]))
+        analysis = response.json()
+        self.assertEqual(analysis['attempt_count'], 5)
+        items = {item['question_id']: item for item in analysis['items']}
+        for column, question in enumerate(self.questions):
+            item = items[question.id]
+            picks = [row[column] for row in self.RESPONSES]
+            self.assertEqual(item['served'], 5)
+            self.assertEqual(item['p_value'], round(picks.count('ABC'[column]) / 5, 4))
+            self.assertEqual(item['option_counts'], {option: picks.count(option) for option in 'ABCD'})
+            self.assertEqual(item['unanswered'], picks.count(None))
+            self.assertAlmostEqual(item['point_biserial'], self.expected_point_biserial(column), places=4)
+
+    def test_result_is_cached_until_another_attempt_completes(self):
+        first = self.client.get(reverse('item_analysis_api', args=[self.schedule.id])).json()
+        self.assertEqual(self.client.get(reverse('item_analysis_api', args=[self.schedule.id])).json(), first)
+
+        ongoing = EmployeeTestAttempt.objects.get(employee__employee_id='E99')
+        ongoing.is_completed = True
+        ongoing.end_time = timezone.now()
+        ongoing.save()
+        refreshed = self.client.get(reverse('item_analysis_api', args=[self.schedule.id])).json()
+        self.assertEqual(refreshed['attempt_count'], 6)
+
+    def test_result_is_recomputed_after_an_answer_edit_or_a_regrade(self):
+        first = self.client.get(reverse('item_analysis_api', args=[self.schedule.id])).json()
+        answer = Answer.objects.get(test_attempt__employee__employee_id='E4', question=self.questions[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            answer.selected_option = 'A'
+            answer.save()
+        edited = self.client.get(reverse('item_analysis_api', args=[self.schedule.id])).json()
+        self.assertEqual(edited['items'][0]['option_counts'], {'A': 4, 'B': 1, 'C': 0, 'D': 0})
+        self.assertNotEqual(edited['computed_at'], first['computed_at'])
+
+        attempt = EmployeeTestAttempt.objects.get(employee__employee_id='E3')
+        with self.captureOnCommitCallbacks(execute=True):
+            attempt.score = 100
+            attempt.save()
+        regraded = self.client.get(reverse('item_analysis_api', args=[self.schedule.id])).json()
+        self.assertNotEqual(regraded['computed_at'], edited['computed_at'])
+
+        # Answers of an attempt in progress don't touch the analysis
+        with self.captureOnCommitCallbacks(execute=True):
+            Answer.objects.filter(test_attempt__employee__employee_id='E99').get().save()
+        self.assertEqual(self.client.get(reverse('item_analysis_api', args=[self.schedule.id])).json(), regraded)
+
+    def test_admin_page_renders(self):
+        response = self.client.get(reverse('item_analysis', args=[self.schedule.id]))
+        self.assertContains(response, 'Point-biserial')
+        self.assertEqual(len(response.context['analysis']['items']), 3)
+
+
+class StoredGradeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        technology = Technology.objects.create(name='Python')
+        schedule = TestSchedule.objects.create(technology=technology, start_time=now, end_time=now + datetime.timedelta(days=1))
+        self.user = User.objects.create_user('alice')
+        employee = EmployeeProfile.objects.create(user=self.user, employee_id='E1')
+        self.questions = [Question.objects.create(technology=technology, question_text=f'Question {i}', option_a='a',
+                                                  option_b='b', option_c='c', option_d='d', correct_option='A', marks=marks)
+                          for i, marks in enumerate([1, 2, 3])]
+        self.attempt = EmployeeTestAttempt.objects.create(employee=employee, test_schedule=schedule, is_completed=True,
+                                                          end_time=now, score=50)
+        for question, selected in zip(self.questions, ['A', 'A', 'B']):
+            Answer.objects.create(test_attempt=self.attempt, question=question, selected_option=selected)
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.result = EmployeeResult.objects.create(employee=employee, test_schedule=schedule, test_attempt=self.attempt,
+                                                    score=50, passed=True, declared_by=self.admin)
+
+    def summary(self, response):
+        return tuple(response.context[key] for key in ('correct_count', 'total_questions', 'total_marks_obtained', 'total_possible_marks'))
+
+    def test_result_pages_show_the_stored_grade(self):
+        # Different from what the answers give (2 of 3, 3 of 6 marks): the pages must not regrade
+        EmployeeTestAttempt.objects.filter(id=self.attempt.id).update(
+            correct_count=7, question_count=9, marks_obtained=Decimal('7.5'), total_marks=10)
+        self.client.force_login(self.user)
+        self.assertEqual(self.summary(self.client.get(reverse('view_employee_result', args=[self.attempt.id]))),
+                         (7, 9, Decimal('7.5'), 10))
+        self.client.force_login(self.admin)
+        for url in (reverse('admin_view_detailed_exam_result', args=[self.attempt.id]),
+                    reverse('view_detailed_result_admin', args=[self.result.id])):
+            self.assertEqual(self.summary(self.client.get(url)), (7, 9, Decimal('7.5'), 10))
+
+    def test_migration_backfills_the_grade_from_answers(self):
+        migration = importlib.import_module('employee.migrations.0002_attempt_grading_summary')
+        migration.backfill_grading_summary(apps, None)
+        self.attempt.refresh_from_db()
+        self.assertEqual((self.attempt.correct_count, self.attempt.question_count,
+                          self.attempt.marks_obtained, self.attempt.total_marks), (2, 3, 3, 6))
+
+
+class LeaderboardTest(TestCase):
+    def setUp(self):
+        leaderboards.clear()
+        now = timezone.now()
+        technology = Technology.objects.create(name='Python')
+        self.schedule = TestSchedule.objects.create(technology=technology, start_time=now,
+                                                    end_time=now + datetime.timedelta(days=1))
+        self.employee_count = 0
+
+    def complete_attempt(self, score, is_completed=True):
+        self.employee_count += 1
+        employee = EmployeeProfile.objects.create(user=User.objects.create_user(f'employee{self.employee_count}'),
+                                                  employee_id=f'E{self.employee_count}')
+        return EmployeeTestAttempt.objects.create(employee=employee, test_schedule=self.schedule, is_completed=is_completed,
+                                                  score=score, end_time=timezone.now() if is_completed else None)
+
+    def test_rank_percentile_and_top_match_sorting(self):
+        generator = random.Random(7)
+        scores = {attempt_id: generator.choice([0, 12.5, 50, 50, 66.67, 80, 99.99, 100]) for attempt_id in range(1, 301)}
+        leaderboard = Leaderboard(self.schedule.id)
+        for attempt_id, score in scores.items():
+            leaderboard.add(attempt_id, score)
+
+        for attempt_id, score in scores.items():
+            higher = sum(other > score for other in scores.values())
+            below = sum(other < score for other in scores.values())
+            tied = sum(other == score for other in scores.values())
+            self.assertEqual(leaderboard.rank(attempt_id), higher + 1)
+            self.assertEqual(leaderboard.percentile(attempt_id), round((below + tied / 2) / len(scores) * 100, 2))
+
+        top = leaderboard.top(25)
+        expected = sorted(scores, key=lambda attempt_id: (-scores[attempt_id], attempt_id))[:25]
+        self.assertEqual([attempt_id for _, attempt_id, _ in top], expected)
+        self.assertEqual([rank for rank, _, _ in top], [leaderboard.rank(attempt_id) for attempt_id in expected])
+
+    def test_submissions_are_recorded_without_rebuilding(self):
+        first = self.complete_attempt(40)
+        self.assertEqual(leaderboards.get(self.schedule.id).rank(first.id), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.complete_attempt(90)
+            record_completed_attempts(second)
+        with self.assertNumQueries(1): # Only the check against the database
+            leaderboard = leaderboards.get(self.schedule.id)
+        self.assertEqual((leaderboard.rank(second.id), leaderboard.rank(first.id)), (1, 2))
+
+    def test_catches_up_with_attempts_completed_elsewhere(self):
+        first = self.complete_attempt(40)
+        still_open = self.complete_attempt(None, is_completed=False)
+        leaderboard = leaderboards.get(self.schedule.id)
+        self.assertEqual(leaderboard.low_water, still_open.id)
+
+        # Completed by another process, nothing recorded here: one before the newest attempt, one after
+        EmployeeTestAttempt.objects.filter(id=still_open.id).update(is_completed=True, score=70, end_time=timezone.now())
+        newer = self.complete_attempt(90)
+        # The check, the low-water read, the attempts from the oldest open one on, the check again
+        with self.assertNumQueries(5):
+            self.assertIs(leaderboards.get(self.schedule.id), leaderboard)
+        self.assertEqual([leaderboard.rank(attempt.id) for attempt in (newer, still_open, first)], [1, 2, 3])
+        self.assertEqual(leaderboard.low_water, newer.id + 1)
+
+    def test_follows_attempts_graded_again(self):
+        first, second = self.complete_attempt(40), self.complete_attempt(60)
+        leaderboard = leaderboards.get(self.schedule.id)
+        EmployeeTestAttempt.objects.filter(id=first.id).update(score=80) # Late answers merged elsewhere
+        rebuilt = leaderboards.get(self.schedule.id)
+        self.assertEqual((len(rebuilt), rebuilt.rank(first.id), rebuilt.rank(second.id)), (2, 1, 2))
+        self.assertIsNot(rebuilt, leaderboard) # Below the low-water id, so only a rebuild finds it
+
+    def test_rebuilds_when_attempts_are_deleted(self):
+        first, second = self.complete_attempt(40), self.complete_attempt(90)
+        leaderboard = leaderboards.get(self.schedule.id)
+        second.delete()
+        rebuilt = leaderboards.get(self.schedule.id)
+        self.assertIsNot(rebuilt, leaderboard)
+        self.assertEqual((len(rebuilt), rebuilt.rank(first.id)), (1, 1))
+
+    def test_result_page_and_api_show_rank(self):
+        attempts = [self.complete_attempt(score) for score in (30, 70, 50)]
+        self.client.force_login(attempts[2].employee.user)
+        response = self.client.get(reverse('view_employee_result', args=[attempts[2].id]))
+        self.assertEqual((response.context['rank'], response.context['ranked_count']), (2, 3))
+
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        top = self.client.get(reverse('leaderboard_api', args=[self.schedule.id]), {'top': 2}).json()['top']
+        self.assertEqual([(entry['rank'], entry['attempt_id']) for entry in top], [(1, attempts[1].id), (2, attempts[2].id)])
+
+
+class QueryPlanTest(TestCase):
+    """Reporting queries must be index lookups (never full table scans), and the paginated
+    listings and exports must read rows in index order instead of sorting them."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(self.admin)
+        now = timezone.now()
+        self.technology = Technology.objects.create(name='Python')
+        self.schedule = TestSchedule.objects.create(technology=self.technology, start_time=now,
+                                                    end_time=now + datetime.timedelta(days=1))
+        for i in range(4):
+            employee = EmployeeProfile.objects.create(user=User.objects.create_user(f'employee{i}'), employee_id=f'E{i}')
+            attempt = EmployeeTestAttempt.objects.create(employee=employee, test_schedule=self.schedule,
+                                                         is_completed=True, score=40 + i * 10, end_time=now)
+            if i % 2:
+                EmployeeResult.objects.create(employee=employee, test_schedule=self.schedule, test_attempt=attempt,
+                                              score=attempt.score, passed=True, declared_by=self.admin)
+        leaderboards.clear()
+
+    def capture_plans(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content) # Export rows are read while streaming
+        self.assertEqual(response.status_code, 200)
+        return {query['sql']: query_plan(query['sql']) for query in queries if query['sql'].startswith('SELECT')}
+
+    def assertIndexed(self, plans, ordered=True):
+        for sql, plan in plans.items():
+            self.assertEqual(full_table_scans(sql), [], f"{sql}\n{plan}")
+            if ordered:
+                self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan, f"{sql}\n{plan}")
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', "Checks SQLite query plans.")
+    def test_results_listings(self):
+        self.assertIndexed(self.capture_plans(reverse('admin_view_all_exam_results')))
+        self.assertIndexed(self.capture_plans(reverse('view_all_results')))
+        # Filtered by technology, the few matching results are sorted rather than the index walked
+        self.assertIndexed(self.capture_plans(reverse('view_all_results'), {'technology': self.technology.id}), ordered=False)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', "Checks SQLite query plans.")
+    def test_export(self):
+        self.assertIndexed(self.capture_plans(reverse('export_results'), {'format': 'csv'}))
+        self.assertIndexed(self.capture_plans(reverse('export_results'), {
+            'format': 'csv', 'date_from': timezone.localdate().isoformat(), 'date_to': timezone.localdate().isoformat()}))
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', "Checks SQLite query plans.")
+    def test_leaderboard_and_declaration(self):
+        # The top entries' attempts are fetched by primary key (and sorted, a handful of rows)
+        self.assertIndexed(self.capture_plans(reverse('leaderboard_api', args=[self.schedule.id])), ordered=False)
+        with CaptureQueriesContext(connection) as queries:
+            declare_schedule_results(self.schedule, self.admin)
+        for query in queries:
+            if query['sql'].startswith('SELECT'):
+                self.assertEqual(full_table_scans(query['sql']), [], query['sql'])
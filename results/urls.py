@@ -4,7 +4,11 @@ from . import views
 urlpatterns = [
     # Admin-facing result views
     path('all/', views.view_all_results_admin, name='view_all_results'), # Admin view of all results
+    path('export/', views.export_results_admin, name='export_results'), # Streaming CSV/XLSX download
     path('detail/<int:result_id>/', views.view_detailed_result_admin, name='view_detailed_result_admin'), # Admin detailed view
+    path('schedules/<int:test_id>/item-analysis/', views.item_analysis_admin, name='item_analysis'), # Per-question statistics
+    path('api/schedules/<int:test_id>/item-analysis/', views.item_analysis_api, name='item_analysis_api'),
+    path('api/schedules/<int:test_id>/leaderboard/', views.leaderboard_api, name='leaderboard_api'), # ?top=N
 
     
 ]
\ No newline at end of file
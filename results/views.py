@@ -1,9 +1,21 @@
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib import messages
+from django.core.exceptions import ImproperlyConfigured
+from django.http import StreamingHttpResponse, JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from ExamHub.routers import get_reporting_database, reads_from_replica
 from .models import EmployeeResult
+from .forms import ResultExportForm
+from .export import export_queryset, iter_export_rows, stream_csv, stream_xlsx
+from .analytics import get_item_analysis
+from .leaderboard import attach_rankings, leaderboards
 from employee.models import EmployeeTestAttempt # To access attempt details
 from questionbank.models import Answer # To display answers
-from administrator.models import Technology # To filter by technology if needed
+from administrator.models import TestSchedule
+from administrator.pagination import paginate_keyset
+from administrator.reference import get_technologies
 
 # Helper function for admin check
 def is_admin(user):
@@ -12,25 +24,64 @@ def is_admin(user):
 # --- Admin Views for Results ---
 @login_required
 @user_passes_test(is_admin, login_url='/employee/login/')
+@reads_from_replica
 def view_all_results_admin(request):
-    all_results = EmployeeResult.objects.all().order_by('-declared_at')
-    technologies = Technology.objects.all()
+    all_results = EmployeeResult.objects.select_related('employee__user', 'test_schedule__technology', 'test_attempt')
+    technologies = get_technologies() # Cached reference data
 
     selected_tech_id = request.GET.get('technology')
     if selected_tech_id:
         all_results = all_results.filter(test_schedule__technology__id=selected_tech_id)
+    all_results = paginate_keyset(request, all_results, ['-declared_at', '-id'])
+    attach_rankings([result.test_attempt for result in all_results if result.test_attempt])
 
     context = {
         'all_results': all_results,
+        'page': all_results,
         'technologies': technologies,
         'selected_tech_id': int(selected_tech_id) if selected_tech_id else None,
     }
     return render(request, 'results/view_results.html', context)
 
+@login_required
+@user_passes_test(is_admin, login_url='/employee/login/')
+@require_GET
+def export_results_admin(request):
+    form = ResultExportForm(request.GET)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect('view_all_results')
+
+    # Rows are read while the response streams, after the view has returned, so the
+    # query is pinned to the reporting database rather than routed with reads_from_replica
+    rows = iter_export_rows(export_queryset(
+        technology=form.cleaned_data['technology'],
+        date_from=form.cleaned_data['date_from'],
+        date_to=form.cleaned_data['date_to'],
+    ).using(get_reporting_database()))
+    filename = f"exam-results-{timezone.localdate():%Y%m%d}"
+    if form.cleaned_data['format'] == 'xlsx':
+        response = StreamingHttpResponse(
+            stream_xlsx(rows), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        filename += '.xlsx'
+    else:
+        response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+        filename += '.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 @login_required
 @user_passes_test(is_admin, login_url='/employee/login/')
 def view_detailed_result_admin(request, result_id):
-    result = get_object_or_404(EmployeeResult, id=result_id)
+    result = get_object_or_404(
+        EmployeeResult.objects.select_related(
+            'declared_by', 'test_attempt__employee__user', 'test_attempt__test_schedule__technology'
+        ),
+        id=result_id
+    )
     attempt = result.test_attempt # Get the associated test attempt
 
     # If the attempt is not linked or not found, handle gracefully
@@ -42,17 +93,13 @@ def view_detailed_result_admin(request, result_id):
         total_marks_obtained = result.score # Use the stored score
         total_possible_marks = 0 # Cannot determine without attempt
     else:
+        # Use the grading summary stored on the attempt at submission time
         answers = Answer.objects.filter(test_attempt=attempt).select_related('question').order_by('question__id')
-        correct_count = 0
-        total_marks_obtained = 0
-        total_possible_marks = 0
-
-        for ans in answers:
-            total_possible_marks += ans.question.marks
-            if ans.selected_option == ans.question.correct_option:
-                correct_count += 1
-                total_marks_obtained += ans.question.marks
-        total_questions = answers.count()
+        correct_count = attempt.correct_count
+        total_questions = attempt.question_count
+        total_marks_obtained = attempt.marks_obtained
+        total_possible_marks = attempt.total_marks
+        attach_rankings([attempt])
 
     context = {
         'result': result,
@@ -62,7 +109,61 @@ def view_detailed_result_admin(request, result_id):
         'total_questions': total_questions,
         'total_marks_obtained': total_marks_obtained,
         'total_possible_marks': total_possible_marks,
+        'rank': getattr(attempt, 'rank', None),
+        'percentile': getattr(attempt, 'percentile', None),
+        'ranked_count': getattr(attempt, 'ranked_count', 0),
     }
     return render(request, 'results/employee_result.html', context) # Re-using the employee result display template
 
 
+# --- Item Analysis ---
+@login_required
+@user_passes_test(is_admin, login_url='/employee/login/')
+def item_analysis_admin(request, test_id):
+    test_schedule = get_object_or_404(TestSchedule.objects.select_related('technology'), id=test_id)
+    try:
+        analysis = get_item_analysis(test_schedule)
+    except ImproperlyConfigured as e:
+        messages.error(request, str(e))
+        return redirect('admin_manage_tests')
+    context = {'test_schedule': test_schedule, 'analysis': analysis}
+    return render(request, 'results/item_analysis.html', context)
+
+@login_required
+@user_passes_test(is_admin, login_url='/employee/login/')
+def item_analysis_api(request, test_id):
+    test_schedule = get_object_or_404(TestSchedule.objects.select_related('technology'), id=test_id)
+    try:
+        return JsonResponse(get_item_analysis(test_schedule))
+    except ImproperlyConfigured as e:
+        return JsonResponse({'error': str(e)}, status=503)
+
+
+# --- Leaderboard ---
+@login_required
+@user_passes_test(is_admin, login_url='/employee/login/')
+def leaderboard_api(request, test_id):
+    test_schedule = get_object_or_404(TestSchedule, id=test_id)
+    try:
+        top = min(max(1, int(request.GET.get('top', 10))), 500)
+    except ValueError:
+        return JsonResponse({'error': 'top must be an integer.'}, status=400)
+
+    leaderboard = leaderboards.get(test_schedule.id)
+    entries = leaderboard.top(top)
+    attempts = EmployeeTestAttempt.objects.select_related('employee__user').in_bulk([attempt_id for _, attempt_id, _ in entries])
+    return JsonResponse({
+        'test_schedule_id': test_schedule.id,
+        'ranked_count': len(leaderboard),
+        'top': [
+            {
+                'rank': rank,
+                'attempt_id': attempt_id,
+                'employee_id': attempts[attempt_id].employee.employee_id,
+                'employee_name': attempts[attempt_id].employee.user.get_full_name() or attempts[attempt_id].employee.user.username,
+                'score': float(score),
+                'percentile': leaderboard.percentile(attempt_id),
+            }
+            for rank, attempt_id, score in entries if attempt_id in attempts
+        ],
+    })